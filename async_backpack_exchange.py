@@ -0,0 +1,298 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, Optional, List
+
+import aiohttp
+
+from backpack_exchange import ACTION_RESYNC, ACTION_RETRY, BackpackBase
+from request_scheduler import PRIORITY_CRITICAL, priority_for
+from request_signer import RequestSigner, encode_query, canonical_payload
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBackpackExchange(BackpackBase):
+    """
+    基于 asyncio 的 Backpack 客户端
+    方法与 BackpackExchange 一致，签名与解析逻辑共用 BackpackBase，
+    底层使用带连接池的 aiohttp 会话，互不依赖的请求可以并发执行：
+
+        async with AsyncBackpackExchange(config) as exchange:
+            ticker, balance = await asyncio.gather(
+                exchange.fetch_ticker('SOL_USDC'),
+                exchange.fetch_balance()
+            )
+    """
+
+    def __init__(self, config: Dict):
+        self.apiKey = config.get('apiKey')
+        self.secret = config.get('secret')
+        self.baseUrl = config.get('baseUrl', 'https://api.backpack.exchange')
+        self.timeout = 30000  # 30秒超时
+        self.max_batch_orders = int(config.get('maxBatchOrders', self.max_batch_orders))
+        self.max_connections = int(config.get('maxConnections', 20))  # 连接池大小
+        self.rate_limiter = self._create_rate_limiter(config)
+        self.clock = self._create_clock(config)
+        self._clock_lock: Optional[asyncio.Lock] = None
+        self.signer = RequestSigner(self.apiKey, self.secret, int(config.get('signWindow', 5000)), self.clock)
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取（必要时创建）共享的 HTTP 会话"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout / 1000),
+                headers={
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+                }
+            )
+        return self.session
+
+    async def close(self):
+        """关闭 HTTP 会话"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def _request(self, method: str, path: str, params: Dict = None, data: Dict = None, instruction: str = None) -> Dict:
+        """
+        发送请求（经过限流器，可重试的错误按带抖动的指数退避重试）
+        :param method: 请求方法
+        :param path: 请求路径
+        :param params: URL参数
+        :param data: 请求体数据
+        :param instruction: 指令类型
+        :return: 响应数据
+        """
+        endpoint = f"{method} {path}"
+        # URL、签名前缀与请求体只编码一次，重试时只更新时间戳重新签名
+        query = encode_query(params)
+        url = f"{self.baseUrl}{path}?{query}" if query else f"{self.baseUrl}{path}"
+        payload = canonical_payload(instruction, data, query)
+        body = json.dumps(data) if data is not None else None
+        clock = self.clock if self.signer.can_sign else None
+        metrics = self.metrics
+        resynced = False
+        attempt = 0
+        while True:
+            try:
+                if clock is not None and clock.needs_sync():
+                    await self.sync_clock()
+
+                # 等待限流额度
+                wait = self.rate_limiter.reserve(endpoint, priority_for(instruction) == PRIORITY_CRITICAL)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+                # 生成签名和请求头
+                _, headers = self.signer.sign(payload)
+
+                session = await self._get_session()
+                sent = time.time()
+                async with session.request(method, url, headers=headers, data=body) as response:
+                    status = response.status
+                    text = await response.text()
+                    received = time.time()
+                    if clock is not None:
+                        clock.observe_response(sent, received, response.headers.get('Date'))
+                    if metrics is not None:
+                        self._record_response(endpoint, instruction, status, received - sent)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"响应状态码: {status}")
+                        logger.debug(f"响应内容: {text}")
+                    self.rate_limiter.on_response(endpoint, status, response.headers)
+
+                action = self._response_action(method, status, text, attempt, clock is not None and not resynced)
+                if action == ACTION_RESYNC:
+                    self._prepare_resync(endpoint)
+                    resynced = True
+                    continue
+                if action != ACTION_RETRY:
+                    # 检查响应状态
+                    self._check_status(status, text)
+                    return json.loads(text) if text else None
+                delay = self._prepare_retry(endpoint, attempt, f"返回 {status}")
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if metrics is not None:
+                    self._record_response(endpoint, instruction, None, 0.0)
+                if self._response_action(method, None, '', attempt, False) != ACTION_RETRY:
+                    logger.error(f"请求错误: {str(e) or type(e).__name__}")
+                    raise
+                delay = self._prepare_retry(endpoint, attempt, f"连接错误: {str(e) or type(e).__name__}")
+            except aiohttp.ClientError as e:
+                logger.error(f"请求错误: {str(e)}")
+                raise
+            except Exception as e:
+                logger.error(f"未知错误: {str(e)}")
+                raise
+
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def sync_clock(self) -> bool:
+        """
+        通过 /api/v1/time 校准服务器时间偏差
+        :return: 是否校准成功
+        """
+        if self.clock is None:
+            return False
+        if self._clock_lock is None:
+            self._clock_lock = asyncio.Lock()
+        async with self._clock_lock:
+            # 等待期间其他协程可能已经完成校准
+            if not self.clock.needs_sync():
+                return True
+            return await self._sync_clock()
+
+    async def _sync_clock(self) -> bool:
+        try:
+            endpoint = 'GET /api/v1/time'
+            wait = self.rate_limiter.reserve(endpoint, True)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            session = await self._get_session()
+            sent = time.time()
+            async with session.get(f"{self.baseUrl}/api/v1/time") as response:
+                text = await response.text()
+                received = time.time()
+                self.rate_limiter.on_response(endpoint, response.status, response.headers)
+                self._check_status(response.status, text)
+            self.clock.add_sample(sent, received, float(json.loads(text)))
+            self._record_clock()
+            return True
+        except Exception as e:
+            logger.warning(f"同步服务器时间失败: {str(e)}")
+            self.clock.sync_failed()
+            return False
+
+    async def fetch_ticker(self, symbol: str, is_futures: bool = False) -> Dict:
+        """获取当前行情信息"""
+        response = await self._request('GET', '/api/v1/ticker', {'symbol': symbol})
+        return self._parse_ticker(response)
+
+    async def fetch_tickers(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """一次请求获取所有交易对的行情，参数与 BackpackExchange.fetch_tickers 相同"""
+        response = await self._request('GET', '/api/v1/tickers')
+        wanted = set(symbols) if symbols is not None else None
+        return {
+            ticker['symbol']: self._parse_ticker(ticker)
+            for ticker in response
+            if wanted is None or ticker['symbol'] in wanted
+        }
+
+    async def create_order(self, symbol: str, type: str, side: str, amount: float,
+                           price: Optional[float] = None, is_futures: bool = False, **kwargs) -> Dict:
+        """
+        创建新订单，参数与 BackpackExchange.create_order 相同
+        :return: 订单信息
+        """
+        path = '/api/v1/futures/order' if is_futures else '/api/v1/order'
+        order_data = self._build_order_data(symbol, type, side, amount, price=price, is_futures=is_futures, **kwargs)
+        logger.info(f"创建订单数据: {order_data}")
+        response = await self._request('POST', path, data=order_data, instruction='orderExecute')
+        return self._parse_order(response)
+
+    async def create_orders(self, orders: List[Dict]) -> List[Dict]:
+        """
+        批量创建订单，多个分块并发提交
+        :param orders: 订单参数列表，每个元素的键与 create_order 的参数一致
+        :return: 与输入顺序一致的结果列表，失败的订单包含 error 字段且 id 为 None
+        """
+        async def submit(batch_data: List[Dict]) -> List[Dict]:
+            logger.info(f"批量创建订单: {len(batch_data)} 个")
+            try:
+                response = await self._request('POST', '/api/v1/orders', data=batch_data, instruction='orderExecute')
+            except Exception as e:
+                logger.error(f"批量创建订单失败: {str(e)}")
+                return [self._batch_error(order_data, str(e)) for order_data in batch_data]
+            return self._parse_batch_response(batch_data, response)
+
+        chunks = await asyncio.gather(*(submit(batch_data) for batch_data in self._prepare_batches(orders)))
+        return [result for chunk in chunks for result in chunk]
+
+    async def cancel_order(self, order_id: str, symbol: str) -> Dict:
+        """
+        取消订单
+        :param order_id: 订单ID
+        :param symbol: 交易对
+        :return: 订单信息
+        """
+        data = {
+            'orderId': order_id,
+            'symbol': symbol
+        }
+        response = await self._request('DELETE', '/api/v1/order', data=data, instruction='orderCancel')
+        if response.get('status') == 'Cancelled':
+            return response
+        raise Exception(f"取消订单失败: {response}")
+
+    async def cancel_all_orders(self, symbol: str) -> List[Dict]:
+        """
+        取消交易对的所有未完成订单（单次请求），失败时并发逐个撤单
+        :param symbol: 交易对
+        :return: 已取消的订单列表
+        """
+        try:
+            response = await self._request('DELETE', '/api/v1/orders', data={'symbol': symbol}, instruction='orderCancelAll')
+            return [self._parse_order(order) for order in (response or [])]
+        except Exception as e:
+            logger.warning(f"批量撤单失败，改为并发逐个撤单: {str(e)}")
+
+        open_orders = [order for order in await self.fetch_open_orders(symbol) if order.get('id')]
+        results = await asyncio.gather(
+            *(self.cancel_order(order['id'], symbol) for order in open_orders),
+            return_exceptions=True
+        )
+        cancelled = []
+        for order, result in zip(open_orders, results):
+            if isinstance(result, Exception):
+                logger.error(f"取消订单 {order['id']} 失败: {str(result)}")
+            else:
+                cancelled.append(self._parse_order(result))
+        return cancelled
+
+    async def fetch_open_orders(self, symbol: Optional[str], since: Optional[int] = None, limit: Optional[int] = None, params: Dict = {}) -> List[Dict]:
+        """
+        获取未完成订单列表
+        :param symbol: 交易对，为 None 时返回所有交易对的未完成订单
+        :param since: 开始时间戳
+        :param limit: 返回订单数量限制
+        :param params: 额外参数
+        :return: 未完成订单列表
+        """
+        query_params = self._build_open_orders_params(symbol, limit, params)
+        response = await self._request('GET', '/api/v1/orders', query_params, instruction='orderQueryAll')
+        return [self._parse_order(order) for order in response]
+
+    async def fetch_balance(self) -> Dict:
+        """
+        获取账户余额
+        :return: 账户余额信息
+        """
+        response = await self._request('GET', '/api/v1/capital', instruction='balanceQuery')
+        return self._parse_balance(response)
+
+    async def fetch_my_trades(self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None, params: Dict = {}) -> List[Dict]:
+        """
+        获取成交历史
+        :param symbol: 交易对
+        :param since: 开始时间戳
+        :param limit: 返回数量限制
+        :param params: 额外参数
+        :return: 成交记录列表
+        """
+        query_params = self._build_trades_params(symbol, since, limit, params)
+        response = await self._request('GET', '/wapi/v1/history/fills', query_params, instruction='fillHistoryQueryAll')
+        return [self._parse_trade(trade) for trade in response]
@@ -1,14 +1,18 @@
-import ccxt
-import hmac
-import hashlib
+import threading
 import time
-from typing import Dict, Optional, List, Tuple
-from urllib.parse import urlencode
+from typing import Dict, Optional, List, Tuple, Union
 import logging
 import requests
-import base64
-import nacl.signing
+from clock_sync import ClockSync, is_timestamp_rejection
+from metrics import MetricsRegistry
+from profiling import NULL_STAGE, Profiler
+from rate_limiter import RateLimiter
+from request_signer import RequestSigner, encode_query, canonical_payload
+from request_scheduler import RequestScheduler, PRIORITY_CRITICAL, PRIORITY_LOW, priority_for
 import json
+import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -25,13 +29,584 @@ console_handler.setFormatter(formatter)
 # 添加处理器到日志记录器
 logger.addHandler(console_handler)
 
-class BackpackExchange(ccxt.Exchange):
+# 请求响应的处理方式（BackpackBase._response_action 的返回值）
+ACTION_RETRY = 'retry'  # 按带抖动的指数退避重试
+ACTION_RESYNC = 'resync'  # 重新校准服务器时间后立即重试
+ACTION_RAISE = 'raise'  # 不可重试，交由 _check_status 抛出异常
+
+_EPOCH = date(1970, 1, 1)
+_epoch_days: Dict[str, int] = {}  # 'YYYY-MM-DD' -> 距 1970-01-01 的天数
+
+def parse_timestamp_ms(value) -> Optional[int]:
+    """
+    将交易所返回的 ISO 8601 时间（UTC，如 2024-05-01T08:30:00.123）解析为毫秒时间戳
+    按固定位置切片解析，日期部分缓存，比 time.strptime 快且不受本地时区影响
+    :param value: ISO 8601 字符串或毫秒时间戳
+    :return: 毫秒时间戳，无法解析时返回 None
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        day = value[:10]
+        days = _epoch_days.get(day)
+        if days is None:
+            days = (date(int(day[0:4]), int(day[5:7]), int(day[8:10])) - _EPOCH).days
+            _epoch_days[day] = days
+        seconds = days * 86400 + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+        millis = 0
+        rest = value[19:]
+        if rest[:1] == '.':
+            end = 1
+            while end < len(rest) and rest[end].isdigit():
+                end += 1
+            millis = int((rest[1:end] + '000')[:3])
+            rest = rest[end:]
+        if rest[:1] in ('+', '-'):
+            offset = int(rest[1:3]) * 3600 + int(rest[4:6]) * 60
+            seconds -= offset if rest[0] == '+' else -offset
+        return seconds * 1000 + millis
+    except (ValueError, IndexError):
+        return None
+
+class BackpackBase:
+    """
+    Backpack API 的公共逻辑：请求签名、请求体构建与响应解析
+    同步客户端 BackpackExchange 与异步客户端 AsyncBackpackExchange 共用
+    """
+    max_batch_orders = 50  # 单次批量下单的最大订单数
+    max_retries = 3  # 可重试错误的最大重试次数
+    base_backoff = 0.5  # 首次重试的基础等待时间（秒）
+    max_backoff = 8.0  # 重试等待时间上限（秒）
+    retryable_statuses = (429, 500, 502, 503, 504)
+    clock: Optional[ClockSync] = None  # 服务器时钟偏差估计，为 None 时使用本地时间
+    metrics: Optional[MetricsRegistry] = None  # 请求指标，为 None 时不记录
+    profiler: Optional[Profiler] = None  # 按需性能分析，为 None 时不记录
+
+    def _should_retry(self, method: str, status_code: Optional[int], attempt: int) -> bool:
+        """
+        判断请求是否可以重试
+        429 表示请求未被处理，任何请求都可以重试；服务端错误与连接错误（status_code 为 None）
+        只对幂等的 GET/DELETE 请求重试，避免重复下单
+        """
+        if attempt >= self.max_retries:
+            return False
+        if status_code == 429:
+            return True
+        if status_code is not None and status_code not in self.retryable_statuses:
+            return False
+        return method in ('GET', 'DELETE')
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """带抖动的指数退避时间（秒）"""
+        return min(self.max_backoff, self.base_backoff * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    def _response_action(self, method: str, status_code: Optional[int], text: str, attempt: int,
+                         can_resync: bool) -> Optional[str]:
+        """
+        决定如何处理一次响应，同步与异步客户端共用，保证同一响应的处理方式一致
+        时间戳超出时间窗口时请求未被处理，先重新校准时钟后立即重试（下单请求也可以安全重试），
+        其余错误按 _should_retry 判断是否退避重试
+        :param method: 请求方法
+        :param status_code: HTTP状态码，连接错误或超时为 None
+        :param text: 响应内容
+        :param attempt: 已重试次数
+        :param can_resync: 是否可以校准时钟后重试（已启用时钟校准且本次请求尚未校准过）
+        :return: ACTION_RESYNC、ACTION_RETRY 或 ACTION_RAISE，请求成功时返回 None
+        """
+        if status_code == 200:
+            return None
+        if can_resync and status_code is not None and is_timestamp_rejection(status_code, text):
+            return ACTION_RESYNC
+        if self._should_retry(method, status_code, attempt):
+            return ACTION_RETRY
+        return ACTION_RAISE
+
+    def _prepare_retry(self, endpoint: str, attempt: int, reason: str) -> float:
+        """
+        记录一次重试
+        :param endpoint: 接口
+        :param attempt: 已重试次数
+        :param reason: 重试原因（用于日志）
+        :return: 重试前需要等待的秒数
+        """
+        delay = self._backoff_delay(attempt)
+        logger.warning(f"请求 {endpoint} {reason}，{delay:.2f} 秒后第 {attempt + 1} 次重试")
+        self.rate_limiter.record_retry(endpoint)
+        if self.metrics is not None:
+            self.metrics.inc('backpack_request_retries_total', endpoint=endpoint)
+        return delay
+
+    def _prepare_resync(self, endpoint: str):
+        """签名因时间戳被拒绝：标记时钟需要在重试前重新校准"""
+        logger.warning(f"请求 {endpoint} 因时间戳被拒绝，重新校准服务器时间后重试")
+        self.clock.on_rejected()
+
+    def _create_rate_limiter(self, config: Dict) -> RateLimiter:
+        """
+        根据配置创建限流器
+        :param config: 客户端配置，支持 requestsPerSecond、requestBurst、endpointRateLimits、endpointWeights、
+                       reservedCapacity、maxRetries
+        """
+        self.max_retries = int(config.get('maxRetries', self.max_retries))
+        return RateLimiter(
+            rate=float(config.get('requestsPerSecond', 10)),
+            capacity=float(config.get('requestBurst', 20)),
+            endpoint_limits=config.get('endpointRateLimits'),
+            weights=config.get('endpointWeights'),
+            reserved=float(config.get('reservedCapacity', 5))
+        )
+
+    def _record_response(self, endpoint: str, instruction: Optional[str], status_code: Optional[int], elapsed: float):
+        """
+        记录一次请求的耗时与结果（仅在启用指标时调用）
+        :param endpoint: 接口（方法 + 路径）
+        :param instruction: 指令类型
+        :param status_code: HTTP 状态码，连接错误或超时为 None
+        :param elapsed: 耗时（秒）
+        """
+        metrics = self.metrics
+        if status_code is None:
+            metrics.inc('backpack_request_errors_total', endpoint=endpoint, kind='connection')
+            return
+        metrics.observe('backpack_request_duration_seconds', elapsed, endpoint=endpoint, instruction=instruction or '')
+        metrics.inc('backpack_requests_total', endpoint=endpoint, status=status_code)
+        if status_code == 429:
+            metrics.inc('backpack_request_errors_total', endpoint=endpoint, kind='rate_limited')
+        elif status_code != 200:
+            metrics.inc('backpack_request_errors_total', endpoint=endpoint, kind='status')
+
+    def _stage(self, name: str):
+        """性能分析的阶段计时，未开启分析时不做任何事"""
+        profiler = self.profiler
+        return profiler.stage(name) if profiler is not None else NULL_STAGE
+
+    def _record_clock(self):
+        """记录时钟偏差与签名时间窗口"""
+        if self.metrics is not None and self.clock is not None:
+            self.metrics.set('backpack_clock_offset_ms', self.clock.offset)
+            self.metrics.set('backpack_sign_window_ms', self.clock.window)
+
+    def _get_timestamp(self) -> int:
+        """获取当前时间戳(毫秒)，已校准时按服务器时间"""
+        if self.clock is not None:
+            return self.clock.now_ms()
+        return int(time.time() * 1000)
+
+    def _create_clock(self, config: Dict) -> Optional[ClockSync]:
+        """
+        根据配置创建服务器时钟偏差估计
+        :param config: 客户端配置，支持 signWindow（时间窗口下限）、maxSignWindow、clockSyncInterval（秒，0 为关闭）
+        :return: 关闭时返回 None，签名使用本地时间与固定时间窗口
+        """
+        interval = float(config.get('clockSyncInterval', 600))
+        if interval <= 0:
+            return None
+        return ClockSync(
+            min_window=int(config.get('signWindow', 5000)),
+            max_window=int(config.get('maxSignWindow', 60000)),
+            sync_interval=interval
+        )
+
+    def _sign_request(self, method: str, path: str, params: Optional[Dict] = None, data: Optional[Union[Dict, List[Dict]]] = None, instruction: Optional[str] = None) -> Tuple[str, Dict]:
+        """
+        生成请求签名（由缓存私钥的 RequestSigner 完成）
+        :param method: 请求方法
+        :param path: 请求路径
+        :param params: 查询参数
+        :param data: 请求体数据（批量请求时为列表）
+        :param instruction: 指令类型
+        :return: 签名和请求头
+        """
+        return self.signer.sign_request(instruction, data, encode_query(params))
+
+    def _prepare_batches(self, orders: List[Dict]) -> List[List[Dict]]:
+        """
+        将订单参数列表转换为按 max_batch_orders 分块的请求体
+        :param orders: 订单参数列表
+        :return: 请求体分块列表
+        """
+        # 同一毫秒内生成的 clientId 会重复，批量下单时按顺序递增分配
+        base_client_id = int(time.time() * 1000) % 100000000
+
+        batches = []
+        for start in range(0, len(orders), self.max_batch_orders):
+            batch_data = []
+            for i, order in enumerate(orders[start:start + self.max_batch_orders]):
+                order = dict(order)
+                if order.get('client_id') is None:
+                    order['client_id'] = (base_client_id + start + i) % 4294967296
+                batch_data.append(self._build_order_data(**order))
+            batches.append(batch_data)
+        return batches
+
+    def _parse_batch_response(self, batch_data: List[Dict], response) -> List[Dict]:
+        """
+        解析批量下单响应，结果与请求顺序一致
+        :param batch_data: 请求体列表
+        :param response: 交易所响应
+        :return: 结果列表
+        """
+        if not isinstance(response, list):
+            response = [response]
+        results = []
+        for i, order_data in enumerate(batch_data):
+            item = response[i] if i < len(response) else None
+            if isinstance(item, dict) and item.get('id'):
+                results.append(self._parse_order(item))
+            else:
+                message = item.get('message', item) if isinstance(item, dict) else '交易所未返回结果'
+                results.append(self._batch_error(order_data, str(message)))
+        return results
+
+    def _batch_error(self, order_data: Dict, message: str) -> Dict:
+        """构建批量下单中单个失败订单的结果"""
+        return {
+            'id': None,
+            'clientId': order_data.get('clientId'),
+            'symbol': order_data.get('symbol'),
+            'side': order_data.get('side'),
+            'price': float(order_data.get('price', 0)),
+            'amount': float(order_data.get('quantity', 0)),
+            'status': 'Rejected',
+            'error': message
+        }
+
+    def _build_order_data(self, symbol: str, type: str, side: str, amount: float,
+                          price: Optional[float] = None, is_futures: bool = False,
+                          leverage: Optional[int] = None, margin_type: Optional[str] = None,
+                          client_id: Optional[int] = None, post_only: bool = False,
+                          quote_quantity: Optional[float] = None, reduce_only: bool = False,
+                          self_trade_prevention: str = 'RejectTaker', time_in_force: str = 'GTC',
+                          stop_loss_limit_price: Optional[float] = None,
+                          stop_loss_trigger_by: Optional[str] = None,
+                          stop_loss_trigger_price: Optional[float] = None,
+                          take_profit_limit_price: Optional[float] = None,
+                          take_profit_trigger_by: Optional[str] = None,
+                          take_profit_trigger_price: Optional[float] = None,
+                          trigger_by: Optional[str] = None,
+                          trigger_price: Optional[float] = None,
+                          trigger_quantity: Optional[str] = None,
+                          auto_lend: bool = False,
+                          auto_lend_redeem: bool = False,
+                          auto_borrow: bool = False,
+                          auto_borrow_repay: bool = False) -> Dict:
+        """
+        构建下单请求体，参数含义与 create_order 相同
+        :return: 请求体数据
+        """
+        # 生成唯一的 clientId (确保在 uint32 范围内)
+        if client_id is None:
+            # 使用当前时间戳的后 8 位数字作为 clientId
+            client_id = int(time.time() * 1000) % 100000000
+            
+        # 准备请求体数据
+        order_data = {
+            'symbol': symbol,
+            'side': 'Ask' if side == 'Ask' else 'Bid',
+            'orderType': type.capitalize(),  # Market 或 Limit
+            'quantity': amount,  # 使用格式化后的数量
+            'timeInForce': time_in_force,
+            'reduceOnly': reduce_only,
+            'selfTradePrevention': self_trade_prevention,
+            'clientId': client_id
+        }
+        
+        # 只在限价单时添加 postOnly 参数
+        if type.lower() == 'limit' and post_only:
+            order_data['postOnly'] = post_only
+        
+        # 添加可选参数
+        if price:
+            order_data['price'] = str(price)
+        if quote_quantity:
+            order_data['quoteQuantity'] = str(quote_quantity)
+        if stop_loss_limit_price:
+            order_data['stopLossLimitPrice'] = str(stop_loss_limit_price)
+        if stop_loss_trigger_by:
+            order_data['stopLossTriggerBy'] = stop_loss_trigger_by
+        if stop_loss_trigger_price:
+            order_data['stopLossTriggerPrice'] = str(stop_loss_trigger_price)
+        if take_profit_limit_price:
+            order_data['takeProfitLimitPrice'] = str(take_profit_limit_price)
+        if take_profit_trigger_by:
+            order_data['takeProfitTriggerBy'] = take_profit_trigger_by
+        if take_profit_trigger_price:
+            order_data['takeProfitTriggerPrice'] = str(take_profit_trigger_price)
+        if trigger_by:
+            order_data['triggerBy'] = trigger_by
+        if trigger_price:
+            order_data['triggerPrice'] = str(trigger_price)
+        if trigger_quantity:
+            order_data['triggerQuantity'] = trigger_quantity
+            
+        # 合约订单特有参数
+        if is_futures:
+            if leverage:
+                order_data['leverage'] = str(leverage)
+            if margin_type:
+                order_data['marginType'] = margin_type.lower()
+                
+        # 现货杠杆特有参数
+        if not is_futures:
+            if auto_lend:
+                order_data['autoLend'] = auto_lend
+            if auto_lend_redeem:
+                order_data['autoLendRedeem'] = auto_lend_redeem
+            if auto_borrow:
+                order_data['autoBorrow'] = auto_borrow
+            if auto_borrow_repay:
+                order_data['autoBorrowRepay'] = auto_borrow_repay
+
+        return order_data
+
+    def _parse_ticker(self, response: Dict) -> Dict:
+        """解析行情响应"""
+        # 打印原始响应数据以便调试
+        return {
+            'symbol': response['symbol'],
+            'last': float(response.get('lastPrice', 0)),
+            'bid': float(response.get('bidPrice', 0)),
+            'ask': float(response.get('askPrice', 0)),
+            'volume': float(response.get('volume', 0)),
+            'high': float(response.get('high', 0)),
+            'low': float(response.get('low', 0)),
+            'change': float(response.get('priceChange', 0))
+        }
+
+    def _parse_order(self, order: Dict) -> Dict:
+        """
+        解析订单信息
+        :param order: 原始订单数据
+        :return: 解析后的订单信息
+        """
+        try:
+            return {
+                'id': order.get('id'),
+                'clientId': order.get('clientId'),
+                'symbol': order.get('symbol'),
+                'side': order.get('side'),
+                'type': order.get('orderType'),
+                'price': float(order.get('price', 0)),
+                'amount': float(order.get('quantity', 0)),
+                'filled': float(order.get('executedQuantity', 0)),
+                'cost': float(order.get('executedQuoteQuantity', 0)),
+                'status': order.get('status'),
+                'timeInForce': order.get('timeInForce'),
+                'reduceOnly': order.get('reduceOnly', False),
+                'selfTradePrevention': order.get('selfTradePrevention'),
+                'createdAt': order.get('createdAt'),
+                'triggeredAt': order.get('triggeredAt'),
+                'stopLossTriggerPrice': order.get('stopLossTriggerPrice'),
+                'stopLossLimitPrice': order.get('stopLossLimitPrice'),
+                'stopLossTriggerBy': order.get('stopLossTriggerBy'),
+                'takeProfitTriggerPrice': order.get('takeProfitTriggerPrice'),
+                'takeProfitLimitPrice': order.get('takeProfitLimitPrice'),
+                'takeProfitTriggerBy': order.get('takeProfitTriggerBy'),
+                'triggerBy': order.get('triggerBy'),
+                'triggerPrice': order.get('triggerPrice'),
+                'triggerQuantity': order.get('triggerQuantity'),
+                'relatedOrderId': order.get('relatedOrderId')
+            }
+        except Exception as e:
+            logger.error(f"解析订单信息时出错: {str(e)}")
+            raise
+
+    def _parse_markets(self, response: List[Dict]) -> List[Dict]:
+        """
+        解析交易对信息，保留价格、数量精度与下单限制
+        :param response: 交易所返回的交易对列表
+        :return: 解析后的交易对列表
+        """
+        def to_float(value):
+            return float(value) if value not in (None, '') else None
+
+        markets = []
+        for market in response:
+            symbol = market.get('symbol')
+            try:
+                base = market.get('baseSymbol')
+                quote = market.get('quoteSymbol')
+                if not base or not quote:
+                    # 旧版接口没有 baseSymbol/quoteSymbol 字段时按分隔符拆分
+                    base, quote = symbol.replace('-', '_').split('_')[:2]
+
+                filters = market.get('filters') or {}
+                price_filter = filters.get('price') or {}
+                quantity_filter = filters.get('quantity') or {}
+                market_type = (market.get('marketType') or 'SPOT').upper()
+                spot = market_type == 'SPOT'
+
+                markets.append({
+                    'symbol': symbol,
+                    'base': base,
+                    'quote': quote,
+                    'active': market.get('orderBookState', 'Open') == 'Open',
+                    'type': 'spot' if spot else 'futures',
+                    'spot': spot,
+                    'futures': not spot,
+                    'precision': {
+                        'price': to_float(price_filter.get('tickSize')),
+                        'amount': to_float(quantity_filter.get('stepSize'))
+                    },
+                    'limits': {
+                        'price': {'min': to_float(price_filter.get('minPrice')), 'max': to_float(price_filter.get('maxPrice'))},
+                        'amount': {'min': to_float(quantity_filter.get('minQuantity')), 'max': to_float(quantity_filter.get('maxQuantity'))},
+                        'cost': {'min': to_float((filters.get('notional') or {}).get('minNotional') or market.get('minNotional'))}
+                    }
+                })
+            except Exception as e:
+                logger.error(f"解析交易对 {symbol} 时出错: {str(e)}")
+                continue
+        logger.debug(f"解析交易对 {len(markets)} 个")
+        return markets
+
+    def _build_trades_params(self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None, params: Dict = {}) -> Dict:
+        """
+        构建成交历史查询参数
+        :param symbol: 交易对
+        :param since: 开始时间戳
+        :param limit: 返回数量限制
+        :param params: 额外参数
+        :return: 查询参数
+        """
+        # 构建查询参数
+        query_params = {
+            'symbol': symbol,
+            **params
+        }
+        
+        # 添加时间范围参数
+        if since is not None:
+            query_params['from'] = since
+        if 'to' in params:
+            query_params['to'] = params['to']
+            
+        # 添加分页参数
+        if limit is not None:
+            query_params['limit'] = min(limit, 1000)  # 限制最大值为1000
+        if 'offset' in params:
+            query_params['offset'] = params['offset']
+            
+        # 添加成交类型参数
+        if 'fillType' in params:
+            query_params['fillType'] = params['fillType']
+            
+        # 添加市场类型参数
+        if 'marketType' in params:
+            query_params['marketType'] = params['marketType']
+
+        return query_params
+
+    def _parse_trade(self, trade: Dict) -> Dict:
+        """
+        解析成交记录
+        :param trade: 原始成交数据
+        :return: 解析后的成交记录
+        """
+        # 将 ISO 8601 格式（UTC）的时间戳转换为毫秒时间戳
+        timestamp = parse_timestamp_ms(trade.get('timestamp'))
+
+        return {
+            'id': str(trade.get('tradeId')),  # 使用 tradeId 作为成交ID
+            'order': trade.get('orderId'),
+            'clientId': trade.get('clientId'),
+            'timestamp': timestamp,
+            'datetime': trade.get('timestamp'),  # 直接使用原始的时间戳字符串
+            'symbol': trade.get('symbol'),
+            'side': 'buy' if trade.get('side') == 'Bid' else 'sell',
+            'price': float(trade.get('price')),
+            'amount': float(trade.get('quantity')),
+            'cost': float(trade.get('price')) * float(trade.get('quantity')),
+            'fee': {
+                'currency': trade.get('feeSymbol'),
+                'cost': float(trade.get('fee')),
+                'rate': float(trade.get('fee')) / (float(trade.get('price')) * float(trade.get('quantity')))
+            },
+            'isMaker': trade.get('isMaker', False),
+            'systemOrderType': trade.get('systemOrderType')
+        }
+
+    def _build_open_orders_params(self, symbol: str, limit: Optional[int] = None, params: Dict = {}) -> Dict:
+        """
+        构建未完成订单查询参数
+        :param symbol: 交易对，为 None 时查询所有交易对
+        :param limit: 返回订单数量限制
+        :param params: 额外参数
+        :return: 查询参数
+        """
+        # 构建查询参数
+        query_params = {
+            'marketType': 'SPOT',  # 默认为现货市场
+            **params
+        }
+        if symbol is not None:
+            query_params['symbol'] = symbol
+        
+        # 添加分页参数
+        if limit is not None:
+            query_params['limit'] = min(limit, 1000)  # 限制最大值为1000
+        if 'offset' in params:
+            query_params['offset'] = params['offset']
+
+        return query_params
+
+    def _parse_balance(self, response: Dict) -> Dict:
+        """
+        解析账户资金响应
+        :param response: 原始资金数据
+        :return: 币种 -> {free, used, total}
+        """
+        balances = {}
+        for currency, balance_info in response.items():
+            balances[currency] = {
+                'free': float(balance_info.get('available', 0)),
+                'used': float(balance_info.get('locked', 0)),
+                'total': float(balance_info.get('available', 0)) + float(balance_info.get('locked', 0))
+            }
+        return balances
+
+    def _check_status(self, status_code: int, text: str):
+        """
+        检查响应状态码，非200时抛出异常
+        :param status_code: HTTP状态码
+        :param text: 响应内容
+        """
+        if status_code == 200:
+            return
+        elif status_code == 401:
+            raise Exception("API认证失败，请检查API密钥和签名")
+        elif status_code == 403:
+            raise Exception("没有权限访问该接口")
+        elif status_code == 404:
+            raise Exception("请求的资源不存在")
+        elif status_code == 429:
+            raise Exception("请求频率超限")
+        else:
+            raise Exception(f"请求失败: {text}")
+
+class BackpackExchange(BackpackBase):
+    """
+    Backpack 同步客户端，不依赖 ccxt
+    需要 ccxt.Exchange 接口时使用 ccxt_adapter.create_ccxt_exchange 创建兼容客户端
+    """
     def __init__(self, config: Dict):
-        super().__init__(config)
         self.apiKey = config.get('apiKey')
         self.secret = config.get('secret')
-        self.baseUrl = 'https://api.backpack.exchange'
+        self.baseUrl = config.get('baseUrl', 'https://api.backpack.exchange')
+        self.clock = self._create_clock(config)
+        self._clock_lock = threading.Lock()
+        self.signer = RequestSigner(self.apiKey, self.secret, int(config.get('signWindow', 5000)), self.clock)
         self.timeout = 30000  # 30秒超时
+        self.max_batch_orders = int(config.get('maxBatchOrders', self.max_batch_orders))
+        self.rate_limiter = self._create_rate_limiter(config)
+
+        # 优先级请求调度器，schedulerWorkers 为 0 时直接在调用线程中发送请求
+        # 查询请求排队超过 staleRequestTimeout 秒后丢弃（0 为不丢弃）
+        workers = int(config.get('schedulerWorkers', 4))
+        stale_timeout = float(config.get('staleRequestTimeout', 0)) or None
+        self.scheduler = RequestScheduler(workers, stale_timeout) if workers > 0 else None
         
         # 配置请求会话
         self.session = requests.Session()
@@ -40,170 +615,173 @@ class BackpackExchange(ccxt.Exchange):
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
 
-    def _get_timestamp(self) -> int:
-        """获取当前时间戳(毫秒)"""
-        return int(time.time() * 1000)
-
-    def _sign_request(self, method: str, path: str, params: Optional[Dict] = None, data: Optional[Dict] = None, instruction: Optional[str] = None) -> Tuple[str, Dict]:
+    def _request(self, method: str, path: str, params: Dict = None, data: Dict = None, instruction: str = None,
+                 priority: Optional[int] = None) -> Dict:
         """
-        生成请求签名
+        发送请求：经优先级调度器排队，撤单等关键请求先于查询请求发出
         :param method: 请求方法
         :param path: 请求路径
-        :param params: 查询参数
+        :param params: URL参数
         :param data: 请求体数据
         :param instruction: 指令类型
-        :return: 签名和请求头
+        :param priority: 请求优先级，默认根据指令类型推断
+        :return: 响应数据
         """
-        # 生成时间戳
-        timestamp = str(int(time.time() * 1000))
-        window = "5000"  # 5秒时间窗口
-        
-        # 准备签名字符串
-        signature_parts = []
-        
-        # 添加指令类型（如果有）
-        if instruction:
-            signature_parts.append(f"instruction={instruction}")
-        
-        # 添加请求体数据（如果有）
-        if data:
-            # 对数据进行排序
-            sorted_data = sorted(data.items(), key=lambda x: x[0])
-            # 构建数据字符串，处理布尔值
-            data_string = "&".join([
-                f"{k}={str(v).lower() if isinstance(v, bool) else v}" 
-                for k, v in sorted_data
-            ])
-            signature_parts.append(data_string)
-        
-        # 添加查询参数（如果有）
-        if params:
-            # 对参数进行排序
-            sorted_params = sorted(params.items(), key=lambda x: x[0])
-            # 构建查询字符串，处理列表类型的参数
-            query_parts = []
-            for k, v in sorted_params:
-                if isinstance(v, list):
-                    # 对于列表类型的参数，将每个元素单独添加
-                    for item in v:
-                        query_parts.append(f"{k}={item}")
-                else:
-                    query_parts.append(f"{k}={v}")
-            query_string = "&".join(query_parts)
-            signature_parts.append(query_string)
-        
-        # 添加时间戳和窗口
-        signature_parts.append(f"timestamp={timestamp}")
-        signature_parts.append(f"window={window}")
-        
-        # 构建完整的签名字符串
-        signature_data = "&".join(signature_parts)
-        
-        # 使用 ED25519 生成签名
-        private_key = base64.b64decode(self.secret)
-        message = signature_data.encode('utf-8')
-        signature = nacl.signing.SigningKey(private_key).sign(message).signature
-        
-        # Base64 编码签名
-        signature_b64 = base64.b64encode(signature).decode('utf-8')
-        
-        # 准备请求头
-        headers = {
-            'X-API-KEY': self.apiKey,
-            'X-SIGNATURE': signature_b64,
-            'X-TIMESTAMP': timestamp,
-            'X-WINDOW': window,
-            'Content-Type': 'application/json'
-        }
-        
-        # 记录调试信息
-        logger.debug("签名信息:")
-        logger.debug(f"时间戳: {timestamp}")
-        logger.debug(f"时间窗口: {window}")
-        logger.debug(f"方法: {method}")
-        logger.debug(f"路径: {path}")
-        logger.debug(f"查询参数: {params}")
-        logger.debug(f"请求体数据: {data}")
-        logger.debug(f"指令类型: {instruction}")
-        logger.debug(f"签名字符串: {signature_data}")
-        logger.debug(f"签名: {signature_b64}")
-        
-        return signature_b64, headers
+        if priority is None:
+            priority = priority_for(instruction)
+        # 查询字符串只编码一次，URL、签名与请求合并共用
+        query = encode_query(params)
+        started = time.monotonic()
+        if self.scheduler is None:
+            response = self._send(method, path, params, data, instruction, priority, query)
+        else:
+            # 只合并无请求体的查询请求
+            key = f"{method} {path}?{query}" if data is None else None
+            response = self.scheduler.call(priority, lambda: self._send(method, path, params, data, instruction, priority, query), key)
+        if instruction == 'orderExecute' and self.metrics is not None:
+            # 下单到确认的耗时包含调度器排队、限流等待与重试
+            self.metrics.observe('backpack_order_ack_seconds', time.monotonic() - started, instruction=instruction)
+        return response
 
-    def _request(self, method: str, path: str, params: Dict = None, data: Dict = None, instruction: str = None) -> Dict:
+    def _send(self, method: str, path: str, params: Dict = None, data: Dict = None, instruction: str = None,
+              priority: int = PRIORITY_LOW, query: str = None) -> Dict:
         """
-        发送请求
+        发送请求（经过限流器，可重试的错误按带抖动的指数退避重试）
         :param method: 请求方法
         :param path: 请求路径
         :param params: URL参数
         :param data: 请求体数据
         :param instruction: 指令类型
+        :param priority: 请求优先级，关键请求可使用限流器的保留额度
+        :param query: 已编码的查询字符串，为空时由 params 编码
         :return: 响应数据
         """
+        profiler = self.profiler
+        if profiler is not None and profiler.active and not profiler.thread_active():
+            # 开启性能分析时在请求线程中启用 cProfile
+            with profiler.thread_profile():
+                return self._send(method, path, params, data, instruction, priority, query)
+
+        endpoint = f"{method} {path}"
+        # URL、签名前缀与请求体只编码一次，重试时只更新时间戳重新签名
+        if query is None:
+            query = encode_query(params)
+        url = f"{self.baseUrl}{path}?{query}" if query else f"{self.baseUrl}{path}"
+        payload = canonical_payload(instruction, data, query)
+        body = json.dumps(data) if data is not None else None
+        clock = self.clock if self.signer.can_sign else None
+        metrics = self.metrics
+        resynced = False
+        attempt = 0
+        while True:
+            try:
+                if clock is not None and clock.needs_sync():
+                    self.sync_clock()
+
+                # 等待限流额度
+                with self._stage('wait'):
+                    self.rate_limiter.acquire(endpoint, priority == PRIORITY_CRITICAL)
+
+                # 生成签名和请求头（每次重试重新签名，避免时间窗口过期）
+                with self._stage('sign'):
+                    _, headers = self.signer.sign(payload)
+
+                # 记录请求信息（未开启调试日志时不格式化）
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("发送请求:")
+                    logger.debug(f"URL: {url}")
+                    logger.debug(f"方法: {method}")
+                    logger.debug(f"数据: {body}")
+                    logger.debug(f"指令类型: {instruction}")
+                    logger.debug(f"请求头: {headers}")
+
+                # 发送请求
+                sent = time.time()
+                with self._stage('network'):
+                    response = self.session.request(
+                        method=method,
+                        url=url,
+                        headers=headers,
+                        data=body,
+                        verify=True,
+                        timeout=self.timeout / 1000
+                    )
+                received = time.time()
+                if clock is not None:
+                    clock.observe_response(sent, received, response.headers.get('Date'))
+                if metrics is not None:
+                    self._record_response(endpoint, instruction, response.status_code, received - sent)
+                # 记录响应信息
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"响应状态码: {response.status_code}")
+                    logger.debug(f"响应头: {response.headers}")
+                    logger.debug(f"响应内容: {response.text}")
+
+                self.rate_limiter.on_response(endpoint, response.status_code, response.headers)
+                action = self._response_action(method, response.status_code, response.text, attempt,
+                                               clock is not None and not resynced)
+                if action == ACTION_RESYNC:
+                    self._prepare_resync(endpoint)
+                    resynced = True
+                    continue
+                if action == ACTION_RETRY:
+                    time.sleep(self._prepare_retry(endpoint, attempt, f"返回 {response.status_code}"))
+                    attempt += 1
+                    continue
+
+                # 检查响应状态
+                self._check_status(response.status_code, response.text)
+                with self._stage('parse'):
+                    return response.json()
+                    
+            except requests.exceptions.SSLError as e:
+                logger.error(f"SSL连接错误: {str(e)}")
+                raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if metrics is not None:
+                    self._record_response(endpoint, instruction, None, 0.0)
+                if self._response_action(method, None, '', attempt, False) == ACTION_RETRY:
+                    time.sleep(self._prepare_retry(endpoint, attempt, f"连接错误: {str(e)}"))
+                    attempt += 1
+                    continue
+                logger.error(f"请求错误: {str(e)}")
+                raise
+            except requests.exceptions.RequestException as e:
+                logger.error(f"请求错误: {str(e)}")
+                raise
+            except Exception as e:
+                logger.error(f"未知错误: {str(e)}")
+                raise
+
+    def sync_clock(self) -> bool:
+        """
+        通过 /api/v1/time 校准服务器时间偏差（绕过请求调度器，往返时间只包含网络与服务端处理时间）
+        :return: 是否校准成功
+        """
+        if self.clock is None:
+            return False
+        with self._clock_lock:
+            # 等待期间其他线程可能已经完成校准
+            if not self.clock.needs_sync():
+                return True
+            return self._sync_clock()
+
+    def _sync_clock(self) -> bool:
         try:
-            # 生成签名和请求头
-            sign_data = self._sign_request(method, path, params, data, instruction)
-            
-            # 构建完整URL
-            url = f"{self.baseUrl}{path}"
-            if params:
-                # 处理列表类型的参数
-                query_parts = []
-                for k, v in sorted(params.items()):
-                    if isinstance(v, list):
-                        # 对于列表类型的参数，将每个元素单独添加
-                        for item in v:
-                            query_parts.append(f"{k}={item}")
-                    else:
-                        query_parts.append(f"{k}={v}")
-                query_string = '&'.join(query_parts)
-                url = f"{url}?{query_string}"
-            
-            # 记录请求信息
-            logger.debug(f"发送请求:")
-            logger.debug(f"URL: {url}")
-            logger.debug(f"方法: {method}")
-            logger.debug(f"参数: {params}")
-            logger.debug(f"数据: {data}")
-            logger.debug(f"指令类型: {instruction}")
-            logger.debug(f"请求头: {sign_data[1]}")
-            
-            # 发送请求
-            response = self.session.request(
-                method=method,
-                url=url,
-                headers=sign_data[1],
-                json=data,
-                verify=True
-            )
-            # 记录响应信息
-            logger.debug(f"响应状态码: {response.status_code}")
-            logger.debug(f"响应头: {response.headers}")
-            logger.debug(f"响应内容: {response.text}")
-            
-            # 检查响应状态
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 401:
-                raise Exception("API认证失败，请检查API密钥和签名")
-            elif response.status_code == 403:
-                raise Exception("没有权限访问该接口")
-            elif response.status_code == 404:
-                raise Exception("请求的资源不存在")
-            elif response.status_code == 429:
-                raise Exception("请求频率超限")
-            else:
-                raise Exception(f"请求失败: {response.text}")
-                
-        except requests.exceptions.SSLError as e:
-            logger.error(f"SSL连接错误: {str(e)}")
-            raise
-        except requests.exceptions.RequestException as e:
-            logger.error(f"请求错误: {str(e)}")
-            raise
+            endpoint = 'GET /api/v1/time'
+            self.rate_limiter.acquire(endpoint, True)
+            sent = time.time()
+            response = self.session.get(f"{self.baseUrl}/api/v1/time", timeout=self.timeout / 1000)
+            received = time.time()
+            self.rate_limiter.on_response(endpoint, response.status_code, response.headers)
+            self._check_status(response.status_code, response.text)
+            self.clock.add_sample(sent, received, float(response.json()))
+            self._record_clock()
+            return True
         except Exception as e:
-            logger.error(f"未知错误: {str(e)}")
-            raise
+            logger.warning(f"同步服务器时间失败: {str(e)}")
+            self.clock.sync_failed()
+            return False
 
     def fetch_ticker(self, symbol: str, is_futures: bool = False) -> Dict:
         """获取当前行情信息"""
@@ -212,6 +790,20 @@ class BackpackExchange(ccxt.Exchange):
         response = self._request('GET', path, params)
         return self._parse_ticker(response)
 
+    def fetch_tickers(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        一次请求获取所有交易对的行情
+        :param symbols: 只返回这些交易对，为 None 时返回全部
+        :return: 交易对 -> 行情
+        """
+        response = self._request('GET', '/api/v1/tickers')
+        wanted = set(symbols) if symbols is not None else None
+        return {
+            ticker['symbol']: self._parse_ticker(ticker)
+            for ticker in response
+            if wanted is None or ticker['symbol'] in wanted
+        }
+
     def create_order(self, symbol: str, type: str, side: str, amount: float, 
                     price: Optional[float] = None, is_futures: bool = False,
                     leverage: Optional[int] = None, margin_type: Optional[str] = None,
@@ -267,70 +859,23 @@ class BackpackExchange(ccxt.Exchange):
             path = '/api/v1/futures/order'
         else:
             path = '/api/v1/order'
-            
-            
-        # 生成唯一的 clientId (确保在 uint32 范围内)
-        if client_id is None:
-            # 使用当前时间戳的后 8 位数字作为 clientId
-            client_id = int(time.time() * 1000) % 100000000
-            
-        # 准备请求体数据
-        order_data = {
-            'symbol': symbol,
-            'side': 'Ask' if side == 'Ask' else 'Bid',
-            'orderType': type.capitalize(),  # Market 或 Limit
-            'quantity': amount,  # 使用格式化后的数量
-            'timeInForce': time_in_force,
-            'reduceOnly': reduce_only,
-            'selfTradePrevention': self_trade_prevention,
-            'clientId': client_id
-        }
-        
-        # 只在限价单时添加 postOnly 参数
-        if type.lower() == 'limit' and post_only:
-            order_data['postOnly'] = post_only
-        
-        # 添加可选参数
-        if price:
-            order_data['price'] = str(price)
-        if quote_quantity:
-            order_data['quoteQuantity'] = str(quote_quantity)
-        if stop_loss_limit_price:
-            order_data['stopLossLimitPrice'] = str(stop_loss_limit_price)
-        if stop_loss_trigger_by:
-            order_data['stopLossTriggerBy'] = stop_loss_trigger_by
-        if stop_loss_trigger_price:
-            order_data['stopLossTriggerPrice'] = str(stop_loss_trigger_price)
-        if take_profit_limit_price:
-            order_data['takeProfitLimitPrice'] = str(take_profit_limit_price)
-        if take_profit_trigger_by:
-            order_data['takeProfitTriggerBy'] = take_profit_trigger_by
-        if take_profit_trigger_price:
-            order_data['takeProfitTriggerPrice'] = str(take_profit_trigger_price)
-        if trigger_by:
-            order_data['triggerBy'] = trigger_by
-        if trigger_price:
-            order_data['triggerPrice'] = str(trigger_price)
-        if trigger_quantity:
-            order_data['triggerQuantity'] = trigger_quantity
-            
-        # 合约订单特有参数
-        if is_futures:
-            if leverage:
-                order_data['leverage'] = str(leverage)
-            if margin_type:
-                order_data['marginType'] = margin_type.lower()
-                
-        # 现货杠杆特有参数
-        if not is_futures:
-            if auto_lend:
-                order_data['autoLend'] = auto_lend
-            if auto_lend_redeem:
-                order_data['autoLendRedeem'] = auto_lend_redeem
-            if auto_borrow:
-                order_data['autoBorrow'] = auto_borrow
-            if auto_borrow_repay:
-                order_data['autoBorrowRepay'] = auto_borrow_repay
+
+        order_data = self._build_order_data(
+            symbol, type, side, amount, price=price, is_futures=is_futures,
+            leverage=leverage, margin_type=margin_type, client_id=client_id,
+            post_only=post_only, quote_quantity=quote_quantity, reduce_only=reduce_only,
+            self_trade_prevention=self_trade_prevention, time_in_force=time_in_force,
+            stop_loss_limit_price=stop_loss_limit_price,
+            stop_loss_trigger_by=stop_loss_trigger_by,
+            stop_loss_trigger_price=stop_loss_trigger_price,
+            take_profit_limit_price=take_profit_limit_price,
+            take_profit_trigger_by=take_profit_trigger_by,
+            take_profit_trigger_price=take_profit_trigger_price,
+            trigger_by=trigger_by, trigger_price=trigger_price,
+            trigger_quantity=trigger_quantity, auto_lend=auto_lend,
+            auto_lend_redeem=auto_lend_redeem, auto_borrow=auto_borrow,
+            auto_borrow_repay=auto_borrow_repay
+        )
         
         # 记录订单数据
         logger.info(f"创建订单数据: {order_data}")
@@ -338,6 +883,25 @@ class BackpackExchange(ccxt.Exchange):
         response = self._request('POST', path, data=order_data, instruction='orderExecute')
         return self._parse_order(response)
 
+    def create_orders(self, orders: List[Dict]) -> List[Dict]:
+        """
+        批量创建订单（使用交易所批量下单接口）
+        :param orders: 订单参数列表，每个元素的键与 create_order 的参数一致
+        :return: 与输入顺序一致的结果列表，失败的订单包含 error 字段且 id 为 None
+        """
+        results = []
+        for batch_data in self._prepare_batches(orders):
+            logger.info(f"批量创建订单: {len(batch_data)} 个")
+            try:
+                response = self._request('POST', '/api/v1/orders', data=batch_data, instruction='orderExecute')
+            except Exception as e:
+                logger.error(f"批量创建订单失败: {str(e)}")
+                results.extend(self._batch_error(order_data, str(e)) for order_data in batch_data)
+                continue
+            results.extend(self._parse_batch_response(batch_data, response))
+
+        return results
+
     def cancel_order(self, order_id: str, symbol: str) -> Dict:
         """
         取消订单
@@ -365,6 +929,48 @@ class BackpackExchange(ccxt.Exchange):
             logger.error(f"取消订单时出错: {str(e)}")
             raise
 
+    def cancel_all_orders(self, symbol: str, max_workers: int = 8) -> List[Dict]:
+        """
+        取消交易对的所有未完成订单（单次请求）
+        批量撤单接口失败时，改为并行逐个撤单
+        :param symbol: 交易对
+        :param max_workers: 并行撤单的最大线程数
+        :return: 已取消的订单列表
+        """
+        try:
+            response = self._request('DELETE', '/api/v1/orders', data={'symbol': symbol}, instruction='orderCancelAll')
+            cancelled = [self._parse_order(order) for order in (response or [])]
+            logger.info(f"批量撤单完成: {symbol} 共取消 {len(cancelled)} 个订单")
+            return cancelled
+        except Exception as e:
+            logger.warning(f"批量撤单失败，改为并行逐个撤单: {str(e)}")
+
+        order_ids = [order['id'] for order in self.fetch_open_orders(symbol) if order.get('id')]
+        return self.cancel_orders(order_ids, symbol, max_workers)
+
+    def cancel_orders(self, order_ids: List[str], symbol: str, max_workers: int = 8) -> List[Dict]:
+        """
+        并行取消多个订单
+        :param order_ids: 订单ID列表
+        :param symbol: 交易对
+        :param max_workers: 并行撤单的最大线程数
+        :return: 已取消的订单列表
+        """
+        cancelled = []
+        if not order_ids:
+            return cancelled
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(order_ids))) as pool:
+            futures = {pool.submit(self.cancel_order, order_id, symbol): order_id for order_id in order_ids}
+            for future in as_completed(futures):
+                try:
+                    cancelled.append(self._parse_order(future.result()))
+                except Exception as e:
+                    logger.error(f"取消订单 {futures[future]} 失败: {str(e)}")
+
+        logger.info(f"并行撤单完成: {symbol} 共取消 {len(cancelled)} / {len(order_ids)} 个订单")
+        return cancelled
+
     def fetch_order(self, order_id: str, symbol: str, is_futures: bool = False) -> Dict:
         """
         获取订单信息
@@ -435,184 +1041,32 @@ class BackpackExchange(ccxt.Exchange):
         """
         try:
             # 获取账户资金信息
-            logger.debug(f"获取账户资金信息")
+            logger.debug("获取账户资金信息")
             response = self._request('GET', '/api/v1/capital', instruction='balanceQuery')
             logger.debug(f"资金信息响应: {response}")
             
             # 处理余额信息
-            balances = {}
-            for currency, balance_info in response.items():
-                balances[currency] = {
-                    'free': float(balance_info.get('available', 0)),
-                    'used': float(balance_info.get('locked', 0)),
-                    'total': float(balance_info.get('available', 0)) + float(balance_info.get('locked', 0))
-                }
-            
-            return balances
+            return self._parse_balance(response)
             
         except Exception as e:
             logger.error(f"获取账户余额时出错: {str(e)}")
             raise
 
-    def _parse_ticker(self, response: Dict) -> Dict:
-        """解析行情响应"""
-        # 打印原始响应数据以便调试
-        return {
-            'symbol': response['symbol'],
-            'last': float(response.get('lastPrice', 0)),
-            'bid': float(response.get('bidPrice', 0)),
-            'ask': float(response.get('askPrice', 0)),
-            'volume': float(response.get('volume', 0)),
-            'high': float(response.get('high', 0)),
-            'low': float(response.get('low', 0)),
-            'change': float(response.get('priceChange', 0))
-        }
-
-    def _parse_order(self, order: Dict) -> Dict:
-        """
-        解析订单信息
-        :param order: 原始订单数据
-        :return: 解析后的订单信息
-        """
-        try:
-            return {
-                'id': order.get('id'),
-                'clientId': order.get('clientId'),
-                'symbol': order.get('symbol'),
-                'side': order.get('side'),
-                'type': order.get('orderType'),
-                'price': float(order.get('price', 0)),
-                'amount': float(order.get('quantity', 0)),
-                'filled': float(order.get('executedQuantity', 0)),
-                'cost': float(order.get('executedQuoteQuantity', 0)),
-                'status': order.get('status'),
-                'timeInForce': order.get('timeInForce'),
-                'reduceOnly': order.get('reduceOnly', False),
-                'selfTradePrevention': order.get('selfTradePrevention'),
-                'createdAt': order.get('createdAt'),
-                'triggeredAt': order.get('triggeredAt'),
-                'stopLossTriggerPrice': order.get('stopLossTriggerPrice'),
-                'stopLossLimitPrice': order.get('stopLossLimitPrice'),
-                'stopLossTriggerBy': order.get('stopLossTriggerBy'),
-                'takeProfitTriggerPrice': order.get('takeProfitTriggerPrice'),
-                'takeProfitLimitPrice': order.get('takeProfitLimitPrice'),
-                'takeProfitTriggerBy': order.get('takeProfitTriggerBy'),
-                'triggerBy': order.get('triggerBy'),
-                'triggerPrice': order.get('triggerPrice'),
-                'triggerQuantity': order.get('triggerQuantity'),
-                'relatedOrderId': order.get('relatedOrderId')
-            }
-        except Exception as e:
-            logger.error(f"解析订单信息时出错: {str(e)}")
-            raise
-
-    def _parse_markets(self, response: List[Dict]) -> List[Dict]:
-        """解析交易对信息"""
-        markets = []
-        for market in response:
-            try:
-                symbol = market['symbol']
-                # 打印原始数据以便调试
-                logger.info(f"原始市场数据: {market}")
-                
-                # 尝试不同的分隔符
-                if '-' in symbol:
-                    base, quote = symbol.split('-')
-                elif '_' in symbol:
-                    base, quote = symbol.split('_')
-                else:
-                    # 如果没有分隔符，尝试从最后3个字符分割（假设是USDC）
-                    base = symbol[:-4]
-                    quote = symbol[-4:]
-                
-                markets.append({
-                    'symbol': symbol,
-                    'base': base,
-                    'quote': quote,
-                    'active': True,
-                    'type': 'spot',
-                    'spot': True,
-                    'futures': False
-                })
-                logger.info(f"解析后的交易对: {base}/{quote}")
-            except Exception as e:
-                logger.error(f"解析交易对 {symbol} 时出错: {str(e)}")
-                continue
-        return markets
-
     def fetch_my_trades(self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None, params: Dict = {}) -> List[Dict]:
         path = '/wapi/v1/history/fills'
-        
-        # 构建查询参数
-        query_params = {
-            'symbol': symbol,
-            **params
-        }
-        
-        # 添加时间范围参数
-        if since is not None:
-            query_params['from'] = since
-        if 'to' in params:
-            query_params['to'] = params['to']
-            
-        # 添加分页参数
-        if limit is not None:
-            query_params['limit'] = min(limit, 1000)  # 限制最大值为1000
-        if 'offset' in params:
-            query_params['offset'] = params['offset']
-            
-        # 添加成交类型参数
-        if 'fillType' in params:
-            query_params['fillType'] = params['fillType']
-            
-        # 添加市场类型参数
-        if 'marketType' in params:
-            query_params['marketType'] = params['marketType']
+        query_params = self._build_trades_params(symbol, since, limit, params)
             
         # 发送请求
-        logger.info(f"获取成交历史 - {query_params}")
+        logger.debug(f"获取成交历史 - {query_params}")
         response = self._request('GET', path, query_params, instruction='fillHistoryQueryAll')
         
         # 解析成交记录
-        trades = []
-        for trade in response:
-            # 将 ISO 8601 格式的时间戳转换为毫秒时间戳
-            timestamp_str = trade.get('timestamp')
-            if timestamp_str:
-                # 移除毫秒部分，只保留到秒
-                timestamp_str = timestamp_str.split('.')[0]
-                # 将 ISO 8601 格式转换为时间戳
-                timestamp = int(time.mktime(time.strptime(timestamp_str, '%Y-%m-%dT%H:%M:%S')) * 1000)
-            else:
-                timestamp = None
-                
-            parsed_trade = {
-                'id': str(trade.get('tradeId')),  # 使用 tradeId 作为成交ID
-                'order': trade.get('orderId'),
-                'clientId': trade.get('clientId'),
-                'timestamp': timestamp,
-                'datetime': trade.get('timestamp'),  # 直接使用原始的时间戳字符串
-                'symbol': trade.get('symbol'),
-                'side': 'buy' if trade.get('side') == 'Bid' else 'sell',
-                'price': float(trade.get('price')),
-                'amount': float(trade.get('quantity')),
-                'cost': float(trade.get('price')) * float(trade.get('quantity')),
-                'fee': {
-                    'currency': trade.get('feeSymbol'),
-                    'cost': float(trade.get('fee')),
-                    'rate': float(trade.get('fee')) / (float(trade.get('price')) * float(trade.get('quantity')))
-                },
-                'isMaker': trade.get('isMaker', False),
-                'systemOrderType': trade.get('systemOrderType')
-            }
-            trades.append(parsed_trade)
-            
-        return trades
+        return [self._parse_trade(trade) for trade in response]
 
-    def fetch_open_orders(self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None, params: Dict = {}) -> List[Dict]:
+    def fetch_open_orders(self, symbol: Optional[str], since: Optional[int] = None, limit: Optional[int] = None, params: Dict = {}) -> List[Dict]:
         """
         获取未完成订单列表
-        :param symbol: 交易对
+        :param symbol: 交易对，为 None 时返回所有交易对的未完成订单
         :param since: 开始时间戳
         :param limit: 返回订单数量限制
         :param params: 额外参数
@@ -620,26 +1074,10 @@ class BackpackExchange(ccxt.Exchange):
         """
         path = '/api/v1/orders'
         
-        # 构建查询参数
-        query_params = {
-            'symbol': symbol,
-            'marketType': 'SPOT',  # 默认为现货市场
-            **params
-        }
-        
-        # 添加分页参数
-        if limit is not None:
-            query_params['limit'] = min(limit, 1000)  # 限制最大值为1000
-        if 'offset' in params:
-            query_params['offset'] = params['offset']
+        query_params = self._build_open_orders_params(symbol, limit, params)
             
         # 发送请求
         response = self._request('GET', path, query_params, instruction='orderQueryAll')
         
         # 解析订单列表
-        orders = []
-        for order in response:
-            parsed_order = self._parse_order(order)
-            orders.append(parsed_order)
-            
-        return orders 
\ No newline at end of file
+        return [self._parse_order(order) for order in response]
@@ -0,0 +1,282 @@
+import json
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import websocket
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WS_URL = 'wss://ws.backpack.exchange'
+
+
+class BackpackStream:
+    """
+    Backpack WebSocket 订阅基类
+    在后台线程中维持连接，断线后按指数退避自动重连并重新订阅
+    子类实现 handle_message 处理推送数据
+    """
+
+    def __init__(self, streams: List[str], ws_url: str = DEFAULT_WS_URL,
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 30.0,
+                 ping_interval: float = 20.0):
+        """
+        :param streams: 订阅的数据流名称列表
+        :param ws_url: WebSocket 地址
+        :param reconnect_delay: 首次重连等待时间（秒）
+        :param max_reconnect_delay: 最大重连等待时间（秒）
+        :param ping_interval: 心跳间隔（秒）
+        """
+        self.streams = streams
+        self.ws_url = ws_url
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.ping_interval = ping_interval
+
+        self._ws: Optional[websocket.WebSocketApp] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._connected = threading.Event()
+        self._connections = 0
+
+    @property
+    def connected(self) -> bool:
+        """连接是否已建立且订阅已生效（已收到订阅数据流的首条消息）"""
+        return self._connected.is_set()
+
+    @property
+    def connections(self) -> int:
+        """订阅生效过的连接次数，每次重连后订阅生效时加一"""
+        return self._connections
+
+    def start(self):
+        """启动后台连接线程"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """停止连接并等待后台线程退出"""
+        self._stop_event.set()
+        if self._ws is not None:
+            self._ws.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._connected.clear()
+
+    def wait_connected(self, timeout: float) -> bool:
+        """等待连接建立，返回是否已连接"""
+        return self._connected.wait(timeout)
+
+    def _subscribe_message(self) -> Dict:
+        """构建订阅消息"""
+        return {'method': 'SUBSCRIBE', 'params': self.streams}
+
+    def _run(self):
+        """连接主循环，断线后自动重连"""
+        delay = self.reconnect_delay
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            self._ws = websocket.WebSocketApp(
+                self.ws_url,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            try:
+                self._ws.run_forever(ping_interval=self.ping_interval, ping_timeout=self.ping_interval / 2)
+            except Exception as e:
+                logger.error(f"WebSocket 运行错误: {e}")
+            self._connected.clear()
+
+            if self._stop_event.is_set():
+                break
+            # 连接稳定运行过一段时间则重置退避时间
+            if time.monotonic() - started > self.max_reconnect_delay:
+                delay = self.reconnect_delay
+            logger.warning(f"WebSocket 连接断开，{delay:.1f} 秒后重连: {self.ws_url}")
+            self._stop_event.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _on_open(self, ws):
+        # 订阅可能被拒绝（如签名错误），收到订阅数据流的首条消息后才视为已连接
+        ws.send(json.dumps(self._subscribe_message()))
+        logger.info(f"WebSocket 已连接，等待订阅生效: {self.streams}")
+
+    def _on_message(self, ws, message: str):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            logger.warning(f"无法解析的 WebSocket 消息: {message}")
+            return
+        data = payload.get('data')
+        if data is None:
+            if 'error' in payload:
+                logger.error(f"WebSocket 订阅错误: {payload['error']}")
+            return
+        stream = payload.get('stream')
+        if stream in self.streams and not self._connected.is_set():
+            self._connections += 1
+            self._connected.set()
+            logger.info(f"WebSocket 订阅已生效: {self.streams}")
+        try:
+            self.handle_message(stream, data)
+        except Exception as e:
+            logger.error(f"处理 WebSocket 消息错误: {e}")
+
+    def _on_error(self, ws, error):
+        logger.error(f"WebSocket 错误: {error}")
+
+    def _on_close(self, ws, status_code, message):
+        self._connected.clear()
+        logger.info(f"WebSocket 连接关闭: {status_code} {message}")
+
+    def handle_message(self, stream: str, data: Dict):
+        """处理推送数据，由子类实现"""
+        raise NotImplementedError
+
+
+class MarketDataStream(BackpackStream):
+    """
+    行情数据流：订阅 ticker 与 bookTicker，维护线程安全的最新价格快照
+    读取快照不产生任何网络请求；连接不可用或快照过期时回退到 REST 行情接口
+    """
+
+    def __init__(self, symbol: str, exchange=None, ws_url: str = DEFAULT_WS_URL, max_age: float = 60.0, **kwargs):
+        """
+        :param symbol: 交易对
+        :param exchange: 用于 REST 回退的交易所客户端，为 None 时不回退
+        :param ws_url: WebSocket 地址
+        :param max_age: 快照超过该秒数未更新时视为过期（连接仍在但推送中断）
+        """
+        super().__init__([f"ticker.{symbol}", f"bookTicker.{symbol}"], ws_url, **kwargs)
+        self.symbol = symbol
+        self.exchange = exchange
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._snapshot = {'last': None, 'bid': None, 'ask': None, 'timestamp': 0.0}
+        self._listeners: List[Callable[[float], None]] = []
+
+    def add_listener(self, callback: Callable[[float], None]):
+        """注册价格更新回调，回调在 WebSocket 线程中执行"""
+        self._listeners.append(callback)
+
+    def handle_message(self, stream: str, data: Dict):
+        event = data.get('e')
+        with self._lock:
+            if event == 'ticker':
+                self._snapshot['last'] = float(data['c'])
+            elif event == 'bookTicker':
+                self._snapshot['bid'] = float(data['b'])
+                self._snapshot['ask'] = float(data['a'])
+            else:
+                return
+            self._snapshot['timestamp'] = time.time()
+            price = self._price_locked()
+
+        if price is not None:
+            for callback in self._listeners:
+                callback(price)
+
+    def _price_locked(self) -> Optional[float]:
+        """在持有锁的情况下计算当前价格：优先最新成交价，否则取买卖中间价"""
+        if self._snapshot['last'] is not None:
+            return self._snapshot['last']
+        if self._snapshot['bid'] is not None and self._snapshot['ask'] is not None:
+            return (self._snapshot['bid'] + self._snapshot['ask']) / 2
+        return None
+
+    def get_snapshot(self) -> Dict:
+        """获取行情快照副本"""
+        with self._lock:
+            return dict(self._snapshot)
+
+    def get_price(self) -> Optional[float]:
+        """
+        获取当前价格
+        连接正常且快照未过期时直接读取内存快照，否则通过 REST 获取并刷新快照
+        :return: 当前价格，无法获取时返回 None
+        """
+        if self.connected:
+            with self._lock:
+                price = self._price_locked()
+                fresh = time.time() - self._snapshot['timestamp'] <= self.max_age
+            if price is not None and fresh:
+                return price
+
+        if self.exchange is None:
+            return None
+        ticker = self.exchange.fetch_ticker(self.symbol)
+        with self._lock:
+            self._snapshot['last'] = float(ticker['last'])
+            self._snapshot['bid'] = float(ticker['bid'])
+            self._snapshot['ask'] = float(ticker['ask'])
+            self._snapshot['timestamp'] = time.time()
+        return float(ticker['last'])
+
+
+class OrderUpdateStream(BackpackStream):
+    """
+    私有订单更新流：订阅 account.orderUpdate.<symbol>
+    订阅消息使用与 REST 相同的 ED25519 签名（instruction=subscribe），每次重连重新签名
+    """
+
+    def __init__(self, symbol: str, exchange, ws_url: str = DEFAULT_WS_URL, **kwargs):
+        """
+        :param symbol: 交易对
+        :param exchange: 提供 API 密钥与签名逻辑的交易所客户端
+        :param ws_url: WebSocket 地址
+        """
+        super().__init__([f"account.orderUpdate.{symbol}"], ws_url, **kwargs)
+        self.symbol = symbol
+        self.exchange = exchange
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """注册订单事件回调，回调在 WebSocket 线程中执行"""
+        self._listeners.append(callback)
+
+    def _subscribe_message(self) -> Dict:
+        _, headers = self.exchange._sign_request('GET', '', instruction='subscribe')
+        return {
+            'method': 'SUBSCRIBE',
+            'params': self.streams,
+            'signature': [headers['X-API-KEY'], headers['X-SIGNATURE'], headers['X-TIMESTAMP'], headers['X-WINDOW']]
+        }
+
+    def handle_message(self, stream: str, data: Dict):
+        event = self._parse_order_event(data)
+        for callback in self._listeners:
+            callback(event)
+
+    def _parse_order_event(self, data: Dict) -> Dict:
+        """
+        解析订单更新事件
+        :param data: 原始推送数据
+        :return: 解析后的订单事件
+        """
+        executed = float(data.get('z') or 0)
+        executed_quote = float(data.get('Z') or 0)
+        return {
+            'event': data.get('e'),
+            'id': data.get('i'),
+            'clientId': data.get('c'),
+            'symbol': data.get('s'),
+            'side': data.get('S'),
+            'status': data.get('X'),
+            'price': float(data.get('p') or 0),
+            'amount': float(data.get('q') or 0),
+            'filled': executed,
+            'average': executed_quote / executed if executed else None,
+            'fillPrice': float(data['L']) if data.get('L') else None,
+            'fillAmount': float(data['l']) if data.get('l') else None,
+            'fee': float(data['n']) if data.get('n') else None,
+            'feeCurrency': data.get('N'),
+            'tradeId': data.get('t'),
+            'isMaker': data.get('m'),
+            'timestamp': data.get('T') or data.get('E')
+        }
@@ -0,0 +1,247 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from grid_ladder import GridLadder
+from grid_reconciler import GridReconciler
+
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TIME_COLUMNS = ('timestamp', 'time', 'start', 'open_time')
+
+
+def load_prices(path: str) -> Dict[str, np.ndarray]:
+    """
+    加载历史行情
+    支持带表头的 CSV（K线: open/high/low/close，成交: price）以及 np.savez 保存的 .npz 文件
+    :param path: 文件路径
+    :return: {'timestamp', 'open', 'high', 'low', 'close'} 数组
+    """
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            columns = {name: data[name] for name in data.files}
+    else:
+        table = np.genfromtxt(path, delimiter=',', names=True, dtype=None, encoding='utf-8')
+        columns = {name.lower(): table[name] for name in table.dtype.names}
+
+    if 'close' not in columns:
+        if 'price' not in columns:
+            raise Exception(f"无法识别的行情文件: {path}，需要 close 或 price 列")
+        price = columns['price'].astype(np.float64)
+        columns.update(open=price, high=price, low=price, close=price)
+    prices = {name: columns[name].astype(np.float64) for name in ('open', 'high', 'low', 'close')}
+    timestamp = next((columns[name] for name in TIME_COLUMNS if name in columns), None)
+    prices['timestamp'] = np.arange(len(prices['close'])) if timestamp is None else timestamp
+    return prices
+
+
+def backtest(prices: Dict[str, np.ndarray], lower_price: float, upper_price: float, grid_number: int,
+             grid_type: str = 'arithmetic', investment: float = 1000.0, min_order_size: float = 0.001,
+             tick_size: float = 0.01, step_size: float = 0.001, fee_rate: float = 0.001,
+             check_every: int = 1, initial_quote: Optional[float] = None, initial_base: float = 0.0,
+             stop_loss_price: float = 0.0, take_profit_price: float = float('inf'),
+             price_range: float = None) -> Dict:
+    """
+    回测网格策略（与 GridTrader 相同的网格档位与对账规则）
+    网格留出一个空档位（初始为距离开盘价最近的档位）：每个检查周期开始时在空档位下方挂买单、上方挂卖单，
+    由近到远分配余额，只在当前价格上下 price_range 范围内挂单；周期内价格穿过挂单价才成交
+    （只挂单不吃单，成交价为挂单价），买单成交后空档位下移到成交档位、卖单成交后上移，
+    已成交的档位要到下一个周期才重新挂单；价格越过空档位的相邻档位而没有成交时空档位跟随价格移动。
+    各周期的价格极值及其所在档位以向量化方式预先计算
+    :param prices: load_prices 返回的行情
+    :param check_every: 检查周期包含的K线数量（对应 CHECK_INTERVAL）
+    :param fee_rate: 挂单手续费率，以计价货币扣除
+    :param initial_quote: 初始计价货币，默认等于 investment
+    :param initial_base: 初始基础货币
+    :param price_range: 挂单价格范围，默认与 GridReconciler 相同
+    :return: 回测结果
+    """
+    reconciler = GridReconciler()
+    price_range = reconciler.price_range if price_range is None else price_range
+    ladder = GridLadder(lower_price, upper_price, grid_number, grid_type, investment, min_order_size,
+                        tick_size, step_size)
+    levels = ladder.price_list()
+    cum_amount = np.concatenate([[0.0], np.cumsum(ladder.amounts)]).tolist()
+    cum_notional = np.concatenate([[0.0], np.cumsum(ladder.notionals)]).tolist()
+
+    bars = len(prices['close'])
+    starts = np.arange(0, bars, check_every)
+    # 每个周期内的最低价与最高价所在档位：买单在价格低于挂单价时成交，卖单在价格高于挂单价时成交
+    lowest = np.searchsorted(levels, np.minimum.reduceat(prices['low'], starts), side='right').tolist()
+    highest = np.searchsorted(levels, np.maximum.reduceat(prices['high'], starts), side='left').tolist()
+    cycle_open = prices['open'][starts].tolist()
+    cycle_close = prices['close'][np.append(starts[1:] - 1, bars - 1)].tolist()
+
+    quote = float(investment if initial_quote is None else initial_quote)
+    base = float(initial_base)
+    start_equity = quote + base * cycle_open[0]
+    equity = np.empty(len(starts))
+    fills = 0
+    fees = 0.0
+    volume = 0.0
+    stopped_at = None
+    empty = reconciler.nearest_level(levels, cycle_open[0])  # 空档位
+
+    for k, price in enumerate(cycle_open):
+        if price <= stop_loss_price or price >= take_profit_price:
+            stopped_at = k
+            equity[k:] = quote + base * np.array(cycle_close[k:])
+            break
+
+        # 价格越过空档位的相邻档位（该档位没有挂单成交）时，空档位跟随价格移动
+        if empty > 0 and price < levels[empty - 1]:
+            empty = min(empty, reconciler.nearest_level(levels, price))
+        elif empty < len(levels) - 1 and price > levels[empty + 1]:
+            empty = max(empty, reconciler.nearest_level(levels, price))
+
+        below = min(empty, bisect_left(levels, price))  # 买单档位 [.., below)
+        above = max(empty + 1, bisect_right(levels, price))  # 卖单档位 [above, ..)
+        window_low = bisect_left(levels, price * (1 - price_range))
+        window_high = bisect_right(levels, price * (1 + price_range))
+
+        # 由近到远分配余额
+        bid_low = max(window_low, bisect_left(cum_notional, cum_notional[below] - quote / (1 + fee_rate) - 1e-12))
+        ask_high = min(window_high, bisect_right(cum_amount, cum_amount[above] + base * (1 - reconciler.fee_rate) + 1e-12) - 1)
+
+        # 周期内价格穿过的档位成交
+        filled_low = max(bid_low, lowest[k])
+        if filled_low < below:
+            bought = cum_amount[below] - cum_amount[filled_low]
+            cost = cum_notional[below] - cum_notional[filled_low]
+            base += bought
+            quote -= cost * (1 + fee_rate)
+            fills += below - filled_low
+            fees += cost * fee_rate
+            volume += cost
+        filled_high = min(ask_high, highest[k])
+        if filled_high > above:
+            sold = cum_amount[filled_high] - cum_amount[above]
+            proceeds = cum_notional[filled_high] - cum_notional[above]
+            base -= sold
+            quote += proceeds * (1 - fee_rate)
+            fills += filled_high - above
+            fees += proceeds * fee_rate
+            volume += proceeds
+
+        # 买单成交后空档位下移到最低的成交档位，卖单成交后上移到最高的成交档位；
+        # 同一周期两侧都有成交时取收盘价附近的档位
+        if filled_low < below and filled_high > above:
+            empty = min(max(reconciler.nearest_level(levels, cycle_close[k]), filled_low), filled_high - 1)
+        elif filled_low < below:
+            empty = filled_low
+        elif filled_high > above:
+            empty = filled_high - 1
+        equity[k] = quote + base * cycle_close[k]
+
+    drawdown = 1 - equity / np.maximum.accumulate(equity)
+    return {
+        'lower_price': lower_price,
+        'upper_price': upper_price,
+        'grid_number': grid_number,
+        'grid_type': grid_type,
+        'check_every': check_every,
+        'final_equity': float(equity[-1]),
+        'return': float(equity[-1] / start_equity - 1),
+        'benchmark_return': float(prices['close'][-1] / prices['open'][0] - 1),
+        'max_drawdown': float(drawdown.max()),
+        'fills': fills,
+        'fees': fees,
+        'volume': volume,
+        'final_base': base,
+        'final_quote': quote,
+        'stopped_at': None if stopped_at is None else int(starts[stopped_at]),
+    }
+
+
+_worker_prices = None
+
+
+def _init_worker(path: str):
+    global _worker_prices
+    _worker_prices = load_prices(path)
+
+
+def _run_worker(params: Dict) -> Dict:
+    return backtest(_worker_prices, **params)
+
+
+def sweep(path: str, param_grid: Dict[str, Iterable], workers: Optional[int] = None) -> List[Dict]:
+    """
+    参数扫描：对所有参数组合并行回测，每个进程只加载一次行情
+    :param path: 行情文件
+    :param param_grid: 参数名 -> 取值列表
+    :param workers: 进程数，默认为 CPU 核数
+    :return: 按收益率从高到低排序的回测结果
+    """
+    names = list(param_grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as executor:
+        results = list(executor.map(_run_worker, combos, chunksize=max(1, len(combos) // ((workers or os.cpu_count() or 1) * 4))))
+    results.sort(key=lambda result: result['return'], reverse=True)
+    return results
+
+
+def _parse_list(value: str, cast) -> List:
+    return [cast(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='网格策略回测')
+    parser.add_argument('data', help='行情文件（CSV 或 .npz）')
+    parser.add_argument('--lower-price', required=True, help='网格下限，逗号分隔多个取值')
+    parser.add_argument('--upper-price', required=True, help='网格上限，逗号分隔多个取值')
+    parser.add_argument('--grid-number', required=True, help='网格数量，逗号分隔多个取值')
+    parser.add_argument('--grid-type', default='arithmetic', help='arithmetic / geometric，逗号分隔多个取值')
+    parser.add_argument('--check-every', default='1', help='检查周期包含的K线数量，逗号分隔多个取值')
+    parser.add_argument('--investment', type=float, default=1000.0)
+    parser.add_argument('--initial-base', type=float, default=0.0)
+    parser.add_argument('--min-order-size', type=float, default=0.001)
+    parser.add_argument('--tick-size', type=float, default=0.01)
+    parser.add_argument('--step-size', type=float, default=0.001)
+    parser.add_argument('--fee-rate', type=float, default=0.001)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=10, help='输出收益最高的结果数量')
+    parser.add_argument('--output', help='将全部结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    fixed = {
+        'investment': [args.investment], 'initial_base': [args.initial_base], 'min_order_size': [args.min_order_size],
+        'tick_size': [args.tick_size], 'step_size': [args.step_size], 'fee_rate': [args.fee_rate],
+    }
+    param_grid = {
+        'lower_price': _parse_list(args.lower_price, float),
+        'upper_price': _parse_list(args.upper_price, float),
+        'grid_number': _parse_list(args.grid_number, int),
+        'grid_type': _parse_list(args.grid_type, str),
+        'check_every': _parse_list(args.check_every, int),
+        **fixed
+    }
+
+    started = time.time()
+    results = sweep(args.data, param_grid, args.workers)
+    logger.info(f"完成 {len(results)} 组参数回测，用时 {time.time() - started:.1f} 秒")
+    for result in results[:args.top]:
+        logger.info(
+            f"{result['grid_type']} {result['lower_price']}-{result['upper_price']} x{result['grid_number']} "
+            f"周期 {result['check_every']} | 收益 {result['return'] * 100:.2f}% | 最大回撤 {result['max_drawdown'] * 100:.2f}% | "
+            f"成交 {result['fills']} 笔 | 手续费 {result['fees']:.2f}"
+        )
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceLedger:
+    """
+    本地余额账本
+    以一次 fetch_balance 为基准，下单时在本地预留资金，撤单时释放、成交时结算，
+    余额检查只读内存；定期或按需与交易所重新同步并检测偏差
+    """
+
+    def __init__(self, exchange, resync_interval: float = 300.0, drift_tolerance: float = 1e-6):
+        """
+        :param exchange: 交易所客户端
+        :param resync_interval: 自动重新同步间隔（秒），0 表示只在手动调用 sync 时同步
+        :param drift_tolerance: 允许的相对偏差，超过时记录警告
+        """
+        self.exchange = exchange
+        self.resync_interval = resync_interval
+        self.drift_tolerance = drift_tolerance
+
+        self._lock = threading.RLock()
+        self._free: Dict[str, float] = {}
+        self._locked: Dict[str, float] = {}
+        self._reservations: Dict[str, list] = {}  # order_id -> [currency, 剩余预留数量]
+        # 本地预留的提交时间（time.monotonic），None 表示尚未提交到交易所；同步时据此判断交易所余额是否已包含该预留
+        self._placed_at: Dict[str, Optional[float]] = {}
+        self.last_sync = 0.0
+
+    def sync(self) -> Dict[str, float]:
+        """
+        与交易所重新同步余额
+        余额查询期间其他线程仍可预留，尚未提交或在查询开始后才提交的订单不一定反映在交易所余额中，
+        以交易所余额为基准后重新扣除这些预留，避免多个网格超额分配
+        :return: 各币种本地总额与交易所总额的偏差（交易所 - 本地）
+        """
+        started = time.monotonic()
+        balance = self.exchange.fetch_balance()
+        drift = {}
+        with self._lock:
+            seeded = self.last_sync > 0
+            for currency in set(balance) | set(self._free) | set(self._locked):
+                exchange_total = balance.get(currency, {}).get('total', 0.0)
+                local_total = self._free.get(currency, 0.0) + self._locked.get(currency, 0.0)
+                diff = exchange_total - local_total
+                if seeded and abs(diff) > self.drift_tolerance * max(1.0, abs(exchange_total)):
+                    drift[currency] = diff
+
+            self._free = {currency: info['free'] for currency, info in balance.items()}
+            self._locked = {currency: info['used'] for currency, info in balance.items()}
+            for key, placed in list(self._placed_at.items()):
+                if placed is not None and placed < started:
+                    del self._placed_at[key]  # 查询开始前已提交，交易所余额已包含
+                    continue
+                reservation = self._reservations.get(key)
+                if reservation is not None:
+                    currency, remaining = reservation
+                    self._free[currency] = self._free.get(currency, 0.0) - remaining
+                    self._locked[currency] = self._locked.get(currency, 0.0) + remaining
+            self.last_sync = time.time()
+
+        for currency, diff in drift.items():
+            logger.warning(f"本地余额与交易所存在偏差: {currency} {diff:+.8f}")
+        logger.debug(f"余额已同步: {self._free}")
+        return drift
+
+    def maybe_sync(self) -> Optional[Dict[str, float]]:
+        """未初始化或超过同步间隔时重新同步"""
+        if self.last_sync == 0 or (self.resync_interval > 0 and time.time() - self.last_sync >= self.resync_interval):
+            return self.sync()
+        return None
+
+    def available(self, currency: str) -> float:
+        """获取可用余额"""
+        with self._lock:
+            return self._free.get(currency, 0.0)
+
+    def locked(self, currency: str) -> float:
+        """获取冻结余额"""
+        with self._lock:
+            return self._locked.get(currency, 0.0)
+
+    def can_afford(self, currency: str, amount: float) -> bool:
+        """检查可用余额是否足够"""
+        return self.available(currency) >= amount
+
+    def reserve(self, order_id: str, currency: str, amount: float) -> bool:
+        """
+        为订单预留资金（可用 -> 冻结）
+        交易所已接受的订单即使本地余额不足也会记录，返回值表示本地余额是否足够
+        :param order_id: 订单ID
+        :param currency: 预留币种
+        :param amount: 预留数量
+        :return: 本地可用余额是否足够
+        """
+        with self._lock:
+            sufficient = self._free.get(currency, 0.0) >= amount
+            self._free[currency] = self._free.get(currency, 0.0) - amount
+            self._locked[currency] = self._locked.get(currency, 0.0) + amount
+            self._reservations[order_id] = [currency, amount]
+            self._placed_at[order_id] = time.monotonic()
+        if not sufficient:
+            logger.warning(f"本地{currency}余额不足以预留订单 {order_id}: {amount}，等待下次同步校正")
+        return sufficient
+
+    def try_reserve(self, key: str, currency: str, amount: float, headroom: float = 0.0) -> bool:
+        """
+        可用余额足够时为待提交的订单预留资金，检查与预留在同一把锁内完成，多个网格共享账本时不会超额分配
+        下单成功后用 rename 改为订单ID，下单失败时用 release 释放
+        :param key: 预留键（下单前订单ID未知）
+        :param currency: 预留币种
+        :param amount: 预留数量
+        :param headroom: 除预留数量外还需保留的可用余额（如手续费缓冲）
+        :return: 是否已预留
+        """
+        with self._lock:
+            if self._free.get(currency, 0.0) < amount + headroom:
+                return False
+            self._free[currency] -= amount
+            self._locked[currency] = self._locked.get(currency, 0.0) + amount
+            self._reservations[key] = [currency, amount]
+            self._placed_at[key] = None
+            return True
+
+    def rename(self, key: str, order_id: str):
+        """将 try_reserve 的预留转给交易所返回的订单ID"""
+        with self._lock:
+            reservation = self._reservations.pop(key, None)
+            if reservation is not None:
+                self._reservations[order_id] = reservation
+                self._placed_at.pop(key, None)
+                self._placed_at[order_id] = time.monotonic()
+
+    def track(self, order_id: str, currency: str, amount: float):
+        """
+        登记交易所上已冻结资金的订单（如重启后接管的订单），不改变可用与冻结余额
+        :param order_id: 订单ID
+        :param currency: 冻结币种
+        :param amount: 冻结数量
+        """
+        with self._lock:
+            self._reservations[order_id] = [currency, amount]
+
+    def settle(self, order_id: str, spent: float, received_currency: str, received: float):
+        """
+        结算订单成交：从预留中扣除已花费部分，并把收到的资产计入可用余额
+        :param order_id: 订单ID
+        :param spent: 本次成交花费的预留币种数量
+        :param received_currency: 收到的币种
+        :param received: 收到的数量（已扣除手续费）
+        """
+        with self._lock:
+            reservation = self._reservations.get(order_id)
+            if reservation is not None:
+                currency, remaining = reservation
+                used = min(spent, remaining)
+                self._locked[currency] = self._locked.get(currency, 0.0) - used
+                reservation[1] = remaining - used
+            self._free[received_currency] = self._free.get(received_currency, 0.0) + received
+
+    def release(self, order_id: str) -> float:
+        """
+        释放订单剩余的预留资金（冻结 -> 可用），订单撤销或完全成交后调用
+        :param order_id: 订单ID
+        :return: 释放的数量
+        """
+        with self._lock:
+            reservation = self._reservations.pop(order_id, None)
+            self._placed_at.pop(order_id, None)
+            if reservation is None:
+                return 0.0
+            currency, remaining = reservation
+            self._locked[currency] = self._locked.get(currency, 0.0) - remaining
+            self._free[currency] = self._free.get(currency, 0.0) + remaining
+            return remaining
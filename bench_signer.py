@@ -0,0 +1,102 @@
+import argparse
+import base64
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+import nacl.signing
+
+from request_signer import RequestSigner, canonical_payload, encode_body, encode_query
+
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def legacy_sign(api_key: str, secret: str, instruction: Optional[str], data=None, params: Optional[Dict] = None):
+    """
+    原有的签名流程：每次解码私钥并创建 SigningKey，签名与 URL 各编码一次查询参数，调试日志总是格式化
+    """
+    timestamp = str(int(time.time() * 1000))
+    parts = []
+    if isinstance(data, list):
+        for item in data:
+            if instruction:
+                parts.append(f"instruction={instruction}")
+            parts.append(encode_body(item))
+    else:
+        if instruction:
+            parts.append(f"instruction={instruction}")
+        if data:
+            parts.append(encode_body(data))
+    if params:
+        parts.append(encode_query(params))
+    parts.append(f"timestamp={timestamp}")
+    parts.append("window=5000")
+    message = "&".join(parts)
+    signature = nacl.signing.SigningKey(base64.b64decode(secret)).sign(message.encode('utf-8')).signature
+    signature_b64 = base64.b64encode(signature).decode('utf-8')
+    headers = {'X-API-KEY': api_key, 'X-SIGNATURE': signature_b64, 'X-TIMESTAMP': timestamp,
+               'X-WINDOW': '5000', 'Content-Type': 'application/json'}
+    for value in (timestamp, params, data, instruction, message, signature_b64):
+        logger.debug(f"{value}")
+    url = f"/api/v1/orders?{encode_query(params)}" if params else "/api/v1/orders"
+    return url, headers
+
+
+def cached_sign(signer: RequestSigner, instruction: Optional[str], data=None, params: Optional[Dict] = None):
+    """RequestSigner 的签名流程：查询字符串编码一次，URL 与签名共用"""
+    query = encode_query(params)
+    url = f"/api/v1/orders?{query}" if query else "/api/v1/orders"
+    _, headers = signer.sign(canonical_payload(instruction, data, query))
+    return url, headers
+
+
+def measure(func: Callable, duration: float) -> float:
+    """在 duration 秒内反复调用 func，返回每秒调用次数"""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while True:
+        for _ in range(100):
+            func()
+        count += 100
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - start)
+
+
+def sample_cases(batch_size: int) -> List[tuple]:
+    """(名称, instruction, 请求体, 查询参数)"""
+    order = {'symbol': 'SOL_USDC', 'side': 'Bid', 'orderType': 'Limit', 'price': '150.25',
+             'quantity': '0.5', 'postOnly': True, 'clientId': 123456}
+    return [
+        ('查询', 'orderQueryAll', None, {'symbol': 'SOL_USDC'}),
+        ('单笔下单', 'orderExecute', order, None),
+        (f'批量下单({batch_size})', 'orderExecute', [dict(order, clientId=i) for i in range(batch_size)], None),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='请求签名性能测试（每秒签名次数）')
+    parser.add_argument('--duration', type=float, default=1.0, help='每项测试的时长（秒）')
+    parser.add_argument('--batch-size', type=int, default=10, help='批量下单的订单数量')
+    args = parser.parse_args()
+
+    secret = base64.b64encode(bytes(nacl.signing.SigningKey.generate())).decode('ascii')
+    signing_key = nacl.signing.SigningKey(base64.b64decode(secret))
+    api_key = base64.b64encode(bytes(signing_key.verify_key)).decode('ascii')
+    signer = RequestSigner(api_key, secret)
+
+    logger.info(f"{'请求':<14}{'原流程 次/秒':>14}{'RequestSigner 次/秒':>22}{'提升':>8}")
+    for name, instruction, data, params in sample_cases(args.batch_size):
+        legacy = measure(lambda: legacy_sign(api_key, secret, instruction, data, params), args.duration)
+        cached = measure(lambda: cached_sign(signer, instruction, data, params), args.duration)
+        logger.info(f"{name:<14}{legacy:>14,.0f}{cached:>22,.0f}{cached / legacy:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
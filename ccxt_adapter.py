@@ -0,0 +1,60 @@
+import logging
+from typing import Dict, List, Optional
+
+from backpack_exchange import BackpackExchange
+
+logger = logging.getLogger(__name__)
+
+_adapter_class: Optional[type] = None
+
+
+def ccxt_available() -> bool:
+    """是否安装了 ccxt（不导入 ccxt）"""
+    import importlib.util
+    return importlib.util.find_spec('ccxt') is not None
+
+
+def get_adapter_class() -> type:
+    """
+    延迟导入 ccxt 并构建兼容类：同时继承 BackpackExchange 与 ccxt.Exchange
+    Backpack 接口方法由 BackpackExchange 实现，ccxt 的通用工具方法（如 milliseconds、iso8601、safe_*、
+    load_markets）来自 ccxt.Exchange。ccxt 只在第一次调用时导入，不使用适配层的进程不会加载 ccxt
+    :return: 兼容类
+    """
+    global _adapter_class
+    if _adapter_class is not None:
+        return _adapter_class
+    try:
+        import ccxt
+    except ImportError:
+        raise Exception("未安装 ccxt，无法创建 ccxt 兼容客户端，请执行 pip install ccxt")
+
+    class CcxtBackpackExchange(BackpackExchange, ccxt.Exchange):
+        """可作为 ccxt.Exchange 使用的 Backpack 客户端"""
+        id = 'backpack'
+        name = 'Backpack'
+
+        def __init__(self, config: Dict):
+            # ccxt 先初始化通用属性，再由 BackpackExchange 设置会话、限流器与调度器
+            ccxt.Exchange.__init__(self, config)
+            BackpackExchange.__init__(self, config)
+
+        def fetch_markets(self, params=None) -> List[Dict]:
+            """
+            ccxt 的 load_markets 调用 fetch_markets(params)，Backpack 接口不需要额外参数；
+            ccxt 按 id 索引交易对，id 与 symbol 相同（Backpack 格式，如 SOL_USDC）
+            """
+            return [{'id': market['symbol'], **market} for market in BackpackExchange.fetch_markets(self)]
+
+    _adapter_class = CcxtBackpackExchange
+    logger.debug(f"已加载 ccxt {ccxt.__version__} 兼容层")
+    return _adapter_class
+
+
+def create_ccxt_exchange(config: Dict) -> BackpackExchange:
+    """
+    创建 ccxt 兼容的 Backpack 客户端
+    :param config: 与 BackpackExchange 相同的配置
+    :return: 同时是 BackpackExchange 与 ccxt.Exchange 实例的客户端
+    """
+    return get_adapter_class()(config)
@@ -0,0 +1,161 @@
+import logging
+import math
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_WINDOW = 5000  # 签名时间窗口下限（毫秒）
+DEFAULT_MAX_WINDOW = 60000  # 交易所允许的最大时间窗口（毫秒）
+
+
+def is_timestamp_rejection(status_code: int, text: str) -> bool:
+    """响应是否表示请求因时间戳超出时间窗口被拒绝（请求未被处理，校准时钟后可以安全重试）"""
+    if status_code not in (400, 401):
+        return False
+    text = text.lower()
+    return 'expired' in text or 'timestamp' in text or 'window' in text
+
+
+class ClockSync:
+    """
+    服务器时钟偏差估计
+    精确样本来自 /api/v1/time：以请求发出与收到响应的中点对齐服务器时间，偏差 = 服务器时间 - 本地中点时间，
+    误差不超过往返时间的一半；往返时间长的样本（路径不对称的可能性大）权重按 srtt/rtt 降低，偏差按 EWMA 平滑。
+    每个响应的 Date 头（秒级精度）给出偏差的上下界，当前估计超出该范围时说明时钟发生了漂移，
+    立即修正到边界并在下一个签名请求前重新校准。
+    签名时间窗口按往返时间（srtt + 4 * rttvar，与 TCP 重传超时相同的估计）加偏差误差动态调整
+    """
+
+    def __init__(self, min_window: int = DEFAULT_MIN_WINDOW, max_window: int = DEFAULT_MAX_WINDOW,
+                 sync_interval: float = 600.0, alpha: float = 0.3, window_factor: float = 2.0):
+        """
+        :param min_window: 签名时间窗口下限（毫秒）
+        :param max_window: 签名时间窗口上限（毫秒）
+        :param sync_interval: 定期通过时间接口校准的间隔（秒）
+        :param alpha: 偏差 EWMA 的平滑系数
+        :param window_factor: 时间窗口相对延迟估计的倍数
+        """
+        self.min_window = min_window
+        self.max_window = max_window
+        self.sync_interval = sync_interval
+        self.alpha = alpha
+        self.window_factor = window_factor
+
+        self.offset = 0.0  # 服务器时间 - 本地时间（毫秒）
+        self.error: Optional[float] = None  # 偏差估计的误差（毫秒），尚未校准时为 None
+        self.srtt: Optional[float] = None  # 平滑往返时间（毫秒）
+        self.rttvar = 0.0  # 往返时间的平均偏差（毫秒）
+        self.window = min_window
+        self.samples = 0
+        self.rejections = 0
+
+        self._lock = threading.Lock()
+        self._stale = True  # 需要尽快通过时间接口校准
+        self._last_sync: Optional[float] = None
+        self._retry_at = 0.0
+        self._date_header: Optional[str] = None
+        self._date_ms = 0.0
+
+    def now_ms(self) -> int:
+        """按服务器时间计算的当前毫秒时间戳"""
+        return int(time.time() * 1000 + self.offset)
+
+    def _update_rtt(self, rtt: float):
+        """RFC 6298 的往返时间平滑"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += 0.25 * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += 0.125 * (rtt - self.srtt)
+
+    def _update_window(self):
+        latency = self.srtt + 4 * self.rttvar if self.srtt is not None else 0.0
+        margin = self.window_factor * (latency + (self.error or 0.0))
+        self.window = int(min(self.max_window, max(self.min_window, math.ceil(margin / 1000) * 1000)))
+
+    def needs_sync(self) -> bool:
+        """
+        是否需要通过时间接口校准（尚未校准、估计过期、检测到漂移或签名被拒绝）
+        客户端在校准期间应让其他请求等待校准完成，避免使用未校准的时间戳签名
+        """
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        return self._stale or self._last_sync is None or now - self._last_sync >= self.sync_interval
+
+    def sync_failed(self):
+        """校准失败，30 秒内不再重试，期间使用 Date 头修正后的估计"""
+        with self._lock:
+            self._retry_at = time.monotonic() + 30.0
+
+    def add_sample(self, sent: float, received: float, server_ms: float):
+        """
+        记录一次时间接口的样本
+        :param sent: 发出请求时的本地时间（秒）
+        :param received: 收到响应时的本地时间（秒）
+        :param server_ms: 服务器返回的毫秒时间戳
+        """
+        rtt = max(0.0, (received - sent) * 1000)
+        sample = server_ms - (sent + received) * 500
+        with self._lock:
+            self._update_rtt(rtt)
+            previous = self.offset
+            if self.error is None or self._stale:
+                self.offset = sample
+                self.error = rtt / 2
+            else:
+                weight = self.alpha * min(1.0, self.srtt / rtt) if rtt > 0 else self.alpha
+                self.offset += weight * (sample - self.offset)
+                self.error += weight * (rtt / 2 - self.error)
+            self.samples += 1
+            self._stale = False
+            self._last_sync = time.monotonic()
+            self._update_window()
+        message = f"服务器时间偏差 {self.offset:+.0f} ms（±{self.error:.0f}），往返延迟 {self.srtt:.0f} ms，签名窗口 {self.window} ms"
+        if self.samples == 1 or abs(self.offset - previous) >= 100:
+            logger.info(message)
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(message)
+
+    def observe_response(self, sent: float, received: float, date_header: Optional[str] = None):
+        """
+        记录一次普通响应：更新往返时间，并用 Date 头检查偏差估计是否仍然有效
+        :param sent: 发出请求时的本地时间（秒）
+        :param received: 收到响应时的本地时间（秒）
+        :param date_header: 响应的 Date 头
+        """
+        with self._lock:
+            self._update_rtt(max(0.0, (received - sent) * 1000))
+            self._update_window()
+            if not date_header:
+                return
+            # Date 头每秒才变化一次，缓存解析结果
+            if date_header != self._date_header:
+                try:
+                    self._date_ms = parsedate_to_datetime(date_header).timestamp() * 1000
+                except (TypeError, ValueError):
+                    return
+                self._date_header = date_header
+            # 服务器生成响应的时间在 [Date, Date + 1s) 内，且在本地的发出与收到之间
+            lower = self._date_ms - received * 1000
+            upper = self._date_ms + 1000 - sent * 1000
+            if lower <= self.offset <= upper:
+                return
+            corrected = min(max(self.offset, lower), upper)
+            logger.warning(f"检测到时钟漂移: 偏差估计 {self.offset:+.0f} ms 超出 Date 头范围 "
+                           f"[{lower:+.0f}, {upper:+.0f}] ms，修正为 {corrected:+.0f} ms")
+            self.offset = corrected
+            self.error = max(self.error or 0.0, (upper - lower) / 2)
+            self._stale = True
+            self._update_window()
+
+    def on_rejected(self):
+        """签名因时间戳被拒绝：标记需要立即重新校准"""
+        with self._lock:
+            self.rejections += 1
+            self._stale = True
+            self._retry_at = 0.0
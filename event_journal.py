@@ -0,0 +1,334 @@
+import glob
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from order_manager import OrderInfo, OrderManager
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+EVENT_PLACE = 1
+EVENT_CANCEL = 2
+EVENT_FILL = 3
+EVENT_NAMES = {EVENT_PLACE: 'place', EVENT_CANCEL: 'cancel', EVENT_FILL: 'fill'}
+
+# 事件标志
+FLAG_FINAL = 1  # 订单已完全成交（成交事件）
+
+SIDES = {'bid': 0, 'ask': 1}
+SIDE_NAMES = {0: 'bid', 1: 'ask'}
+
+# 段文件头: 魔数、版本、单条记录长度
+MAGIC = b'BPJ1'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+
+# 定长记录: 时间戳、事件类型、方向、标志、订单ID、交易对、clientId、价格、数量、手续费
+RECORD = struct.Struct('<dBBB24s16sIddd')
+
+SEGMENT_PATTERN = 'journal-{:06d}.bin'
+
+
+class JournalEvent(NamedTuple):
+    """日志中的一条订单事件"""
+    timestamp: float
+    event: int
+    side: str
+    flags: int
+    order_id: str
+    symbol: str
+    client_id: int
+    price: float
+    amount: float
+    fee: float
+
+    @property
+    def final(self) -> bool:
+        return bool(self.flags & FLAG_FINAL)
+
+
+def _encode(text: Optional[str], size: int) -> bytes:
+    """将字段编码为定长记录中的 ASCII 字节，非 ASCII 或超过 size 字节时抛出 ValueError"""
+    data = (text or '').encode('ascii')
+    if len(data) > size:
+        raise ValueError(f"字段超过 {size} 字节: {text}")
+    return data
+
+
+def _decode(raw: tuple) -> JournalEvent:
+    timestamp, event, side, flags, order_id, symbol, client_id, price, amount, fee = raw
+    return JournalEvent(timestamp, event, SIDE_NAMES.get(side, ''), flags,
+                        order_id.rstrip(b'\0').decode('ascii'), symbol.rstrip(b'\0').decode('ascii'),
+                        client_id, price, amount, fee)
+
+
+class EventJournal:
+    """
+    只追加的订单事件日志
+    事件编码为定长二进制记录，先写入内存缓冲区，达到 batch_size 条或超过 flush_interval 秒时
+    一次写入并 fsync；段文件写满 segment_records 条后切换到新文件
+    """
+
+    def __init__(self, directory: str, batch_size: int = 256, flush_interval: float = 1.0,
+                 segment_records: int = 1000000):
+        """
+        :param directory: 日志目录
+        :param batch_size: 缓冲多少条事件后写盘
+        :param flush_interval: 缓冲事件最长等待写盘的时间（秒），0 表示只按 batch_size 写盘
+        :param segment_records: 每个段文件的最大记录数
+        """
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_records = segment_records
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._file = None
+        self._segment = 0
+        self._segment_count = 0
+        self._open_segment()
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="EventJournal", daemon=True)
+            self._flusher.start()
+
+    def _open_segment(self):
+        """打开最新的段文件继续追加（丢弃崩溃时写了一半的记录），已满时新建段文件"""
+        segments = sorted(glob.glob(os.path.join(self.directory, 'journal-*.bin')))
+        if segments:
+            path = segments[-1]
+            self._segment = int(os.path.basename(path)[8:14])
+            size = os.path.getsize(path)
+            count = max(0, size - HEADER.size) // RECORD.size
+            if size >= HEADER.size and count < self.segment_records:
+                end = HEADER.size + count * RECORD.size
+                self._file = open(path, 'r+b')
+                if end != size:
+                    logger.warning(f"事件日志 {path} 末尾存在不完整的记录，已截断")
+                    self._file.truncate(end)
+                self._file.seek(end)
+                self._segment_count = count
+                return
+        self._new_segment()
+
+    def _new_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self._segment += 1
+        path = os.path.join(self.directory, SEGMENT_PATTERN.format(self._segment))
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._segment_count = 0
+
+    def append(self, event: int, order_id: str, symbol: str, side: str = None, price: float = 0.0,
+               amount: float = 0.0, fee: float = 0.0, client_id: int = None, flags: int = 0,
+               timestamp: float = None):
+        """
+        追加一条事件
+        :param event: 事件类型 EVENT_PLACE / EVENT_CANCEL / EVENT_FILL
+        :param order_id: 订单ID
+        :param symbol: 交易对
+        :param side: 'bid' 或 'ask'
+        :param price: 挂单价格或成交价格
+        :param amount: 挂单数量或成交数量
+        :param fee: 手续费
+        :param client_id: 客户端订单ID
+        :param flags: 事件标志
+        :param timestamp: 事件时间（秒），默认当前时间
+        """
+        try:
+            record = RECORD.pack(
+                timestamp if timestamp is not None else time.time(), event, SIDES.get(side, 255), flags,
+                _encode(str(order_id), 24), _encode(symbol, 16), int(client_id or 0),
+                float(price or 0.0), float(amount or 0.0), float(fee or 0.0)
+            )
+        except (ValueError, struct.error) as e:
+            # 字段无法编码（如订单ID过长）时只跳过该事件，不影响下单与成交处理
+            logger.error(f"无法写入事件日志，已跳过: {e}")
+            return
+        with self._lock:
+            self._buffer += record
+            self._buffered += 1
+            if self._buffered >= self.batch_size:
+                self._flush_locked()
+
+    def record_place(self, order_id: str, symbol: str, side: str, price: float, amount: float, client_id: int = None):
+        """记录下单"""
+        self.append(EVENT_PLACE, order_id, symbol, side, price, amount, client_id=client_id)
+
+    def record_cancel(self, order_id: str, symbol: str):
+        """记录撤单"""
+        self.append(EVENT_CANCEL, order_id, symbol)
+
+    def record_fill(self, order_id: str, symbol: str, side: str, price: float, amount: float,
+                    fee: float = 0.0, final: bool = False):
+        """记录一笔成交，final 表示订单已完全成交"""
+        self.append(EVENT_FILL, order_id, symbol, side, price, amount, fee, flags=FLAG_FINAL if final else 0)
+
+    def _flush_locked(self):
+        if not self._buffered or self._file is None:
+            return
+        view = memoryview(self._buffer)
+        offset = 0
+        while self._buffered:
+            room = self.segment_records - self._segment_count
+            count = min(room, self._buffered)
+            self._file.write(view[offset:offset + count * RECORD.size])
+            offset += count * RECORD.size
+            self._buffered -= count
+            self._segment_count += count
+            if self._segment_count >= self.segment_records:
+                self._sync()
+                self._new_segment()
+        view.release()
+        self._buffer.clear()
+        self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def flush(self):
+        """将缓冲的事件写盘并 fsync"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error(f"写入事件日志失败: {e}")
+
+    def close(self):
+        """写入剩余事件并关闭日志"""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=self.flush_interval + 1)
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class JournalReader:
+    """
+    事件日志读取器
+    通过 mmap 映射段文件并按定长记录批量解码，不需要把文件读入内存
+    """
+
+    def __init__(self, directory: str):
+        """
+        :param directory: 日志目录
+        """
+        self.directory = directory
+
+    def segments(self) -> List[str]:
+        """按顺序返回所有段文件路径"""
+        return sorted(glob.glob(os.path.join(self.directory, 'journal-*.bin')))
+
+    def _records(self, path: str) -> Iterator[tuple]:
+        size = os.path.getsize(path)
+        if size < HEADER.size:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, record_size = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or record_size != RECORD.size:
+                raise Exception(f"无法识别的事件日志文件: {path}")
+            count = (size - HEADER.size) // RECORD.size
+            view = memoryview(mm)[HEADER.size:HEADER.size + count * RECORD.size]
+            try:
+                yield from RECORD.iter_unpack(view)
+            finally:
+                view.release()
+
+    def scan(self, since: float = None, symbol: str = None, events=None) -> Iterator[JournalEvent]:
+        """
+        按写入顺序遍历事件
+        :param since: 只返回该时间（秒）之后的事件
+        :param symbol: 只返回该交易对的事件
+        :param events: 只返回这些类型的事件
+        """
+        try:
+            symbol_raw = _encode(symbol, 16) if symbol else None
+        except ValueError:
+            return  # 无法写入日志的交易对不会有事件
+        for path in self.segments():
+            for raw in self._records(path):
+                if since is not None and raw[0] < since:
+                    continue
+                if events is not None and raw[1] not in events:
+                    continue
+                if symbol_raw is not None and raw[5].rstrip(b'\0') != symbol_raw:
+                    continue
+                yield _decode(raw)
+
+    def count(self) -> int:
+        """事件总数（不解码）"""
+        return sum(max(0, os.path.getsize(path) - HEADER.size) // RECORD.size for path in self.segments())
+
+    def rebuild_orders(self, symbol: str = None, include_open: bool = True) -> List[OrderInfo]:
+        """
+        根据日志重建订单状态
+        :param symbol: 只重建该交易对的订单
+        :param include_open: 是否包含日志中仍未结束的订单
+        :return: 按结束顺序排列的订单列表（未结束订单在最后）
+        """
+        orders: Dict[str, OrderInfo] = {}
+        fills: Dict[str, list] = {}  # order_id -> [成交数量, 成交金额]
+        finished: Dict[str, OrderInfo] = {}
+        for event in self.scan(symbol=symbol):
+            if event.event == EVENT_PLACE:
+                orders[event.order_id] = OrderInfo(
+                    order_id=event.order_id, symbol=event.symbol, side=event.side, price=event.price,
+                    amount=event.amount, status='open', created_at=datetime.fromtimestamp(event.timestamp)
+                )
+                continue
+            order = orders.get(event.order_id)
+            if order is None or order.status != 'open':
+                continue
+            if event.event == EVENT_FILL:
+                filled = fills.setdefault(event.order_id, [0.0, 0.0])
+                filled[0] += event.amount
+                filled[1] += event.amount * event.price
+                order.filled_amount = filled[0]
+                order.filled_price = filled[1] / filled[0] if filled[0] else None
+                if order.side == 'ask' and order.filled_price:
+                    order.profit = (order.filled_price - order.price) * order.filled_amount
+                if event.final:
+                    order.status = 'closed'
+            elif event.event == EVENT_CANCEL:
+                order.status = 'cancelled'
+            if order.status != 'open':
+                order.closed_at = datetime.fromtimestamp(event.timestamp)
+                finished[order.order_id] = order
+
+        rebuilt = list(finished.values())
+        if include_open:
+            rebuilt.extend(order for order in orders.values() if order.status == 'open')
+        return rebuilt
+
+    def restore(self, order_manager: OrderManager, symbol: str = None, include_open: bool = True) -> List[OrderInfo]:
+        """
+        将日志重建的订单载入订单管理器
+        :param include_open: 是否同时载入日志中仍未结束的订单
+        :return: 日志中仍未结束的订单（include_open 为 False 时未载入，调用方可据此补记撤单事件）
+        """
+        rebuilt = self.rebuild_orders(symbol)
+        open_orders = [order for order in rebuilt if order.status == 'open']
+        loaded = rebuilt if include_open else rebuilt[:len(rebuilt) - len(open_orders)]
+        order_manager.load(loaded)
+        logger.info(f"从事件日志恢复 {len(loaded)} 个订单")
+        return open_orders
@@ -0,0 +1,113 @@
+import logging
+import math
+from bisect import bisect_left
+from typing import List, Optional
+
+import numpy as np
+
+from market_cache import decimals_of
+
+logger = logging.getLogger(__name__)
+
+
+class GridLadder:
+    """
+    网格档位表
+    一次性以 NumPy 数组计算所有档位的价格、下单数量、名义金额与每格预期收益，
+    价格按 tick_size 取整、数量按 step_size 向下取整；按价格查找档位使用二分查找
+    """
+
+    def __init__(self, lower_price: float, upper_price: float, grid_number: int, grid_type: str,
+                 investment: float, min_order_size: float, tick_size: float = 0.01, step_size: float = 0.001):
+        """
+        :param lower_price: 网格下限
+        :param upper_price: 网格上限
+        :param grid_number: 网格数量
+        :param grid_type: 'arithmetic' 为等差网格，其余为等比网格
+        :param investment: 总投资金额（计价货币）
+        :param min_order_size: 最小下单数量
+        :param tick_size: 价格最小变动单位
+        :param step_size: 数量最小变动单位
+        """
+        self.lower_price = lower_price
+        self.upper_price = upper_price
+        self.grid_number = grid_number
+        self.grid_type = grid_type
+        self.investment = investment
+        self.min_order_size = min_order_size
+        self.tick_size = tick_size
+        self.step_size = step_size
+        self.rebuild()
+
+    def rebuild(self, **changes):
+        """
+        修改参数（可选）并重新计算全部档位
+        :param changes: 需要修改的参数，如 tick_size=0.001
+        """
+        for name, value in changes.items():
+            if not hasattr(self, name):
+                raise Exception(f"未知的网格参数: {name}")
+            setattr(self, name, value)
+        if self.grid_number <= 0 or self.lower_price <= 0 or self.upper_price <= self.lower_price:
+            raise Exception(f"网格参数无效: {self.lower_price} - {self.upper_price} / {self.grid_number}")
+
+        self.price_decimals = decimals_of(self.tick_size)
+        self.amount_decimals = decimals_of(self.step_size)
+
+        steps = np.arange(self.grid_number + 1, dtype=np.float64)
+        if self.grid_type == 'arithmetic':
+            raw = self.lower_price + (self.upper_price - self.lower_price) / self.grid_number * steps
+        else:
+            raw = self.lower_price * (self.upper_price / self.lower_price) ** (steps / self.grid_number)
+        prices = np.unique(self.round_prices(raw))
+        if len(prices) < len(raw):
+            logger.warning(f"按价格精度 {self.tick_size} 取整后有 {len(raw) - len(prices)} 个档位重合，已合并")
+
+        self.grid_investment = self.investment / self.grid_number
+        self.prices = prices
+        self.amounts = self.round_amounts(self.grid_investment / prices)
+        self.notionals = self.amounts * prices
+        # 第 i 格：在 prices[i] 买入、prices[i+1] 卖出的预期收益，最后一档没有上方档位
+        self.profits = np.append(self.amounts[:-1] * np.diff(prices), np.nan)
+        self.profit_pcts = self.profits / self.notionals * 100
+        self._price_list = prices.tolist()
+        self._amount_list = self.amounts.tolist()
+
+    def round_prices(self, prices: np.ndarray) -> np.ndarray:
+        """按 tick_size 取整到最近的价格"""
+        return np.round(np.round(prices / self.tick_size) * self.tick_size, self.price_decimals)
+
+    def round_amounts(self, amounts: np.ndarray) -> np.ndarray:
+        """按 step_size 向下取整，且不低于最小下单数量（最小下单数量按 step_size 向上取整）"""
+        floored = np.floor(amounts / self.step_size + 1e-9) * self.step_size
+        minimum = math.ceil(self.min_order_size / self.step_size - 1e-9) * self.step_size
+        return np.round(np.maximum(floored, minimum), self.amount_decimals)
+
+    def round_price(self, price: float) -> float:
+        """按 tick_size 取整单个价格"""
+        return round(round(price / self.tick_size) * self.tick_size, self.price_decimals)
+
+    def round_amount(self, amount: float) -> float:
+        """按 step_size 取整单个数量"""
+        return float(self.round_amounts(np.array([amount]))[0])
+
+    def __len__(self) -> int:
+        return len(self._price_list)
+
+    def price_list(self) -> List[float]:
+        """全部档位价格（升序）"""
+        return self._price_list
+
+    def level_of(self, price: float) -> Optional[int]:
+        """价格所在的档位序号，与任何档位相差超过半个 tick 时返回 None"""
+        index = bisect_left(self._price_list, price - self.tick_size / 2)
+        if index < len(self._price_list) and abs(self._price_list[index] - price) <= self.tick_size / 2:
+            return index
+        return None
+
+    def amount_at(self, price: float) -> float:
+        """档位价格对应的下单数量，不在网格上的价格按相同规则计算"""
+        level = self.level_of(price)
+        if level is not None:
+            return self._amount_list[level]
+        return self.round_amount(self.grid_investment / price)
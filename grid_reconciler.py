@@ -0,0 +1,233 @@
+import logging
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# clientId 结构: 网格标签 * CLIENT_ID_LEVELS + 档位序号（uint32 范围内）
+# 网格标签不小于 1000，保证与 create_order 默认生成的 8 位 clientId 不冲突
+CLIENT_ID_LEVELS = 100000
+MIN_GRID_TAG = 1000
+MAX_GRID_TAG = 4294967295 // CLIENT_ID_LEVELS
+
+
+def grid_tag(name: str) -> int:
+    """根据网格名称（通常为交易对）生成稳定的网格标签"""
+    return MIN_GRID_TAG + zlib.crc32(name.encode('utf-8')) % (MAX_GRID_TAG - MIN_GRID_TAG)
+
+
+def encode_client_id(tag: int, level: int) -> int:
+    """将网格标签与档位序号编码为 clientId"""
+    return tag * CLIENT_ID_LEVELS + level
+
+
+def decode_client_id(client_id) -> Optional[Tuple[int, int]]:
+    """
+    解析 clientId
+    :return: (网格标签, 档位序号)，不是网格订单时返回 None
+    """
+    if client_id is None:
+        return None
+    try:
+        client_id = int(client_id)
+    except (TypeError, ValueError):
+        return None
+    tag, level = divmod(client_id, CLIENT_ID_LEVELS)
+    if tag < MIN_GRID_TAG:
+        return None
+    return tag, level
+
+
+@dataclass(frozen=True)
+class GridLevel:
+    """网格上的一个目标挂单"""
+    side: str  # 'bid' 或 'ask'
+    price: float
+    amount: float
+
+
+@dataclass
+class ReconcilePlan:
+    """对账结果：需要撤销与新增的订单"""
+    to_cancel: List[Dict] = field(default_factory=list)  # 需要撤销的现有订单
+    to_place: List[GridLevel] = field(default_factory=list)  # 需要新增的挂单
+    kept: List[Dict] = field(default_factory=list)  # 保持不动的现有订单
+
+    @property
+    def empty(self) -> bool:
+        """是否无需任何操作"""
+        return not self.to_cancel and not self.to_place
+
+
+class GridReconciler:
+    """
+    网格对账引擎
+    根据网格价格与当前价格计算目标挂单集合 (side, price, amount)，与现有未完成订单比较，
+    只撤销多余或方向错误的订单、补齐缺失的档位；已在正确档位上的订单保持不动以保留排队优先级。
+    网格始终留出一个空档位：空档位下方为买单、上方为卖单。买单在第 i 档成交后空档位移到第 i 档，
+    第 i+1 档挂出卖单（卖单成交对称），成交后不会在同一价格反向挂单。
+    相同输入下重复执行不会产生新的操作，可以在每个检查周期调用
+    """
+
+    def __init__(self, price_range: float = 0.1, fee_rate: float = 0.003):
+        """
+        :param price_range: 只在当前价格上下该比例范围内挂单
+        :param fee_rate: 计算卖单可用数量时预留的手续费比例
+        """
+        self.price_range = price_range
+        self.fee_rate = fee_rate
+        self.empty_level: Optional[int] = None  # 空档位序号，None 表示尚未确定
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """清除空档位（撤销全部挂单重新布置网格时调用），下次对账时按当前价格重新确定"""
+        with self._lock:
+            self.empty_level = None
+
+    def on_fill(self, side: str, level: Optional[int]):
+        """
+        记录网格订单完全成交：买单成交后空档位下移到成交档位，卖单成交后上移到成交档位
+        :param side: 'bid' 或 'ask'
+        :param level: 成交订单的档位序号，不在网格上时为 None
+        """
+        if level is None:
+            return
+        with self._lock:
+            if self.empty_level is None:
+                self.empty_level = level
+            elif side == 'bid':
+                self.empty_level = min(self.empty_level, level)
+            else:
+                self.empty_level = max(self.empty_level, level)
+
+    @staticmethod
+    def nearest_level(grid_prices: List[float], current_price: float) -> int:
+        """距离当前价格最近的档位序号"""
+        index = bisect_left(grid_prices, current_price)
+        if index == 0:
+            return 0
+        if index == len(grid_prices):
+            return len(grid_prices) - 1
+        return index if grid_prices[index] - current_price < current_price - grid_prices[index - 1] else index - 1
+
+    def anchor(self, grid_prices: List[float], current_price: float, live_orders: List[Dict]) -> int:
+        """
+        确定本次对账的空档位
+        首次对账时取距离当前价格最近的档位（保留已有的买卖挂单）；
+        价格越过相邻档位、而该方向上已没有挂单（未挂出或成交未被记录）时，空档位跟随价格移动，
+        仍有挂单的档位等待其成交
+        :param grid_prices: 网格价格列表（升序）
+        :param current_price: 当前价格
+        :param live_orders: 现有订单，包含 side('bid'/'ask')、price
+        :return: 空档位序号
+        """
+        nearest = self.nearest_level(grid_prices, current_price)
+        bid_levels = [bisect_left(grid_prices, float(order['price']) - 1e-9) for order in live_orders if order['side'] == 'bid']
+        ask_levels = [bisect_left(grid_prices, float(order['price']) - 1e-9) for order in live_orders if order['side'] == 'ask']
+        with self._lock:
+            empty = self.empty_level
+            if empty is None or empty >= len(grid_prices):
+                low = max(bid_levels) + 1 if bid_levels else 0
+                high = min(ask_levels) - 1 if ask_levels else len(grid_prices) - 1
+                empty = min(max(nearest, low), high) if low <= high else nearest
+            elif empty > 0 and current_price < grid_prices[empty - 1]:
+                below = [level for level in bid_levels if level < empty]
+                empty = min(empty, max(nearest, max(below) + 1) if below else nearest)
+            elif empty < len(grid_prices) - 1 and current_price > grid_prices[empty + 1]:
+                above = [level for level in ask_levels if level > empty]
+                empty = max(empty, min(nearest, min(above) - 1) if above else nearest)
+            if empty != self.empty_level:
+                logger.debug(f"空档位: {self.empty_level} -> {empty} (当前价格 {current_price})")
+                self.empty_level = empty
+            return empty
+
+    @staticmethod
+    def level_key(side: str, price: float) -> Tuple[str, float]:
+        """订单匹配键"""
+        return side, round(float(price), 8)
+
+    def desired_levels(self, grid_prices: List[float], current_price: float,
+                       amount_for: Callable[[float], float], empty_level: Optional[int] = None) -> List[GridLevel]:
+        """
+        计算目标挂单：空档位下方为买单，上方为卖单，按距离当前价格由近到远排序；
+        买单只挂在当前价格下方、卖单只挂在当前价格上方，避免挂单立即成交
+        :param grid_prices: 网格价格列表（升序）
+        :param current_price: 当前价格
+        :param amount_for: 价格 -> 下单数量
+        :param empty_level: 空档位序号，为 None 时取距离当前价格最近的档位
+        :return: 目标挂单列表
+        """
+        if empty_level is None:
+            empty_level = self.nearest_level(grid_prices, current_price)
+        min_price = current_price * (1 - self.price_range)
+        max_price = current_price * (1 + self.price_range)
+        levels = []
+        # 网格价格升序排列，二分查找范围内的档位
+        start, end = bisect_left(grid_prices, min_price), bisect_right(grid_prices, max_price)
+        for index in range(start, end):
+            price = grid_prices[index]
+            if index < empty_level and price < current_price:
+                levels.append(GridLevel('bid', price, amount_for(price)))
+            elif index > empty_level and price > current_price:
+                levels.append(GridLevel('ask', price, amount_for(price)))
+        levels.sort(key=lambda level: abs(level.price - current_price))
+        return levels
+
+    def diff(self, desired: List[GridLevel], live_orders: List[Dict]) -> ReconcilePlan:
+        """
+        比较目标挂单与现有订单
+        :param desired: 目标挂单
+        :param live_orders: 现有订单，包含 id、side('bid'/'ask')、price、amount
+        :return: 对账结果（未考虑余额）
+        """
+        wanted = {self.level_key(level.side, level.price): level for level in desired}
+        plan = ReconcilePlan()
+        matched = set()
+        for order in live_orders:
+            key = self.level_key(order['side'], order['price'])
+            # 同一档位只保留一个订单，其余的视为多余
+            if key in wanted and key not in matched:
+                matched.add(key)
+                plan.kept.append(order)
+            else:
+                plan.to_cancel.append(order)
+        plan.to_place = [level for key, level in wanted.items() if key not in matched]
+        return plan
+
+    def plan(self, grid_prices: List[float], current_price: float, amount_for: Callable[[float], float],
+             live_orders: List[Dict]) -> ReconcilePlan:
+        """
+        计算对账操作（未考虑余额）：先确定空档位，再与现有订单比较
+        新增挂单需要在撤单释放资金后通过 allocate 逐个预留资金
+        :param grid_prices: 网格价格列表
+        :param current_price: 当前价格
+        :param amount_for: 价格 -> 下单数量
+        :param live_orders: 现有订单
+        :return: 对账结果
+        """
+        empty_level = self.anchor(grid_prices, current_price, live_orders)
+        return self.diff(self.desired_levels(grid_prices, current_price, amount_for, empty_level), live_orders)
+
+    def headroom(self, level: GridLevel) -> float:
+        """预留资金时额外保留的可用余额：卖单保留手续费缓冲，避免买入时被扣除的手续费导致卖单余额不足"""
+        if level.side == 'ask':
+            return level.amount * self.fee_rate / (1 - self.fee_rate)
+        return 0.0
+
+    def allocate(self, levels: List[GridLevel], reserve: Callable[[GridLevel], bool]) -> List[GridLevel]:
+        """
+        由近到远为新增挂单预留资金
+        :param levels: 需要新增的挂单（按距离当前价格由近到远排序）
+        :param reserve: 挂单 -> 是否预留成功（检查余额与预留须为原子操作）
+        :return: 已预留资金的挂单
+        """
+        affordable = []
+        for level in levels:
+            if reserve(level):
+                affordable.append(level)
+            else:
+                logger.debug(f"余额不足，跳过{'买单' if level.side == 'bid' else '卖单'} {level.amount} @ {level.price}")
+        return affordable
@@ -3,11 +3,22 @@ import time
 import logging
 import signal
 import sys
-from typing import List, Dict
-from decimal import Decimal
+import threading
+from typing import List, Dict, Set, Tuple, Optional
 from dotenv import load_dotenv
 from backpack_exchange import BackpackExchange
-from dataclasses import dataclass
+from balance_ledger import BalanceLedger
+from grid_reconciler import GridLevel, GridReconciler, grid_tag, encode_client_id, decode_client_id
+from backpack_stream import MarketDataStream, OrderUpdateStream, DEFAULT_WS_URL
+from order_manager import OrderInfo, OrderManager
+from event_journal import EventJournal, JournalReader
+from trade_sync import TradeSync
+from pnl_engine import PnLEngine
+from grid_ladder import GridLadder
+from market_cache import MarketCache
+from loop_scheduler import LoopScheduler, REASON_ORDER, REASON_POLL
+from metrics import MetricsRegistry, create_metrics
+from profiling import Profiler
 from datetime import datetime
 
 # 加载环境变量
@@ -20,129 +31,238 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class OrderInfo:
-    """订单信息类"""
-    order_id: str
-    symbol: str
-    side: str  # 'bid' 或 'ask'
-    price: float
-    amount: float
-    status: str  # 'open', 'closed', 'cancelled'
-    created_at: datetime
-    closed_at: datetime = None
-    filled_price: float = None
-    filled_amount: float = None
-    profit: float = None
-
-class OrderManager:
-    """订单管理器"""
-    def __init__(self):
-        self.orders: Dict[str, OrderInfo] = {}  # order_id -> OrderInfo
-        
-    def add_order(self, order: OrderInfo):
-        """添加新订单"""
-        self.orders[order.order_id] = order
-        logger.info(f"添加新订单: {order.order_id} - {order.side} {order.amount} @ {order.price}")
-        
-    def update_order(self, order_id: str, status: str, filled_price: float = None, filled_amount: float = None):
-        """更新订单状态"""
-        if order_id in self.orders:
-            order = self.orders[order_id]
-            order.status = status
-            if status in ['closed', 'cancelled']:
-                order.closed_at = datetime.now()
-            if filled_price and filled_amount:
-                order.filled_price = filled_price
-                order.filled_amount = filled_amount
-                if order.side == 'ask':  # 如果是卖单，计算利润
-                    order.profit = (filled_price - order.price) * filled_amount
-            logger.info(f"更新订单状态: {order_id} -> {status}")
-            
-    def get_order(self, order_id: str) -> OrderInfo:
-        """获取订单信息"""
-        return self.orders.get(order_id)
-        
-    def get_open_orders(self) -> List[OrderInfo]:
-        """获取所有未完成订单"""
-        return [order for order in self.orders.values() if order.status == 'open']
-        
-    def get_closed_orders(self) -> List[OrderInfo]:
-        """获取所有已完成订单"""
-        return [order for order in self.orders.values() if order.status == 'closed']
-        
-    def get_total_profit(self) -> float:
-        """获取总利润"""
-        return sum(order.profit for order in self.orders.values() if order.profit is not None)
-        
-    def print_order_summary(self):
-        """打印订单汇总信息"""
-        open_orders = self.get_open_orders()
-        closed_orders = self.get_closed_orders()
-        total_profit = self.get_total_profit()
-        
-        logger.info("\n=== 订单汇总信息 ===")
-        logger.info(f"未完成订单数量: {len(open_orders)}")
-        logger.info(f"已完成订单数量: {len(closed_orders)}")
-        logger.info(f"总利润: {total_profit:.2f}")
-        
-        if closed_orders:
-            logger.info("\n最近完成的订单:")
-            for order in closed_orders[-5:]:  # 显示最近5个完成的订单
-                logger.info(f"订单 {order.order_id}: {order.side} {order.amount} @ {order.price} -> {order.filled_price} | 利润: {order.profit:.2f}")
-        logger.info("=" * 50)
+def create_exchange() -> BackpackExchange:
+    """根据环境变量创建交易所客户端"""
+    return BackpackExchange({
+        'apiKey': os.getenv('API_KEY'),
+        'secret': os.getenv('API_SECRET'),
+        'baseUrl': os.getenv('BASE_URL', 'https://api.backpack.exchange'),
+        'requestsPerSecond': float(os.getenv('REQUESTS_PER_SECOND', '10')),
+        'requestBurst': float(os.getenv('REQUEST_BURST', '20')),
+        'maxRetries': int(os.getenv('MAX_RETRIES', '3')),
+        'reservedCapacity': float(os.getenv('RESERVED_CAPACITY', '5')),
+        'schedulerWorkers': int(os.getenv('SCHEDULER_WORKERS', '4')),
+        'staleRequestTimeout': float(os.getenv('STALE_REQUEST_TIMEOUT', '10')),
+        'signWindow': int(os.getenv('SIGN_WINDOW', '5000')),
+        'maxSignWindow': int(os.getenv('MAX_SIGN_WINDOW', '60000')),
+        'clockSyncInterval': float(os.getenv('CLOCK_SYNC_INTERVAL', '600'))
+    })
+
+
+def create_metrics_from_env() -> Tuple[Optional[MetricsRegistry], List]:
+    """根据环境变量创建指标注册表与导出器（METRICS_PORT、METRICS_FILE 均未配置时不启用）"""
+    return create_metrics(
+        port=int(os.getenv('METRICS_PORT', '0')),
+        path=os.getenv('METRICS_FILE') or None,
+        interval=float(os.getenv('METRICS_INTERVAL', '15')),
+        host=os.getenv('METRICS_HOST', '127.0.0.1')
+    )
+
+
+def create_profiler_from_env() -> Profiler:
+    """根据环境变量创建按需性能分析器（PROFILE_DIR、PROFILE_CONTROL_FILE），平时处于待命状态"""
+    return Profiler(
+        directory=os.getenv('PROFILE_DIR', 'profiles'),
+        control_file=os.getenv('PROFILE_CONTROL_FILE') or None
+    )
+
+
+def create_market_cache(exchange) -> MarketCache:
+    """根据环境变量创建交易对信息缓存"""
+    return MarketCache(
+        exchange, path=os.getenv('MARKET_CACHE_PATH', 'markets_cache.json') or None,
+        ttl=float(os.getenv('MARKET_CACHE_TTL', '86400'))
+    )
+
 
 class GridTrader:
-    def __init__(self):
+    def __init__(self, config: Optional[Dict] = None, exchange: Optional[BackpackExchange] = None,
+                 ledger: Optional[BalanceLedger] = None, markets: Optional[MarketCache] = None,
+                 journal: Optional[EventJournal] = None, wake_event: Optional[threading.Event] = None):
+        """
+        :param config: 网格配置，键与环境变量同名（如 SYMBOL、UPPER_PRICE），未配置的项读取环境变量
+        :param exchange: 共享的交易所客户端，为 None 时根据环境变量创建
+        :param ledger: 共享的余额账本，为 None 时单独创建
+        :param markets: 共享的交易对信息缓存，为 None 时单独创建
+        :param journal: 共享的订单事件日志，为 None 时按 JOURNAL_DIR 创建
+        :param wake_event: 共享的唤醒事件，订单事件到达时设置
+        """
+        self.config = config or {}
+
         # 初始化交易所
-        self.exchange = BackpackExchange({
-            'apiKey': os.getenv('API_KEY'),
-            'secret': os.getenv('API_SECRET')
-        })
+        self.exchange = exchange if exchange is not None else create_exchange()
+
+        # 请求与主循环指标（可选），共享交易所客户端时使用其指标注册表
+        self.metrics_exporters = []
+        if exchange is None:
+            self.exchange.metrics, self.metrics_exporters = create_metrics_from_env()
+        self.metrics = self.exchange.metrics
+
+        # 按需性能分析（SIGUSR1 或控制文件切换），共享交易所客户端时使用其分析器
+        self._owns_profiler = self.exchange.profiler is None
+        if self._owns_profiler:
+            self.exchange.profiler = create_profiler_from_env()
+        self.profiler = self.exchange.profiler
         
         # 初始化订单管理器
-        self.order_manager = OrderManager()
-        
-        # 设置信号处理
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+        self.order_manager = OrderManager(
+            max_history=int(self.setting('ORDER_HISTORY_SIZE', '1000')),
+            archive_path=self.setting('ORDER_ARCHIVE_PATH') or None
+        )
+
+        # 初始化网格对账引擎
+        self.reconciler = GridReconciler()
+
+        # 初始化本地余额账本
+        self.ledger = ledger if ledger is not None else BalanceLedger(
+            self.exchange, resync_interval=float(self.setting('BALANCE_SYNC_INTERVAL', '300')))
+
+        # 初始化订单事件日志（可选）
+        self.journal_dir = journal.directory if journal is not None else self.setting('JOURNAL_DIR') or None
+        self.journal = journal
+        self._owns_journal = journal is None and self.journal_dir is not None
+        if self._owns_journal:
+            self.journal = EventJournal(self.journal_dir, flush_interval=float(self.setting('JOURNAL_FLUSH_INTERVAL', '1')))
         
         # 加载配置
-        self.symbol = os.getenv('SYMBOL')
-        self.upper_price = float(os.getenv('UPPER_PRICE'))
-        self.lower_price = float(os.getenv('LOWER_PRICE'))
-        self.grid_number = int(os.getenv('GRID_NUMBER'))
-        self.investment = float(os.getenv('INVESTMENT'))
-        self.grid_type = os.getenv('GRID_TYPE')
-        self.min_order_size = float(os.getenv('MIN_ORDER_SIZE'))
-        self.post_only = os.getenv('POST_ONLY').lower() == 'true'
-        self.time_in_force = os.getenv('TIME_IN_FORCE')
-        self.max_orders = int(os.getenv('MAX_ORDERS'))
-        self.stop_loss_price = float(os.getenv('STOP_LOSS_PRICE'))
-        self.take_profit_price = float(os.getenv('TAKE_PROFIT_PRICE'))
-        self.check_interval = int(os.getenv('CHECK_INTERVAL'))
+        self.symbol = self.setting('SYMBOL')
+        self.upper_price = float(self.setting('UPPER_PRICE'))
+        self.lower_price = float(self.setting('LOWER_PRICE'))
+        self.grid_number = int(self.setting('GRID_NUMBER'))
+        self.investment = float(self.setting('INVESTMENT'))
+        self.grid_type = self.setting('GRID_TYPE')
+        self.min_order_size = float(self.setting('MIN_ORDER_SIZE'))
+        self.post_only = self.setting('POST_ONLY').lower() == 'true'
+        self.time_in_force = self.setting('TIME_IN_FORCE')
+        self.max_orders = int(self.setting('MAX_ORDERS'))
+        self.stop_loss_price = float(self.setting('STOP_LOSS_PRICE'))
+        self.take_profit_price = float(self.setting('TAKE_PROFIT_PRICE'))
+        self.check_interval = float(self.setting('CHECK_INTERVAL'))
+        self.min_check_interval = float(self.setting('MIN_CHECK_INTERVAL', '0.5'))
+        self.shutdown_timeout = float(self.setting('SHUTDOWN_TIMEOUT', '10'))
+        self.warm_start = self.setting('WARM_START', 'false').lower() == 'true'
+        self.cancel_on_exit = self.setting('CANCEL_ON_EXIT', 'true').lower() == 'true'
+        # 网格标签写入每个订单的 clientId，重启后据此识别本网格的订单
+        self.grid_tag = int(self.setting('GRID_ID')) if self.setting('GRID_ID') else grid_tag(self.symbol)
+
+        # 盈亏引擎：启用成交同步时以成交历史为准，否则使用订单推送
+        base_currency, quote_currency = self.symbol.split('_')
+        self.pnl = PnLEngine(base_currency, quote_currency)
+        # 启动时计入持仓成本的基础货币数量，默认只计入本网格卖单占用的数量（账户中的其他持仓不属于本网格）
+        self.pnl_seed_amount = float(self.setting('PNL_SEED_AMOUNT')) if self.setting('PNL_SEED_AMOUNT') else None
+
+        # 增量成交同步（可选）
+        self.trade_sync_interval = float(self.setting('TRADE_SYNC_INTERVAL', '0'))
+        self.trade_sync = None
+        self._last_trade_sync = 0.0
+        if self.trade_sync_interval > 0:
+            backfill_days = float(self.setting('TRADE_BACKFILL_DAYS', '0'))
+            # 路径中的 {symbol} 替换为交易对，多个网格可共用同一配置
+            cursor_path = (self.setting('TRADE_CURSOR_PATH') or '').format(symbol=self.symbol)
+            self.trade_sync = TradeSync(
+                self.exchange, self.symbol,
+                cursor_path=cursor_path or None,
+                backfill_since=int((time.time() - backfill_days * 86400) * 1000) if backfill_days > 0 else None
+            )
+
+        # 初始化 WebSocket 行情数据流与订单更新流
+        self.wake_event = wake_event if wake_event is not None else threading.Event()  # 订单事件到达时唤醒主循环
+        self.market_stream = None
+        self.order_stream = None
+        if self.setting('USE_WEBSOCKET', 'true').lower() == 'true':
+            ws_url = self.setting('WS_URL', DEFAULT_WS_URL)
+            self.market_stream = MarketDataStream(self.symbol, exchange=self.exchange, ws_url=ws_url)
+            self.order_stream = OrderUpdateStream(self.symbol, self.exchange, ws_url=ws_url)
+            self.order_stream.add_listener(self.on_order_update)
+        # 订单流在线时，每次重连后以及每 ORDER_SYNC_EVERY 次检查仍通过 REST 同步一次挂单，补齐漏掉的推送
+        self.order_sync_every = int(self.setting('ORDER_SYNC_EVERY', '30'))
+        self._order_sync_connection = 0
+        self._checks_since_order_sync = 0
+        self._fill_lock = threading.Lock()  # 订单推送与 REST 同步不重复结算同一笔成交
+        self._journal_open: Set[str] = set()  # 冷启动时未恢复、日志中仍未结束的订单
+        self._closed = False
         
-        # 初始化网格价格列表
+        # 交易对精度：优先使用 TICK_SIZE/STEP_SIZE，否则读取本地缓存的交易所交易对信息
+        self.markets = markets if markets is not None else create_market_cache(self.exchange)
+        tick_size, step_size = self.setting('TICK_SIZE'), self.setting('STEP_SIZE')
+        if not tick_size or not step_size:
+            try:
+                tick_size = tick_size or self.markets.tick_size(self.symbol)
+                step_size = step_size or self.markets.step_size(self.symbol)
+                self.min_order_size = max(self.min_order_size, self.markets.min_amount(self.symbol) or 0.0)
+            except Exception as e:
+                logger.error(f"获取交易对精度失败，使用默认精度: {e}")
+
+        # 初始化网格档位表（价格按价格精度、数量按数量精度取整）
+        self.ladder = GridLadder(
+            self.lower_price, self.upper_price, self.grid_number, self.grid_type, self.investment,
+            self.min_order_size, tick_size=float(tick_size or 0.01), step_size=float(step_size or 0.001)
+        )
         self.grid_prices = self.calculate_grid_prices()
         logger.info(f"网格价格列表: {self.grid_prices}")
+
+        # 事件驱动的主循环调度：价格穿过网格线、触及止损止盈或订单推送时检查，CHECK_INTERVAL 为最长检查间隔
+        self.scheduler = LoopScheduler(
+            self.grid_prices, min_interval=self.min_check_interval, max_interval=self.check_interval,
+            stop_loss_price=self.stop_loss_price, take_profit_price=self.take_profit_price,
+            wake_event=self.wake_event, halflife=float(self.setting('VOLATILITY_HALFLIFE', '60'))
+        )
+        if self.market_stream is not None:
+            self.market_stream.add_listener(self.scheduler.observe)
         
         # 打印网格信息
         self.print_grid_info()
+
+    def setting(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """读取配置项：优先使用网格配置，否则读取环境变量，统一返回字符串"""
+        value = self.config.get(name)
+        if value is None:
+            return os.getenv(name, default)
+        if isinstance(value, bool):
+            return 'true' if value else 'false'
+        return str(value)
         
     def signal_handler(self, signum, frame):
-        """处理退出信号"""
+        """处理退出信号，在 shutdown_timeout 秒内完成撤单后退出"""
         logger.info("\n收到退出信号，正在关闭...")
         try:
-            # 取消所有未完成订单
-            self.cancel_all_orders()
-            # 打印最终状态
-            self.order_manager.print_order_summary()
+            self.shutdown()
             logger.info("程序已安全退出")
         except Exception as e:
             logger.error(f"退出时发生错误: {e}")
         finally:
             sys.exit(0)
 
+    def shutdown(self):
+        """撤单（CANCEL_ON_EXIT=true 时，最多等待 shutdown_timeout 秒）并释放资源"""
+        # 在后台线程中取消所有未完成订单，超过截止时间则不再等待
+        if self.cancel_on_exit:
+            worker = threading.Thread(target=self.cancel_all_orders, daemon=True)
+            worker.start()
+            worker.join(self.shutdown_timeout)
+            if worker.is_alive():
+                logger.error(f"{self.symbol} 撤单未能在 {self.shutdown_timeout} 秒内完成，强制退出")
+        else:
+            logger.info(f"{self.symbol} 保留未完成订单，下次以 WARM_START=true 启动时接管")
+        self.close()
+
+    def close(self):
+        """停止数据流，关闭事件日志（写入缓冲的事件）、指标导出与性能分析，不撤单；重复调用时不做任何事"""
+        if self._closed:
+            return
+        self._closed = True
+        for stream in (self.market_stream, self.order_stream):
+            if stream is not None:
+                stream.stop(timeout=1)
+        if self._owns_journal:
+            self.journal.close()
+        for exporter in self.metrics_exporters:
+            exporter.close()
+        if self._owns_profiler:
+            self.profiler.close()
+        # 打印最终状态
+        self.order_manager.print_order_summary()
+
     def print_grid_info(self):
         """打印网格信息"""
         logger.info("\n=== 网格交易配置信息 ===")
@@ -156,7 +276,7 @@ class GridTrader:
         
         # 获取并显示账户余额
         try:
-            balance = self.exchange.fetch_balance()
+            self.ledger.maybe_sync()
             # 从交易对中获取基础货币和计价货币
             try:
                 base_currency, quote_currency = self.symbol.split('_')
@@ -164,8 +284,8 @@ class GridTrader:
                 logger.error(f"交易对格式错误: {self.symbol}，应为 BASE_QUOTE 格式")
                 return
             
-            base_balance = float(balance.get(base_currency, {}).get('free', 0))
-            quote_balance = float(balance.get(quote_currency, {}).get('free', 0))
+            base_balance = self.ledger.available(base_currency)
+            quote_balance = self.ledger.available(quote_currency)
             logger.info(f"当前{base_currency}余额: {base_balance:.3f}")
             logger.info(f"当前{quote_currency}余额: {quote_balance:.2f}")
         except Exception as e:
@@ -173,54 +293,49 @@ class GridTrader:
         
         logger.info("\n=== 网格列表 ===")
         
-        # 计算每个网格的投资金额
-        grid_investment = self.investment / self.grid_number
-        
-        for i in range(len(self.grid_prices) - 1):
-            buy_price = self.grid_prices[i]
-            sell_price = self.grid_prices[i + 1]
-            amount = self.get_order_amount(buy_price)
-            investment = amount * buy_price
-            profit = amount * (sell_price - buy_price)
-            profit_percentage = (profit / investment) * 100
-            
-            logger.info(f"网格 {i+1}: {buy_price:.2f} -> {sell_price:.2f} | "
-                       f"投入: {investment:.2f} | "
-                       f"收益: {profit:.2f} ({profit_percentage:.2f}%)")
+        # 每格的投入与收益已在网格档位表中预先计算
+        ladder = self.ladder
+        decimals = ladder.price_decimals
+        for i in range(len(ladder) - 1):
+            logger.info(f"网格 {i+1}: {ladder.prices[i]:.{decimals}f} -> {ladder.prices[i + 1]:.{decimals}f} | "
+                       f"投入: {ladder.notionals[i]:.2f} | "
+                       f"收益: {ladder.profits[i]:.2f} ({ladder.profit_pcts[i]:.2f}%)")
         
         logger.info("\n=== 风险提示 ===")
         logger.info(f"最小订单数量: {self.min_order_size}")
         logger.info(f"最大订单数量: {self.max_orders}")
-        logger.info(f"检查间隔: {self.check_interval}秒")
+        logger.info(f"检查间隔: {self.min_check_interval} - {self.check_interval}秒")
         logger.info("=" * 50 + "\n")
 
+    def get_current_price(self) -> float:
+        """获取当前价格：优先读取 WebSocket 行情快照，不可用时回退到 REST"""
+        if self.market_stream is not None:
+            price = self.market_stream.get_price()
+            if price is not None:
+                return price
+        ticker = self.exchange.fetch_ticker(self.symbol)
+        return float(ticker['last'])
+
     def calculate_grid_prices(self) -> List[float]:
-        """计算网格价格"""
-        prices = []
-        if self.grid_type == 'arithmetic':
-            # 等差网格
-            step = (self.upper_price - self.lower_price) / self.grid_number
-            for i in range(self.grid_number + 1):
-                price = self.lower_price + step * i
-                prices.append(round(price, 2))
-        else:
-            # 等比网格
-            ratio = (self.upper_price / self.lower_price) ** (1.0 / self.grid_number)
-            for i in range(self.grid_number + 1):
-                price = self.lower_price * (ratio ** i)
-                prices.append(round(price, 2))
-        return prices
+        """计算网格价格（等差或等比，按价格精度取整）"""
+        return self.ladder.price_list()
+
+    def format_price(self, price: float) -> str:
+        """按价格精度格式化下单价格"""
+        return f"{float(price):.{self.ladder.price_decimals}f}"
+
+    def format_amount(self, amount: float) -> str:
+        """按数量精度格式化下单数量"""
+        return f"{float(amount):.{self.ladder.amount_decimals}f}"
 
     def get_order_amount(self, price: float) -> float:
-        """计算订单数量"""
-        grid_investment = self.investment / self.grid_number
-        amount = grid_investment / price
-        return max(round(amount, 3), self.min_order_size)
+        """计算订单数量（按数量精度取整，不低于最小下单数量）"""
+        return self.ladder.amount_at(price)
 
     def check_balance(self, side: str, amount: float, price: float) -> bool:
-        """检查账户余额是否足够"""
+        """检查账户余额是否足够（读取本地余额账本）"""
         try:
-            balance = self.exchange.fetch_balance()
+            self.ledger.maybe_sync()
             # 从交易对中获取基础货币和计价货币
             try:
                 base_currency, quote_currency = self.symbol.split('_')
@@ -231,13 +346,13 @@ class GridTrader:
             if side == 'bid':
                 # 检查计价货币余额是否足够
                 required_quote = amount * price
-                quote_balance = float(balance.get(quote_currency, {}).get('free', 0))
+                quote_balance = self.ledger.available(quote_currency)
                 if quote_balance < required_quote:
                     logger.warning(f"{quote_currency}余额不足: 需要 {required_quote:.2f} {quote_currency}, 当前余额 {quote_balance:.2f} {quote_currency}")
                     return False
             else:
                 # 检查基础货币余额是否足够
-                base_balance = float(balance.get(base_currency, {}).get('free', 0))
+                base_balance = self.ledger.available(base_currency)
                 if base_balance < amount:
                     logger.warning(f"{base_currency}余额不足: 需要 {amount:.3f} {base_currency}, 当前余额 {base_balance:.3f} {base_currency}")
                     return False
@@ -247,47 +362,182 @@ class GridTrader:
             return False
 
     def place_grid_orders(self):
-        """布置网格订单"""
+        """布置网格订单：撤销所有未完成的订单，按当前价格重新确定空档位后对账补齐挂单"""
         try:
             # 获取当前价格
-            ticker = self.exchange.fetch_ticker(self.symbol)
-            current_price = float(ticker['last'])
+            current_price = self.get_current_price()
             logger.info(f"当前价格: {current_price}")
 
             # 取消所有未完成的订单
             self.cancel_all_orders()
 
-            # 计算价格范围限制（比如当前价格的±10%）
-            price_range = 0.1  # 10%的价格范围
-            min_price = current_price * (1 - price_range)
-            max_price = current_price * (1 + price_range)
-
-
-            # 在当前价格上下布置订单
-            for price in self.grid_prices:
-                # 只在下单价格在允许范围内时下单
-                if min_price <= price <= max_price:
-                    amount = self.get_order_amount(price)
-                    if price < current_price:
-                        logger.info(f"当前价格: {current_price}，下方布置买单{float(amount)} {float(price)}")
-                        if self.check_balance('bid', amount, price):
-                            self.place_order('bid', amount, price)
-                    elif price > current_price:
-                        logger.info(f"当前价格: {current_price}，上方布置卖单{float(amount)} {float(price)}")
-                        if self.check_balance('ask', amount, price):
-                            self.place_order('ask', amount, price)
-                else:
-                    logger.info(f"跳过价格 {float(price)}，超出允许范围 ({float(min_price):.2f} - {float(max_price):.2f})")
+            # 在当前价格上下（±10%）布置网格，最近的档位留空，由近到远分配余额
+            self.reconciler.reset()
+            plan = self.reconcile_grid(current_price)
+            logger.info(f"当前价格: {current_price}，布置 {len(plan.to_place)} 个网格订单")
                 
         except Exception as e:
             logger.error(f"布置网格订单错误: {e}")
 
+    def place_orders(self, orders: List[Tuple[str, float, float]], reserved: bool = False) -> List[Dict]:
+        """
+        批量下单
+        :param orders: (side, amount, price) 列表
+        :param reserved: 资金是否已通过 reserve_level 预留，下单成功后转给订单，失败时释放
+        :return: 下单成功的订单列表
+        """
+        if not orders:
+            return []
+
+        order_params = [
+            {
+                'symbol': self.symbol,
+                'side': 'Bid' if side == 'bid' else 'Ask',
+                'type': 'limit',
+                'amount': self.format_amount(amount),
+                'price': self.format_price(price),
+                'post_only': True,
+                'time_in_force': 'GTC',
+                'client_id': self.client_id_for(price)
+            }
+            for side, amount, price in orders
+        ]
+
+        try:
+            results = self.exchange.create_orders(order_params)
+        except Exception as e:
+            logger.error(f"批量下单错误: {e}")
+            if reserved:
+                for side, amount, price in orders:
+                    self.ledger.release(self._pending_key(side, price))
+            return []
+
+        placed = []
+        for (side, amount, price), order in zip(orders, results):
+            reservation = self._pending_key(side, price) if reserved else None
+            if order.get('id'):
+                self._register_order(order, side, amount, price, reservation=reservation)
+                placed.append(order)
+            else:
+                logger.error(f"下单失败: {side} {float(amount)} @ {float(price)} - {order.get('error')}")
+                if reservation is not None:
+                    self.ledger.release(reservation)
+
+        logger.info(f"批量下单完成: 成功 {len(placed)} / {len(orders)}")
+        return placed
+
+    def client_id_for(self, price: float):
+        """网格档位的 clientId（网格标签 + 档位序号），不在网格上的价格返回 None"""
+        level = self.ladder.level_of(float(price))
+        if level is None:
+            return None
+        return encode_client_id(self.grid_tag, level)
+
+    def is_own_order(self, order: Dict) -> bool:
+        """订单是否由本网格下单（根据 clientId 中的网格标签判断）"""
+        decoded = decode_client_id(order.get('clientId'))
+        return decoded is not None and decoded[0] == self.grid_tag
+
+    def adopt_open_orders(self) -> int:
+        """
+        热启动：接管交易所上本网格的未完成订单，登记到订单管理器与余额账本
+        :return: 接管的订单数量
+        """
+        self.ledger.maybe_sync()
+        open_orders = self.exchange.fetch_open_orders(self.symbol)
+        adopted = 0
+        for order in open_orders:
+            if not self.is_own_order(order):
+                continue
+            side = 'bid' if order['side'] == 'Bid' else 'ask'
+            if order['id'] in self.order_manager.orders:
+                # 已从事件日志恢复的订单只需重新预留资金
+                self.ledger.track(order['id'], *self._reservation(side, order['amount'] - order['filled'], order['price']))
+            else:
+                remaining = order['amount'] - order['filled']
+                self._register_order(order, side, remaining, order['price'], funds_locked=True)
+            adopted += 1
+        # 日志中仍未完成、但已不在交易所挂单列表中的订单
+        self.sync_filled_orders([order for order in open_orders if self.is_own_order(order)])
+        foreign = len(open_orders) - adopted
+        logger.info(f"热启动: 接管 {adopted} 个网格订单" + (f"，忽略 {foreign} 个非本网格订单" if foreign else ""))
+        return adopted
+
+    def _register_order(self, order: Dict, side: str, amount: float, price: float, funds_locked: bool = False,
+                        reservation: Optional[str] = None):
+        """
+        将交易所返回的订单添加到订单管理器，并在余额账本中预留资金
+        :param funds_locked: 资金是否已计入交易所冻结余额（接管已有订单时为 True）
+        :param reservation: 下单前已预留资金的预留键，转给该订单
+        """
+        order_info = OrderInfo(
+            order_id=order['id'],
+            symbol=self.symbol,
+            side=side,
+            price=float(price),  # 确保是float类型
+            amount=float(amount),  # 确保是float类型
+            status='open',
+            created_at=datetime.now()
+        )
+        self.order_manager.add_order(order_info)
+        if self.journal is not None:
+            self.journal.record_place(order['id'], self.symbol, side, price, amount, order.get('clientId'))
+
+        # 在本地余额账本中预留资金
+        currency, reserved = self._reservation(side, amount, price)
+        if reservation is not None:
+            self.ledger.rename(reservation, order['id'])
+        elif funds_locked:
+            self.ledger.track(order['id'], currency, reserved)
+        else:
+            self.ledger.reserve(order['id'], currency, reserved)
+
+    def _pending_key(self, side: str, price: float) -> str:
+        """下单前预留资金使用的预留键（共享账本时包含交易对）"""
+        return f"{self.symbol}:{side}:{float(price)}"
+
+    def reserve_level(self, level: GridLevel) -> bool:
+        """为新增挂单原子地检查并预留余额，卖单额外保留手续费缓冲"""
+        currency, amount = self._reservation(level.side, level.amount, level.price)
+        return self.ledger.try_reserve(self._pending_key(level.side, level.price), currency, amount,
+                                       self.reconciler.headroom(level))
+
+    def _reservation(self, side: str, amount: float, price: float) -> Tuple[str, float]:
+        """订单需要冻结的币种与数量"""
+        base_currency, quote_currency = self.symbol.split('_')
+        if side == 'bid':
+            return quote_currency, float(amount) * float(price)
+        return base_currency, float(amount)
+
+    def _settle_fill(self, order_id: str, side: str, fill_amount: float, fill_price: float,
+                     fee: float = 0.0, fee_currency: str = None):
+        """在本地余额账本中结算一笔成交"""
+        base_currency, quote_currency = self.symbol.split('_')
+        if side == 'bid':
+            received = fill_amount - (fee if fee_currency == base_currency else 0.0)
+            self.ledger.settle(order_id, fill_amount * fill_price, base_currency, received)
+        else:
+            received = fill_amount * fill_price - (fee if fee_currency == quote_currency else 0.0)
+            self.ledger.settle(order_id, fill_amount, quote_currency, received)
+
+    def level_for(self, price: float):
+        """价格对应的网格档位序号，不在网格上时返回 None"""
+        return self.ladder.level_of(float(price))
+
+    def _record_pnl_fill(self, order_id: str, side: str, fill_price: float, fill_amount: float,
+                         fee: float = 0.0, fee_currency: str = None, trade_id: str = None):
+        """将订单推送或状态同步得到的成交计入盈亏（启用成交同步时由成交历史负责）"""
+        if self.trade_sync is not None:
+            return
+        order = self.order_manager.get_order(order_id)
+        level = self.level_for(order.price if order is not None else fill_price)
+        self.pnl.on_fill(side, fill_price, fill_amount, fee, fee_currency, trade_id, level)
+
     def place_order(self, side: str, amount: float, price: float):
         """下单"""
         try:
             # 获取当前价格
-            ticker = self.exchange.fetch_ticker(self.symbol)
-            current_price = float(ticker['last'])
+            current_price = self.get_current_price()
             
             # 检查是否会导致立即成交
             if side == 'bid':
@@ -309,10 +559,11 @@ class GridTrader:
                 'symbol': self.symbol,
                 'side': exchange_side,
                 'type': 'limit',  # 使用驼峰命名法
-                'amount': str(amount),  # 使用quantity而不是amount
-                'price': str(price),
+                'amount': self.format_amount(amount),  # 使用quantity而不是amount
+                'price': self.format_price(price),
                 'post_only': True,  # 使用驼峰命名法
-                'time_in_force': 'GTC'
+                'time_in_force': 'GTC',
+                'client_id': self.client_id_for(price)
             }
             
             # 创建订单
@@ -321,17 +572,7 @@ class GridTrader:
             
             # 创建订单信息并添加到订单管理器
             logger.info(f"订单信息: {order}")
-            order_info = OrderInfo(
-                order_id=order['id'],
-                symbol=self.symbol,
-                side=side,
-                price=float(price),  # 确保是float类型
-                amount=float(amount),  # 确保是float类型
-                status='open',
-                created_at=datetime.now()
-            )
-            logger.info(f"订单信息2: {order_info}")
-            self.order_manager.add_order(order_info)
+            self._register_order(order, side, amount, price)
             
             logger.info(f"下单成功: {side} {float(amount)} {self.symbol} @ {float(price)}")  # 使用float类型进行日志输出
             return order
@@ -340,103 +581,327 @@ class GridTrader:
             return None
 
     def cancel_all_orders(self):
-        """取消所有订单"""
+        """取消所有订单（单次批量撤单请求），并根据撤单结果更新订单管理器"""
         try:
-            open_orders = self.exchange.fetch_open_orders(self.symbol)
-            if not open_orders:
+            cancelled = self.exchange.cancel_all_orders(self.symbol)
+            if not cancelled:
                 logger.info("没有未完成的订单")
                 return
-                
-            for order in open_orders:
-                if not order or 'id' not in order:
+
+            for order in cancelled:
+                order_id = order.get('id')
+                if not order_id:
                     logger.warning("跳过无效订单")
                     continue
-                    
-                try:
-                    # 使用正确的cancel_order方法
-                    result = self.exchange.cancel_order(order['id'], self.symbol)
-                    if result:
-                        # 如果订单在我们的管理器中，更新状态
-                        if order['id'] in self.order_manager.orders:
-                            self.order_manager.update_order(order['id'], 'cancelled')
-                            logger.info(f"已取消订单 {order['id']}")
-                        else:
-                            logger.info(f"已取消外部订单 {order['id']}")
-                except Exception as e:
-                    logger.error(f"取消订单 {order['id']} 失败: {e}")
-                    continue
-                    
+                # 如果订单在我们的管理器中，更新状态
+                self.ledger.release(order_id)
+                if order_id in self.order_manager.orders:
+                    self.order_manager.update_order(order_id, 'cancelled')
+                    if self.journal is not None:
+                        self.journal.record_cancel(order_id, self.symbol)
+                    logger.info(f"已取消订单 {order_id}")
+                else:
+                    if self.journal is not None and order_id in self._journal_open:
+                        # 上次运行留下的订单（冷启动时未恢复），补记撤单事件，避免日志中一直显示为未完成
+                        self._journal_open.discard(order_id)
+                        self.journal.record_cancel(order_id, self.symbol)
+                    logger.info(f"已取消外部订单 {order_id}")
+
+            # 本地仍为未完成但不在撤单结果中的订单，可能已经成交或早已失效
+            cancelled_ids = {order.get('id') for order in cancelled}
+            missing = [order.order_id for order in self.order_manager.get_open_orders() if order.order_id not in cancelled_ids]
+            if missing:
+                logger.warning(f"{len(missing)} 个本地未完成订单不在撤单结果中: {missing}")
+
             logger.info("订单取消操作完成")
         except Exception as e:
             logger.error(f"获取或取消订单时发生错误: {e}")
 
-    def check_and_adjust_orders(self):
-        """检查并调整订单"""
+    def sync_filled_orders(self, open_orders: List[Dict]):
+        """
+        根据交易所未完成订单列表同步本地订单状态（订单流不可用或定期同步时使用）
+        本地仍为未完成但已不在交易所列表中的订单，先查询最终状态再结算：
+        已成交的按成交均价结算订单流未推送过的数量，被撤销或过期的只结算已成交部分，无法确认的下次同步时重试
+        :param open_orders: 交易所返回的未完成订单列表
+        """
+        open_ids = {order['id'] for order in open_orders}
+        missing = [order for order in self.order_manager.get_open_orders() if order.order_id not in open_ids]
+        for order in missing:
+            final = self.fetch_final_status(order)
+            if final is None or final[0] == 'open':
+                continue
+            with self._fill_lock:
+                # 查询期间订单推送可能已经结算该订单
+                if order.status != 'open':
+                    continue
+                self._settle_final_status(order, *final)
+
+    def fetch_final_status(self, order: OrderInfo) -> Optional[Tuple[str, float, Optional[float]]]:
+        """
+        查询已不在挂单列表中的订单的最终状态：优先查询订单，失败时根据该订单的成交历史判断
+        :param order: 本地订单
+        :return: (状态, 本地订单数量内的累计成交数量, 成交均价)，状态为 'closed'、'cancelled' 或 'open'；无法确认时返回 None
+        """
+        try:
+            result = self.exchange.fetch_order(order.order_id, self.symbol)
+            if result:
+                # 接管的订单按剩余数量登记，扣除接管前已成交的部分
+                executed = max(0.0, result['filled'] - max(0.0, result['amount'] - order.amount))
+                average = result['cost'] / result['filled'] if result['filled'] else None
+                status = {'Filled': 'closed', 'Cancelled': 'cancelled', 'Expired': 'cancelled'}.get(result['status'], 'open')
+                return status, executed, average
+        except Exception as e:
+            logger.warning(f"查询订单 {order.order_id} 状态失败，改用成交历史确认: {e}")
+
+        try:
+            trades = self.exchange.fetch_my_trades(self.symbol, limit=1000, params={'orderId': order.order_id})
+        except Exception as e:
+            logger.error(f"查询订单 {order.order_id} 成交历史失败，下次同步时重试: {e}")
+            return None
+        trades = [trade for trade in trades if trade['order'] == order.order_id]
+        filled = sum(trade['amount'] for trade in trades)
+        average = sum(trade['cost'] for trade in trades) / filled if filled else None
+        executed = min(filled, order.amount)
+        # 订单已不在挂单列表中：成交历史中完全成交即为已成交，否则已被撤销或过期
+        status = 'closed' if executed >= order.amount * (1 - 1e-9) else 'cancelled'
+        return status, executed, average
+
+    def _settle_final_status(self, order: OrderInfo, status: str, executed: float, average: Optional[float]):
+        """在持有 _fill_lock 的情况下按查询到的最终状态结算订单，只结算订单流未推送过的成交数量"""
+        unrecorded = executed - (order.filled_amount or 0.0)
+        price = average or order.price
+        if unrecorded > 0:
+            self._settle_fill(order.order_id, order.side, unrecorded, price)
+            self._record_pnl_fill(order.order_id, order.side, price, unrecorded)
+        self.order_manager.update_order(order.order_id, status, price, executed)
+        if self.journal is not None:
+            if status == 'closed':
+                self.journal.record_fill(order.order_id, self.symbol, order.side, price, max(unrecorded, 0.0), final=True)
+            else:
+                if unrecorded > 0:
+                    self.journal.record_fill(order.order_id, self.symbol, order.side, price, unrecorded)
+                self.journal.record_cancel(order.order_id, self.symbol)
+        self.ledger.release(order.order_id)
+        if status == 'closed':
+            self.reconciler.on_fill(order.side, self.level_for(order.price))
+        logger.info(f"同步订单状态: {order.order_id} {order.side} {executed} @ {price} -> {status}")
+
+    def on_order_update(self, event: Dict):
+        """处理订单更新推送（在 WebSocket 线程中执行），并唤醒主循环"""
+        with self._fill_lock:
+            order = self.order_manager.get_order(event['id'])
+            if order is not None and order.status != 'open':
+                # REST 同步已结算该订单，忽略迟到的推送
+                logger.debug(f"忽略已结束订单的推送: {event['id']} {event['event']}")
+                return
+            if not self._apply_order_update(event):
+                return
+        self.scheduler.notify(REASON_ORDER)
+
+    def _apply_order_update(self, event: Dict) -> bool:
+        """在持有 _fill_lock 的情况下处理订单推送，返回是否为需要处理的订单事件"""
+        if event['event'] == 'orderFill':
+            status = 'closed' if event['status'] == 'Filled' else 'open'
+            self.order_manager.update_order(event['id'], status, event['average'], event['filled'])
+            if event['fillAmount'] and event['fillPrice']:
+                side = 'bid' if event['side'] == 'Bid' else 'ask'
+                self._settle_fill(event['id'], side, event['fillAmount'], event['fillPrice'],
+                                  event['fee'] or 0.0, event['feeCurrency'])
+                self._record_pnl_fill(event['id'], side, event['fillPrice'], event['fillAmount'],
+                                      event['fee'] or 0.0, event['feeCurrency'], event['tradeId'])
+                if self.journal is not None:
+                    self.journal.record_fill(event['id'], self.symbol, side, event['fillPrice'], event['fillAmount'],
+                                             event['fee'] or 0.0, final=status == 'closed')
+            if status == 'closed':
+                self.ledger.release(event['id'])
+                self.reconciler.on_fill('bid' if event['side'] == 'Bid' else 'ask', self.level_for(event['price']))
+            logger.info(f"订单成交: {event['id']} {event['side']} {event['fillAmount']} @ {event['fillPrice']} ({event['status']})")
+        elif event['event'] in ('orderCancelled', 'orderExpired'):
+            self.order_manager.update_order(event['id'], 'cancelled')
+            self.ledger.release(event['id'])
+            if self.journal is not None:
+                self.journal.record_cancel(event['id'], self.symbol)
+        else:
+            return False
+        return True
+
+    def needs_order_sync(self) -> bool:
+        """是否需要通过 REST 查询未完成订单：订单流不在线、重连后尚未同步，或距上次同步已达 ORDER_SYNC_EVERY 次检查"""
+        if self.order_stream is None or not self.order_stream.connected:
+            return True
+        return (self.order_stream.connections != self._order_sync_connection
+                or self._checks_since_order_sync >= self.order_sync_every)
+
+    def get_live_orders(self, open_orders: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        获取当前挂单（id、side、price、amount）
+        订单流在线时直接使用推送维护的本地订单状态，否则（或需要定期同步时）查询交易所未完成订单
+        :param open_orders: 已批量获取的本交易对未完成订单，为 None 时单独查询
+        """
+        if not self.needs_order_sync():
+            self._checks_since_order_sync += 1
+            return [
+                {'id': order.order_id, 'side': order.side, 'price': order.price, 'amount': order.amount}
+                for order in self.order_manager.get_open_orders()
+            ]
+        if self.order_stream is not None and self.order_stream.connected:
+            # 先记录当前连接，同步期间再次重连时下次检查会重新同步
+            self._order_sync_connection = self.order_stream.connections
+            self._checks_since_order_sync = 0
+        if open_orders is None:
+            open_orders = self.exchange.fetch_open_orders(self.symbol)
+        open_orders = [order for order in open_orders if self.is_own_order(order)]
+        self.sync_filled_orders(open_orders)
+        return [
+            {
+                'id': order['id'],
+                'side': 'bid' if order['side'] == 'Bid' else 'ask',
+                'price': order['price'],
+                'amount': order['amount'] - order['filled']
+            }
+            for order in open_orders
+        ]
+
+    def reconcile_grid(self, current_price: float, open_orders: Optional[List[Dict]] = None):
+        """
+        将现有挂单与目标网格对账，只执行最小的撤单与下单操作
+        :param current_price: 当前价格
+        :param open_orders: 已批量获取的本交易对未完成订单，为 None 时按需查询
+        :return: 对账结果
+        """
+        with self.profiler.stage('fetch'):
+            self.ledger.maybe_sync()
+            live_orders = self.get_live_orders(open_orders)
+        with self.profiler.stage('decide'):
+            plan = self.reconciler.plan(self.grid_prices, current_price, self.get_order_amount, live_orders)
+        if plan.to_cancel:
+            with self.profiler.stage('cancel'):
+                cancelled = self.exchange.cancel_orders([order['id'] for order in plan.to_cancel], self.symbol)
+                for order in cancelled:
+                    self.ledger.release(order['id'])
+                    self.order_manager.update_order(order['id'], 'cancelled')
+                    if self.journal is not None:
+                        self.journal.record_cancel(order['id'], self.symbol)
+        if plan.to_place:
+            # 撤单释放的资金可用于新挂单；逐个档位原子地检查并预留余额，多个网格共享账本时不会超额分配
+            with self.profiler.stage('decide'):
+                plan.to_place = self.reconciler.allocate(plan.to_place, self.reserve_level)
+        if plan.empty:
+            logger.debug(f"网格无需调整，保留 {len(plan.kept)} 个订单")
+            return plan
+
+        logger.info(f"网格对账: 保留 {len(plan.kept)} 个，撤销 {len(plan.to_cancel)} 个，新增 {len(plan.to_place)} 个")
+        if plan.to_place:
+            with self.profiler.stage('place'):
+                self.place_orders([(level.side, level.amount, level.price) for level in plan.to_place], reserved=True)
+        return plan
+
+    def sync_trades(self) -> List[Dict]:
+        """按 TRADE_SYNC_INTERVAL 增量同步成交历史，返回新成交"""
+        if self.trade_sync is None or time.time() - self._last_trade_sync < self.trade_sync_interval:
+            return []
+        self._last_trade_sync = time.time()
+        try:
+            trades = self.trade_sync.sync()
+            for trade in trades:
+                order = self.order_manager.get_order(trade['order'])
+                self.pnl.apply_trade(trade, self.level_for(order.price if order is not None else trade['price']))
+            return trades
+        except Exception as e:
+            logger.error(f"同步成交历史失败: {e}")
+            return []
+
+    def check_and_adjust_orders(self, current_price: Optional[float] = None,
+                                open_orders: Optional[List[Dict]] = None):
+        """
+        检查并调整订单
+        :param current_price: 已批量获取的当前价格，为 None 时单独获取
+        :param open_orders: 已批量获取的本交易对未完成订单，为 None 时按需查询
+        :return: 是否继续运行（触及止损或止盈时返回 False）
+        """
+        started = time.monotonic()
+        iteration = self.profiler.begin_iteration(self.symbol)
+        reason = None
         try:
             # 获取当前价格和持仓
-            ticker = self.exchange.fetch_ticker(self.symbol)
-            current_price = float(ticker['last'])
-            
-            # 获取账户余额
-            balance = self.exchange.fetch_balance()
-            base_currency, quote_currency = self.symbol.split('_')
-            base_balance = float(balance.get(base_currency, {}).get('free', 0))
+            if current_price is None:
+                with self.profiler.stage('fetch'):
+                    current_price = self.get_current_price()
+            reason = self.scheduler.begin_check(current_price)
+            if self.metrics is not None:
+                self.metrics.inc('grid_checks_total', symbol=self.symbol, reason=reason)
+                self.metrics.set('grid_last_price', current_price, symbol=self.symbol)
             
             # 检查是否触及止损或止盈
             if current_price <= self.stop_loss_price or current_price >= self.take_profit_price:
                 logger.warning(f"触及止损/止盈价格，停止交易: {current_price}")
-                self.cancel_all_orders()
+                with self.profiler.stage('cancel'):
+                    self.cancel_all_orders()
                 return False
 
-            # 获取未完成订单
-            open_orders = self.exchange.fetch_open_orders(self.symbol)
-            
-            # 更新订单状态
-            for order in open_orders:
-                if order['id'] in self.order_manager.orders:
-                    if order['status'] == 'closed':
-                        self.order_manager.update_order(
-                            order['id'],
-                            'closed',
-                            float(order.get('average', 0)),
-                            float(order.get('filled', 0))
-                        )
-            
-            # 根据基础货币余额决定是否需要调整订单
-            if base_balance == 0:
-                # 没有基础货币，计算当前价格下方可以布置的买单数量
-                possible_buy_orders = len([price for price in self.grid_prices if price < current_price])
-                buy_orders = [order for order in open_orders if order['side'] == 'Bid']
-                
-                if len(buy_orders) < possible_buy_orders:
-                    logger.info(f"{base_currency}余额为0，买单数量不足，重新布置网格。当前买单数量: {len(buy_orders)}，可布置买单数量: {possible_buy_orders}")
-                    self.place_grid_orders()
-            else:
-                # 有基础货币，计算可用的卖单数量（考虑手续费）
-                fee_rate = 0.003  # 0.1% 手续费率
-                available_balance = base_balance * (1 - fee_rate)  # 考虑手续费后的可用余额
-                possible_sell_orders = len([price for price in self.grid_prices if price > current_price])
-                sell_orders = [order for order in open_orders if order['side'] == 'Ask']
-                
-                # 计算每个网格需要的数量
-                grid_amount = self.get_order_amount(current_price)
-                
-                # 计算实际可以布置的卖单数量（考虑余额限制）
-                max_possible_sell_orders = int(available_balance / grid_amount)
-                actual_possible_sell_orders = min(possible_sell_orders, max_possible_sell_orders)
-                
-                if len(sell_orders) < actual_possible_sell_orders:
-                    logger.info(f"卖单数量不足，重新布置网格。当前卖单数量: {len(sell_orders)}，可布置卖单数量: {actual_possible_sell_orders}，可用余额: {available_balance:.3f} {base_currency}")
-                    self.place_grid_orders()
+            # 增量对账：只撤销多余订单、补齐缺失档位
+            self.reconcile_grid(current_price, open_orders)
+
+            # 增量同步成交历史
+            with self.profiler.stage('fetch'):
+                self.sync_trades()
                 
             # 打印订单汇总信息
-            self.order_manager.print_order_summary()
+            with self.profiler.stage('summarise'):
+                self.order_manager.print_order_summary()
+                self.pnl.print_summary(current_price)
+                self.scheduler.print_summary()
 
+            if self.metrics is not None:
+                self.metrics.observe('grid_check_duration_seconds', time.monotonic() - started, symbol=self.symbol)
+                self.metrics.set('grid_open_orders', len(self.order_manager.get_open_orders()), symbol=self.symbol)
             return True
 
         except Exception as e:
             logger.error(f"检查订单错误: {e}")
+            if self.metrics is not None:
+                self.metrics.inc('grid_check_errors_total', symbol=self.symbol)
+            # 未完成的检查会被立即重新调度，出错时稍作等待，避免连续失败时频繁请求
+            time.sleep(self.min_check_interval)
             return True
+        finally:
+            self.profiler.end_iteration(iteration, reason)
+
+    def start(self):
+        """启动数据流、恢复订单状态并布置初始网格"""
+        # 启动行情与订单数据流，等待行情订阅生效（超时则暂时使用 REST）
+        # 订单流在首个订单事件到达前不会视为在线，期间通过 REST 同步挂单，无需等待
+        for stream in (self.market_stream, self.order_stream):
+            if stream is not None:
+                stream.start()
+        if self.market_stream is not None:
+            self.market_stream.wait_connected(5)
+
+        # 从事件日志恢复订单历史，热启动时同时恢复未完成订单以便接管
+        if self.journal_dir:
+            journal_open = JournalReader(self.journal_dir).restore(self.order_manager, self.symbol, include_open=self.warm_start)
+            if not self.warm_start:
+                self._journal_open = {order.order_id for order in journal_open}
+
+        # 初始布置网格：热启动时接管已有订单，只补齐缺失的档位
+        if self.warm_start:
+            self.adopt_open_orders()
+            self.reconcile_grid(self.get_current_price())
+        else:
+            self.place_grid_orders()
+        self.seed_pnl(self.get_current_price())
+
+    def seed_pnl(self, price: float):
+        """
+        将本网格持有的基础货币按启动时价格计入盈亏引擎的持仓成本
+        默认为本网格卖单中尚未成交的数量（含热启动接管的卖单），配置 PNL_SEED_AMOUNT 时使用该数量
+        :param price: 成本价格
+        """
+        amount = self.pnl_seed_amount
+        if amount is None:
+            amount = sum(order.amount - (order.filled_amount or 0.0)
+                         for order in self.order_manager.get_open_orders() if order.side == 'ask')
+        self.pnl.seed(amount, price)
 
     def run(self):
         """运行网格交易"""
@@ -446,18 +911,33 @@ class GridTrader:
         logger.info(f"网格数量: {self.grid_number}")
         logger.info("按 Ctrl+C 可以安全退出程序")
 
-        # 初始布置网格
-        self.place_grid_orders()
+        # 设置信号处理
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+        self.profiler.install()
+
+        try:
+            self.start()
 
-        # 持续监控
-        while True:
-            try:
-                if not self.check_and_adjust_orders():
-                    break
-                time.sleep(self.check_interval)
-            except Exception as e:
-                logger.error(f"运行错误: {e}")
-                time.sleep(self.check_interval)
+            # 持续监控：等待调度器唤醒，没有实时行情时按自适应间隔轮询价格，只有需要时才执行完整检查
+            while True:
+                try:
+                    polling = self.market_stream is None or not self.market_stream.connected
+                    reason = self.scheduler.wait(polling)
+                    current_price = None
+                    if reason == REASON_POLL:
+                        current_price = self.get_current_price()
+                        if self.scheduler.observe(current_price) is None:
+                            continue
+                    logger.debug(f"执行检查: {self.scheduler.pending or reason}")
+                    if not self.check_and_adjust_orders(current_price):
+                        break
+                except Exception as e:
+                    logger.error(f"运行错误: {e}")
+                    time.sleep(self.min_check_interval)
+        finally:
+            # 止损止盈停止或异常退出时同样写入缓冲的日志事件（事件日志写盘线程为守护线程）
+            self.close()
 
 if __name__ == "__main__":
     trader = GridTrader()
@@ -0,0 +1,194 @@
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 唤醒原因
+REASON_ORDER = 'order'  # 订单成交或撤销推送
+REASON_GRID = 'grid'  # 价格穿过网格线
+REASON_RISK = 'risk'  # 价格触及止损或止盈
+REASON_HEARTBEAT = 'heartbeat'  # 超过最长检查间隔
+REASON_POLL = 'poll'  # 只需要获取一次价格（REST 轮询）
+
+
+class LoopScheduler:
+    """
+    事件驱动的主循环调度器
+    只有价格穿过上次检查时所在网格区间的上下网格线、触及止损/止盈、收到订单推送，或超过最长检查间隔时才执行完整检查；
+    没有实时行情时按需轮询价格，轮询间隔根据波动率与价格到最近网格线（挂单）或风控价格的距离自适应：
+    以 EWMA 估计每秒对数收益率方差 σ²，价格移动相对距离 d 的期望时间约为 d²/σ²，轮询间隔取其一部分并限制在
+    [min_interval, max_interval] 之间。行情平静时几乎不产生请求，行情剧烈时在亚秒级内响应
+    """
+
+    def __init__(self, grid_prices: List[float], min_interval: float = 0.5, max_interval: float = 60.0,
+                 stop_loss_price: float = 0.0, take_profit_price: float = float('inf'),
+                 wake_event: Optional[threading.Event] = None, halflife: float = 60.0, safety: float = 0.25):
+        """
+        :param grid_prices: 升序的网格价格
+        :param min_interval: 最短轮询间隔（秒）
+        :param max_interval: 最长检查间隔（秒），超过后即使没有事件也执行一次完整检查
+        :param stop_loss_price: 止损价格
+        :param take_profit_price: 止盈价格
+        :param wake_event: 需要检查时设置的唤醒事件
+        :param halflife: 波动率估计的半衰期（秒）
+        :param safety: 轮询间隔占价格到达最近网格线期望时间的比例
+        """
+        self.grid_prices = list(grid_prices)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.stop_loss_price = stop_loss_price
+        self.take_profit_price = take_profit_price
+        self.wake_event = wake_event if wake_event is not None else threading.Event()
+        self.halflife = halflife
+        self.safety = safety
+
+        self._lock = threading.Lock()
+        self._variance: Optional[float] = None  # 每秒对数收益率方差的 EWMA
+        self._last_price: Optional[float] = None
+        self._last_time: Optional[float] = None
+        self._band: Optional[tuple] = None  # 上次检查时价格所在的网格区间 (下方网格线, 上方网格线)
+        self.pending: Optional[str] = None  # 尚未处理的唤醒原因
+        self.last_check = 0.0
+        self.next_poll = 0.0
+        self.wakeups: Dict[str, int] = {}
+
+    @property
+    def volatility(self) -> Optional[float]:
+        """每秒对数收益率标准差的估计值"""
+        variance = self._variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def _update_volatility(self, price: float, now: float):
+        """按时间加权更新方差：每个样本的权重与间隔成正比，结果近似为半衰期内的已实现方差"""
+        if self._last_price is not None and price > 0 and self._last_price > 0:
+            dt = now - self._last_time
+            if dt > 0:
+                log_return = math.log(price / self._last_price)
+                sample = log_return * log_return / dt
+                alpha = 1 - 0.5 ** (dt / self.halflife)
+                self._variance = sample if self._variance is None else self._variance + alpha * (sample - self._variance)
+        self._last_price = price
+        self._last_time = now
+
+    def _trigger(self, price: float) -> Optional[str]:
+        """价格是否需要立即执行完整检查"""
+        if price <= self.stop_loss_price or price >= self.take_profit_price:
+            return REASON_RISK
+        if self._band is not None:
+            lower, upper = self._band
+            if (lower is not None and price <= lower) or (upper is not None and price >= upper):
+                return REASON_GRID
+        return None
+
+    def _poll_interval(self, price: float) -> float:
+        """价格到最近网格线或风控价格的期望时间的一部分，限制在 [min_interval, max_interval] 之间"""
+        if self._band is None or not price or self._variance is None:
+            # 还没有网格区间或波动率估计时按最短间隔采样
+            return self.min_interval
+        if self._variance == 0:
+            return self.max_interval
+        distances = [price - self.stop_loss_price, self.take_profit_price - price]
+        lower, upper = self._band
+        if lower is not None:
+            distances.append(price - lower)
+        if upper is not None:
+            distances.append(upper - price)
+        distance = max(0.0, min(distances)) / price
+        interval = self.safety * distance * distance / self._variance
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def _set_pending(self, reason: str):
+        if self.pending is None:
+            self.pending = reason
+        self.wake_event.set()
+
+    def observe(self, price: float, timestamp: Optional[float] = None) -> Optional[str]:
+        """
+        记录一次价格（WebSocket 行情回调或 REST 轮询），需要检查时设置唤醒事件
+        :param price: 当前价格
+        :param timestamp: 单调时钟时间，默认为当前时间
+        :return: 唤醒原因，不需要检查时返回 None
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            self._update_volatility(price, now)
+            self.next_poll = now + self._poll_interval(price)
+            reason = self._trigger(price)
+            if reason is not None:
+                self._set_pending(reason)
+        return reason
+
+    def notify(self, reason: str = REASON_ORDER):
+        """外部事件（如订单成交推送）要求尽快执行完整检查"""
+        with self._lock:
+            self._set_pending(reason)
+
+    def begin_check(self, price: float, timestamp: Optional[float] = None):
+        """
+        开始一次完整检查：清除待处理的唤醒原因，并以本次检查的价格确定新的网格区间
+        检查期间到达的事件会保留到下一次检查
+        :param price: 本次检查的价格
+        :param timestamp: 单调时钟时间，默认为当前时间
+        :return: 本次检查的唤醒原因
+        """
+        now = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            reason = self.pending or REASON_HEARTBEAT
+            self.wakeups[reason] = self.wakeups.get(reason, 0) + 1
+            self.pending = None
+            self.last_check = now
+            below = bisect_left(self.grid_prices, price)
+            above = bisect_right(self.grid_prices, price)
+            self._band = (
+                self.grid_prices[below - 1] if below > 0 else None,
+                self.grid_prices[above] if above < len(self.grid_prices) else None
+            )
+            self._update_volatility(price, now)
+            self.next_poll = now + self._poll_interval(price)
+        return reason
+
+    def due(self, now: Optional[float] = None) -> Optional[str]:
+        """需要执行完整检查时返回原因，否则返回 None"""
+        now = time.monotonic() if now is None else now
+        if self.pending is not None:
+            return self.pending
+        if now >= self.last_check + self.max_interval:
+            return REASON_HEARTBEAT
+        return None
+
+    def poll_due(self, now: Optional[float] = None) -> bool:
+        """没有实时行情时是否需要轮询价格"""
+        return (time.monotonic() if now is None else now) >= self.next_poll
+
+    def next_deadline(self, polling: bool) -> float:
+        """下一次需要醒来的单调时钟时间"""
+        deadline = self.last_check + self.max_interval
+        return min(deadline, self.next_poll) if polling else deadline
+
+    def wait(self, polling: bool) -> str:
+        """
+        阻塞直到需要执行完整检查或轮询价格
+        :param polling: 是否需要通过 REST 轮询价格（没有实时行情时）
+        :return: 唤醒原因，REASON_POLL 表示只需获取价格后调用 observe
+        """
+        while True:
+            now = time.monotonic()
+            reason = self.due(now)
+            if reason is not None:
+                return reason
+            if polling and self.poll_due(now):
+                return REASON_POLL
+            self.wake_event.wait(max(0.0, self.next_deadline(polling) - now))
+            self.wake_event.clear()
+
+    def print_summary(self):
+        """打印唤醒统计与当前波动率"""
+        message = f"调度: 检查 {sum(self.wakeups.values())} 次 {self.wakeups}"
+        volatility = self.volatility
+        if volatility is not None:
+            message += f" | 波动率 {volatility * math.sqrt(3600) * 100:.3f}%/小时"
+        logger.info(message)
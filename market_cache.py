@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = 'markets_cache.json'
+DEFAULT_TTL = 86400  # 交易对信息很少变化，默认缓存一天
+MISS_REFRESH_INTERVAL = 60  # 查询不存在的交易对时，距上次刷新超过该时间（秒）才重新刷新
+
+
+def decimals_of(increment: float) -> int:
+    """最小变动单位对应的小数位数，如 0.01 -> 2"""
+    exponent = Decimal(str(increment)).normalize().as_tuple().exponent
+    return max(0, -exponent)
+
+
+class MarketCache:
+    """
+    交易对信息本地缓存
+    解析后的交易对信息（含价格与数量精度、下单限制）按交易对保存在 JSON 文件中，
+    缓存未过期时启动不需要请求交易所；过期或查询不存在的交易对时才刷新，刷新失败时继续使用旧缓存
+    """
+
+    def __init__(self, exchange, path: Optional[str] = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL):
+        """
+        :param exchange: 交易所客户端（需支持 fetch_markets）
+        :param path: 缓存文件路径，为 None 时只缓存在内存中
+        :param ttl: 缓存有效期（秒）
+        """
+        self.exchange = exchange
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._markets: Dict[str, Dict] = {}
+        self._precision: Dict[str, tuple] = {}  # symbol -> (价格小数位, 数量小数位)
+        self.updated_at = 0.0
+        self._attempted_at = 0.0  # 最近一次刷新的时间（无论成功与否）
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._set(data.get('markets', []), data.get('updatedAt', 0.0))
+            logger.debug(f"从缓存加载 {len(self._markets)} 个交易对")
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取交易对缓存失败: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updatedAt': self.updated_at, 'markets': list(self._markets.values())}, f)
+        os.replace(tmp_path, self.path)
+
+    def _set(self, markets: List[Dict], updated_at: float):
+        self._markets = {market['symbol']: market for market in markets}
+        self._precision = {}
+        for symbol, market in self._markets.items():
+            tick = market['precision'].get('price')
+            step = market['precision'].get('amount')
+            self._precision[symbol] = (decimals_of(tick) if tick else None, decimals_of(step) if step else None)
+        self.updated_at = updated_at
+
+    @property
+    def expired(self) -> bool:
+        """缓存是否已过期"""
+        return time.time() - self.updated_at >= self.ttl
+
+    def refresh(self) -> bool:
+        """
+        从交易所刷新交易对信息
+        :return: 是否刷新成功
+        """
+        with self._lock:
+            self._attempted_at = time.time()
+            try:
+                markets = self.exchange.fetch_markets()
+            except Exception as e:
+                if self._markets:
+                    logger.warning(f"刷新交易对信息失败，继续使用缓存: {e}")
+                    return False
+                raise
+            self._set(markets, time.time())
+            try:
+                self._save()
+            except OSError as e:
+                logger.warning(f"写入交易对缓存失败: {e}")
+        logger.info(f"已刷新 {len(markets)} 个交易对信息")
+        return True
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """
+        获取交易对信息，缓存过期或不存在该交易对时先刷新
+        已有缓存时距上次刷新（含失败的刷新）不足 MISS_REFRESH_INTERVAL 秒则直接使用缓存，交易所不可用时不会每次查询都请求
+        """
+        market = self._markets.get(symbol)
+        if (self.expired or market is None) and \
+                (not self._markets or time.time() - self._attempted_at >= MISS_REFRESH_INTERVAL):
+            self.refresh()
+            market = self._markets.get(symbol)
+        return market
+
+    def tick_size(self, symbol: str) -> Optional[float]:
+        """价格最小变动单位"""
+        market = self.get(symbol)
+        return market['precision'].get('price') if market else None
+
+    def step_size(self, symbol: str) -> Optional[float]:
+        """数量最小变动单位"""
+        market = self.get(symbol)
+        return market['precision'].get('amount') if market else None
+
+    def min_amount(self, symbol: str) -> Optional[float]:
+        """最小下单数量"""
+        market = self.get(symbol)
+        return market['limits']['amount'].get('min') if market else None
+
+    def format_price(self, symbol: str, price: float) -> str:
+        """按交易对价格精度格式化价格"""
+        decimals = self._precision.get(symbol, (None, None))[0]
+        return str(price) if decimals is None else f"{price:.{decimals}f}"
+
+    def format_amount(self, symbol: str, amount: float) -> str:
+        """按交易对数量精度格式化数量"""
+        decimals = self._precision.get(symbol, (None, None))[1]
+        return str(amount) if decimals is None else f"{amount:.{decimals}f}"
@@ -0,0 +1,215 @@
+import logging
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 指标定义: 名称 -> (类型, 说明, 直方图分桶)
+METRICS = {
+    'backpack_request_duration_seconds': ('histogram', 'HTTP 请求耗时（单次发送，不含排队与限流等待）', LATENCY_BUCKETS),
+    'backpack_requests_total': ('counter', 'HTTP 请求数（按状态码）', None),
+    'backpack_request_errors_total': ('counter', '请求错误数（rate_limited: 429，status: 其他非 200，connection: 连接错误或超时）', None),
+    'backpack_request_retries_total': ('counter', '请求重试次数', None),
+    'backpack_order_ack_seconds': ('histogram', '下单请求从提交到收到交易所确认的耗时（含排队、限流与重试）', LATENCY_BUCKETS),
+    'backpack_clock_offset_ms': ('gauge', '服务器时间相对本机时间的偏差（毫秒）', None),
+    'backpack_sign_window_ms': ('gauge', '签名时间窗口（毫秒）', None),
+    'grid_check_duration_seconds': ('histogram', '一次完整检查（对账、成交同步与汇总）的耗时', LATENCY_BUCKETS),
+    'grid_checks_total': ('counter', '完整检查次数（按唤醒原因）', None),
+    'grid_check_errors_total': ('counter', '失败的完整检查次数', None),
+    'grid_last_price': ('gauge', '最近一次检查时的价格', None),
+    'grid_open_orders': ('gauge', '本地记录的未完成订单数', None),
+}
+
+
+class Histogram:
+    """固定分桶的直方图，输出时转换为 Prometheus 的累计分桶"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = '') -> str:
+    # 标签值按 Prometheus 文本格式转义反斜杠、双引号与换行
+    parts = [f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+             for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表
+    热路径上只做一次加锁的字典查找与计数，格式化只在导出时进行；指标名称需在 METRICS 中定义
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[Tuple, object]] = {name: {} for name in METRICS}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """计数器累加"""
+        key = tuple(sorted(labels.items()))
+        series = self._values[name]
+        with self._lock:
+            series[key] = series.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """设置仪表值"""
+        key = tuple(sorted(labels.items()))
+        series = self._values[name]
+        with self._lock:
+            series[key] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """记录一次直方图样本"""
+        key = tuple(sorted(labels.items()))
+        series = self._values[name]
+        with self._lock:
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """按 Prometheus 文本格式输出所有指标"""
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, description, buckets) in METRICS.items():
+                series = self._values[name]
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(series.items()):
+                    if kind != 'histogram':
+                        lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + (float('inf'),), value.counts):
+                        cumulative += count
+                        le = 'le="' + _format_number(bound) + '"'
+                        lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {value.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """GET /metrics 返回 Prometheus 文本格式的指标"""
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """在后台线程中提供 Prometheus 抓取接口"""
+    daemon_threads = True
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9108):
+        """
+        :param registry: 指标注册表
+        :param host: 监听地址，默认只监听本机
+        :param port: 监听端口
+        """
+        super().__init__((host, port), MetricsRequestHandler)
+        self.registry = registry
+        self._thread = threading.Thread(target=self.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        logger.info(f"指标接口已启动: http://{host}:{self.server_address[1]}/metrics")
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+
+class MetricsFileWriter:
+    """定期将指标写入文件（先写临时文件再替换，可供 node_exporter 的 textfile 采集器读取）"""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = 15.0):
+        """
+        :param registry: 指标注册表
+        :param path: 输出文件路径
+        :param interval: 写入间隔（秒）
+        """
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._write_loop, name="MetricsFileWriter", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.registry.render())
+        os.replace(tmp_path, self.path)
+
+    def _write_loop(self):
+        while not self._closed.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.error(f"写入指标文件失败: {e}")
+
+    def close(self):
+        """停止定期写入并写入最后一次指标"""
+        self._closed.set()
+        self._thread.join(timeout=self.interval + 1)
+        try:
+            self.write()
+        except OSError as e:
+            logger.error(f"写入指标文件失败: {e}")
+
+
+def create_metrics(port: int = 0, path: Optional[str] = None, interval: float = 15.0,
+                   host: str = '127.0.0.1') -> Tuple[Optional[MetricsRegistry], List]:
+    """
+    创建指标注册表与导出器
+    :param port: Prometheus 抓取端口，0 表示不启动
+    :param path: 指标文件路径，为空时不写文件
+    :param interval: 指标文件写入间隔（秒）
+    :param host: 抓取接口监听地址
+    :return: (注册表, 导出器列表)，两种导出方式都未启用时注册表为 None，不产生任何开销
+    """
+    if not port and not path:
+        return None, []
+    registry = MetricsRegistry()
+    exporters = []
+    if port:
+        exporters.append(MetricsServer(registry, host, port))
+    if path:
+        exporters.append(MetricsFileWriter(registry, path, interval))
+    return registry, exporters
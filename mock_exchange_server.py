@@ -0,0 +1,1033 @@
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import nacl.exceptions
+import nacl.signing
+
+from rate_limiter import TokenBucket
+
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    format='%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 私有接口: (方法, 路径) -> 签名指令
+INSTRUCTIONS = {
+    ('POST', '/api/v1/order'): 'orderExecute',
+    ('POST', '/api/v1/orders'): 'orderExecute',
+    ('DELETE', '/api/v1/order'): 'orderCancel',
+    ('DELETE', '/api/v1/orders'): 'orderCancelAll',
+    ('GET', '/api/v1/order'): 'orderQuery',
+    ('GET', '/api/v1/orders'): 'orderQueryAll',
+    ('GET', '/api/v1/capital'): 'balanceQuery',
+    ('GET', '/wapi/v1/history/fills'): 'fillHistoryQueryAll',
+}
+
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+class ApiError(Exception):
+    """返回给客户端的接口错误"""
+
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def encode_sign_value(value) -> str:
+    """与客户端相同的签名值编码（布尔值小写）"""
+    return str(value).lower() if isinstance(value, bool) else str(value)
+
+
+def signing_string(instruction: Optional[str], body, query: List[Tuple[str, str]], timestamp: str, window: str) -> str:
+    """按 Backpack 规则重建签名字符串"""
+    parts = []
+    items = body if isinstance(body, list) else ([body] if body else [])
+    if not isinstance(body, list) and not body and instruction:
+        parts.append(f"instruction={instruction}")
+    for item in items:
+        if instruction:
+            parts.append(f"instruction={instruction}")
+        parts.append("&".join(f"{k}={encode_sign_value(v)}" for k, v in sorted(item.items())))
+    if query:
+        parts.append("&".join(f"{k}={v}" for k, v in sorted(query, key=lambda item: item[0])))
+    parts.append(f"timestamp={timestamp}")
+    parts.append(f"window={window}")
+    return "&".join(parts)
+
+
+def verify_signature(api_key: str, signature: str, message: str) -> bool:
+    """使用 API Key（ED25519 公钥）验证签名"""
+    try:
+        nacl.signing.VerifyKey(base64.b64decode(api_key)).verify(message.encode('utf-8'), base64.b64decode(signature))
+        return True
+    except (nacl.exceptions.BadSignatureError, ValueError, TypeError):
+        return False
+
+
+def iso_time(timestamp: float) -> str:
+    """与交易所相同格式的 UTC 时间字符串"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+
+class OrderBook:
+    """单个交易对的订单簿，同价位按时间先后排队（价格优先、时间优先）"""
+
+    def __init__(self):
+        self.levels = {'Bid': {}, 'Ask': {}}  # side -> price -> deque[order]
+        self.prices = {'Bid': [], 'Ask': []}  # 升序价格列表
+
+    def best(self, side: str) -> Optional[float]:
+        prices = self.prices[side]
+        if not prices:
+            return None
+        return prices[-1] if side == 'Bid' else prices[0]
+
+    def add(self, order: Dict):
+        side, price = order['side'], order['price']
+        level = self.levels[side].get(price)
+        if level is None:
+            level = self.levels[side][price] = deque()
+            insort(self.prices[side], price)
+        level.append(order)
+
+    def remove(self, order: Dict):
+        side, price = order['side'], order['price']
+        level = self.levels[side].get(price)
+        if level is None:
+            return
+        try:
+            level.remove(order)
+        except ValueError:
+            return
+        if not level:
+            self._drop_level(side, price)
+
+    def _drop_level(self, side: str, price: float):
+        del self.levels[side][price]
+        prices = self.prices[side]
+        del prices[bisect_left(prices, price)]
+
+    def crossing(self, side: str, limit: Optional[float]):
+        """按优先级遍历与 side 方向订单可成交的对手方订单"""
+        opposite = 'Ask' if side == 'Bid' else 'Bid'
+        while True:
+            price = self.best(opposite)
+            if price is None or (limit is not None and (price > limit if side == 'Bid' else price < limit)):
+                return
+            level = self.levels[opposite][price]
+            order = level[0]
+            yield order
+            if level and level[0] is order:
+                # 调用方未移除该订单（例如自成交保护拒绝），停止遍历
+                return
+
+    def pop_filled(self, order: Dict):
+        """移除已完全成交的队首订单"""
+        level = self.levels[order['side']][order['price']]
+        level.popleft()
+        if not level:
+            self._drop_level(order['side'], order['price'])
+
+    def through(self, side: str, price: float) -> List[Dict]:
+        """价格穿过时应成交的挂单：买单价格高于 price、卖单价格低于 price"""
+        prices = self.prices[side]
+        if side == 'Bid':
+            selected = prices[bisect_left(prices, price):]
+            selected = [p for p in selected if p > price][::-1]
+        else:
+            selected = [p for p in prices[:bisect_left(prices, price)]]
+        orders = []
+        for p in selected:
+            orders.extend(self.levels[side][p])
+        return orders
+
+
+class MockExchange:
+    """
+    模拟交易所状态：账户余额、订单簿撮合、成交记录与脚本化价格
+    所有状态由一把锁保护，订单与行情推送放入队列由 WebSocket 服务发送
+    """
+
+    def __init__(self, markets: Dict[str, Dict], balances: Dict[str, float], maker_fee: float = 0.0002,
+                 taker_fee: float = 0.0005):
+        """
+        :param markets: 交易对 -> {'base', 'quote', 'tickSize', 'stepSize', 'minQuantity', 'price'}
+        :param balances: 新账户的初始余额
+        :param maker_fee: 挂单手续费率
+        :param taker_fee: 吃单手续费率
+        """
+        self.markets = markets
+        self.initial_balances = balances
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.lock = threading.RLock()
+        self.books = {symbol: OrderBook() for symbol in markets}
+        self.prices = {symbol: market['price'] for symbol, market in markets.items()}
+        self.stats = {symbol: {'open': market['price'], 'high': market['price'], 'low': market['price'], 'volume': 0.0}
+                      for symbol, market in markets.items()}
+        self.accounts: Dict[str, Dict[str, Dict[str, float]]] = {}  # api key -> currency -> {available, locked}
+        self.orders: Dict[str, Dict] = {}
+        self.fills: Dict[str, List[Dict]] = {}  # api key -> 成交记录
+        self.events = queue.Queue()  # (stream, data, account)
+        self._order_ids = itertools.count(111000000000000000)
+        self._trade_ids = itertools.count(1)
+        self.counters = {'orders': 0, 'cancels': 0, 'fills': 0}
+
+    # ---------- 账户 ----------
+
+    def account(self, api_key: str) -> Dict[str, Dict[str, float]]:
+        account = self.accounts.get(api_key)
+        if account is None:
+            account = self.accounts[api_key] = {
+                currency: {'available': amount, 'locked': 0.0} for currency, amount in self.initial_balances.items()
+            }
+            self.fills[api_key] = []
+        return account
+
+    def _balance(self, api_key: str, currency: str) -> Dict[str, float]:
+        return self.account(api_key).setdefault(currency, {'available': 0.0, 'locked': 0.0})
+
+    def _lock_funds(self, api_key: str, currency: str, amount: float):
+        balance = self._balance(api_key, currency)
+        if balance['available'] < amount - 1e-12:
+            raise ApiError(400, 'INSUFFICIENT_FUNDS', 'Insufficient funds')
+        balance['available'] -= amount
+        balance['locked'] += amount
+
+    def _unlock_funds(self, api_key: str, currency: str, amount: float):
+        balance = self._balance(api_key, currency)
+        balance['locked'] -= amount
+        balance['available'] += amount
+
+    # ---------- 下单与撮合 ----------
+
+    def _market(self, symbol: str) -> Dict:
+        market = self.markets.get(symbol)
+        if market is None:
+            raise ApiError(400, 'INVALID_SYMBOL', f'Invalid symbol: {symbol}')
+        return market
+
+    @staticmethod
+    def _aligned(value: float, increment: float) -> bool:
+        steps = value / increment
+        return abs(steps - round(steps)) < 1e-6
+
+    def place_order(self, api_key: str, data: Dict) -> Dict:
+        """下单并立即撮合"""
+        with self.lock:
+            symbol = data.get('symbol')
+            market = self._market(symbol)
+            side = data.get('side')
+            if side not in ('Bid', 'Ask'):
+                raise ApiError(400, 'INVALID_ORDER', f'Invalid side: {side}')
+            order_type = data.get('orderType', 'Limit')
+            try:
+                quantity = float(data.get('quantity'))
+                price = float(data['price']) if data.get('price') not in (None, '') else None
+            except (TypeError, ValueError):
+                raise ApiError(400, 'INVALID_ORDER', 'Invalid quantity or price')
+            if quantity < market['minQuantity'] or not self._aligned(quantity, market['stepSize']):
+                raise ApiError(400, 'INVALID_ORDER', 'Quantity decimal too long or below minimum')
+            if order_type == 'Limit':
+                if price is None or price <= 0 or not self._aligned(price, market['tickSize']):
+                    raise ApiError(400, 'INVALID_ORDER', 'Price decimal too long')
+            elif order_type != 'Market':
+                raise ApiError(400, 'INVALID_ORDER', f'Invalid order type: {order_type}')
+
+            last = self.prices[symbol]
+            book = self.books[symbol]
+            post_only = bool(data.get('postOnly'))
+            if post_only and order_type == 'Limit':
+                opposite = book.best('Ask' if side == 'Bid' else 'Bid')
+                would_take = (price >= last or (opposite is not None and price >= opposite)) if side == 'Bid' \
+                    else (price <= last or (opposite is not None and price <= opposite))
+                if would_take:
+                    raise ApiError(400, 'INVALID_ORDER', 'Order would immediately match and take.')
+
+            # 买单按限价（市价单按当前价格加 5% 缓冲）冻结计价货币，卖单冻结基础货币
+            lock_price = price if price is not None else last * 1.05
+            if side == 'Bid':
+                locked_currency, locked_amount = market['quote'], quantity * lock_price
+            else:
+                locked_currency, locked_amount = market['base'], quantity
+            self._lock_funds(api_key, locked_currency, locked_amount)
+
+            client_id = data.get('clientId')
+            order = {
+                'id': str(next(self._order_ids)),
+                'clientId': int(client_id) if client_id is not None else None,
+                'account': api_key,
+                'symbol': symbol,
+                'side': side,
+                'orderType': order_type,
+                'price': price,
+                'quantity': quantity,
+                'executed': 0.0,
+                'executedQuote': 0.0,
+                'locked': locked_amount,
+                'status': 'New',
+                'timeInForce': data.get('timeInForce', 'GTC'),
+                'postOnly': post_only,
+                'selfTradePrevention': data.get('selfTradePrevention', 'RejectTaker'),
+                'createdAt': int(time.time() * 1000),
+            }
+            self.orders[order['id']] = order
+            self.counters['orders'] += 1
+            self._emit_order(order, 'orderAccepted')
+
+            self._match(order)
+            remaining = order['quantity'] - order['executed']
+            if remaining > 1e-12 and order['status'] not in ('Cancelled', 'Expired'):
+                if order_type == 'Market' or order['timeInForce'] in ('IOC', 'FOK'):
+                    self._close_order(order, 'Expired')
+                else:
+                    book.add(order)
+            return self.order_view(order)
+
+    def _match(self, taker: Dict):
+        """与订单簿中的对手方订单撮合，剩余部分与外部流动性（脚本价格）撮合"""
+        book = self.books[taker['symbol']]
+        for maker in book.crossing(taker['side'], taker['price']):
+            if maker['account'] == taker['account']:
+                mode = taker['selfTradePrevention']
+                if mode in ('RejectMaker', 'RejectBoth'):
+                    book.remove(maker)
+                    self._close_order(maker, 'Cancelled')
+                if mode in ('RejectTaker', 'RejectBoth'):
+                    self._close_order(taker, 'Cancelled')
+                    return
+                continue
+            quantity = min(taker['quantity'] - taker['executed'], maker['quantity'] - maker['executed'])
+            self._fill(maker, quantity, maker['price'], is_maker=True)
+            self._fill(taker, quantity, maker['price'], is_maker=False)
+            if maker['quantity'] - maker['executed'] <= 1e-12:
+                book.pop_filled(maker)
+            if taker['quantity'] - taker['executed'] <= 1e-12:
+                return
+
+        # 外部流动性：限价穿过当前价格的部分按当前价格成交
+        last = self.prices[taker['symbol']]
+        crosses = taker['price'] is None or (taker['price'] >= last if taker['side'] == 'Bid' else taker['price'] <= last)
+        remaining = taker['quantity'] - taker['executed']
+        if crosses and remaining > 1e-12:
+            self._fill(taker, remaining, last, is_maker=False)
+
+    def _fill(self, order: Dict, quantity: float, price: float, is_maker: bool):
+        """记录一笔成交并结算余额"""
+        market = self.markets[order['symbol']]
+        api_key = order['account']
+        fee_rate = self.maker_fee if is_maker else self.taker_fee
+        quote_amount = quantity * price
+        if order['side'] == 'Bid':
+            # 按冻结价格释放，成交价更优时差额退回可用余额
+            lock_price = order['locked'] / (order['quantity'] - order['executed']) if order['quantity'] > order['executed'] else price
+            released = quantity * lock_price
+            quote_balance = self._balance(api_key, market['quote'])
+            quote_balance['locked'] -= released
+            quote_balance['available'] += released - quote_amount
+            order['locked'] -= released
+            fee, fee_currency = quantity * fee_rate, market['base']
+            self._balance(api_key, market['base'])['available'] += quantity - fee
+        else:
+            base_balance = self._balance(api_key, market['base'])
+            base_balance['locked'] -= quantity
+            order['locked'] -= quantity
+            fee, fee_currency = quote_amount * fee_rate, market['quote']
+            self._balance(api_key, market['quote'])['available'] += quote_amount - fee
+
+        order['executed'] += quantity
+        order['executedQuote'] += quote_amount
+        filled = order['quantity'] - order['executed'] <= 1e-12
+        order['status'] = 'Filled' if filled else 'PartiallyFilled'
+        if filled and order['locked'] > 1e-12:
+            currency = market['quote'] if order['side'] == 'Bid' else market['base']
+            self._unlock_funds(api_key, currency, order['locked'])
+            order['locked'] = 0.0
+
+        now = time.time()
+        trade_id = next(self._trade_ids)
+        self.fills[api_key].append({
+            'tradeId': trade_id,
+            'orderId': order['id'],
+            'clientId': order['clientId'],
+            'symbol': order['symbol'],
+            'side': order['side'],
+            'price': f"{price}",
+            'quantity': f"{quantity}",
+            'fee': f"{fee}",
+            'feeSymbol': fee_currency,
+            'isMaker': is_maker,
+            'systemOrderType': None,
+            'timestamp': iso_time(now),
+            '_ms': int(now * 1000),
+        })
+        self.counters['fills'] += 1
+        stats = self.stats[order['symbol']]
+        stats['volume'] += quantity
+        self._emit_order(order, 'orderFill', fill=(price, quantity, fee, fee_currency, trade_id, is_maker))
+
+    def _close_order(self, order: Dict, status: str):
+        """撤销或过期订单，释放剩余冻结资金"""
+        market = self.markets[order['symbol']]
+        if order['locked'] > 1e-12:
+            currency = market['quote'] if order['side'] == 'Bid' else market['base']
+            self._unlock_funds(order['account'], currency, order['locked'])
+            order['locked'] = 0.0
+        order['status'] = status
+        self._emit_order(order, 'orderCancelled' if status == 'Cancelled' else 'orderExpired')
+
+    def cancel_order(self, api_key: str, symbol: str, order_id: str = None, client_id=None) -> Dict:
+        with self.lock:
+            order = self._find(api_key, symbol, order_id, client_id)
+            if order is None or order['status'] not in ('New', 'PartiallyFilled'):
+                raise ApiError(400, 'RESOURCE_NOT_FOUND', 'Order not found')
+            self.books[symbol].remove(order)
+            self._close_order(order, 'Cancelled')
+            self.counters['cancels'] += 1
+            return self.order_view(order)
+
+    def cancel_all(self, api_key: str, symbol: str) -> List[Dict]:
+        with self.lock:
+            self._market(symbol)
+            cancelled = []
+            for order in self.open_orders(api_key, symbol, raw=True):
+                self.books[symbol].remove(order)
+                self._close_order(order, 'Cancelled')
+                cancelled.append(self.order_view(order))
+            self.counters['cancels'] += len(cancelled)
+            return cancelled
+
+    def _find(self, api_key: str, symbol: str, order_id: str = None, client_id=None) -> Optional[Dict]:
+        if order_id is not None:
+            order = self.orders.get(str(order_id))
+            return order if order is not None and order['account'] == api_key and order['symbol'] == symbol else None
+        if client_id is not None:
+            # 同一 clientId 可能被复用，返回最新的订单
+            for order in reversed(list(self.orders.values())):
+                if order['account'] == api_key and order['symbol'] == symbol and order['clientId'] == int(client_id):
+                    return order
+        return None
+
+    def get_order(self, api_key: str, symbol: str, order_id: str = None, client_id=None) -> Dict:
+        with self.lock:
+            order = self._find(api_key, symbol, order_id, client_id)
+            if order is None:
+                raise ApiError(404, 'RESOURCE_NOT_FOUND', 'Order not found')
+            return self.order_view(order)
+
+    def open_orders(self, api_key: str, symbol: Optional[str] = None, raw: bool = False) -> List[Dict]:
+        with self.lock:
+            orders = [
+                order for order in self.orders.values()
+                if order['account'] == api_key and order['status'] in ('New', 'PartiallyFilled')
+                and (symbol is None or order['symbol'] == symbol)
+            ]
+            return orders if raw else [self.order_view(order) for order in orders]
+
+    def fill_history(self, api_key: str, symbol: Optional[str], start: Optional[int], end: Optional[int],
+                     limit: int, offset: int, order_id: Optional[str] = None) -> List[Dict]:
+        with self.lock:
+            fills = [
+                fill for fill in reversed(self.fills.get(api_key, []))
+                if (symbol is None or fill['symbol'] == symbol)
+                and (order_id is None or fill['orderId'] == order_id)
+                and (start is None or fill['_ms'] >= start) and (end is None or fill['_ms'] <= end)
+            ]
+        return [{k: v for k, v in fill.items() if k != '_ms'} for fill in fills[offset:offset + limit]]
+
+    def capital(self, api_key: str) -> Dict:
+        with self.lock:
+            return {
+                currency: {'available': f"{balance['available']:.8f}", 'locked': f"{max(balance['locked'], 0.0):.8f}", 'staked': '0'}
+                for currency, balance in self.account(api_key).items()
+            }
+
+    # ---------- 行情 ----------
+
+    def set_price(self, symbol: str, price: float):
+        """更新脚本价格：价格穿过的挂单按挂单价成交（外部吃单）"""
+        with self.lock:
+            market = self._market(symbol)
+            price = round(round(price / market['tickSize']) * market['tickSize'], 10)
+            self.prices[symbol] = price
+            stats = self.stats[symbol]
+            stats['high'] = max(stats['high'], price)
+            stats['low'] = min(stats['low'], price)
+            book = self.books[symbol]
+            for side in ('Bid', 'Ask'):
+                for order in book.through(side, price):
+                    self._fill(order, order['quantity'] - order['executed'], order['price'], is_maker=True)
+                    book.remove(order)
+            self._emit_market(symbol)
+
+    def ticker(self, symbol: str) -> Dict:
+        with self.lock:
+            market = self._market(symbol)
+            last = self.prices[symbol]
+            stats = self.stats[symbol]
+            bid, ask = self._top_of_book(symbol)
+            return {
+                'symbol': symbol,
+                'firstPrice': f"{stats['open']}",
+                'lastPrice': f"{last}",
+                'bidPrice': f"{bid}",
+                'askPrice': f"{ask}",
+                'high': f"{stats['high']}",
+                'low': f"{stats['low']}",
+                'volume': f"{stats['volume']}",
+                'priceChange': f"{last - stats['open']}",
+                'priceChangePercent': f"{(last / stats['open'] - 1) if stats['open'] else 0}",
+                'trades': str(self.counters['fills']),
+                'quoteVolume': f"{stats['volume'] * last}",
+                'tickSize': market['tickSize'],
+            }
+
+    def _top_of_book(self, symbol: str) -> Tuple[float, float]:
+        tick = self.markets[symbol]['tickSize']
+        last = self.prices[symbol]
+        book = self.books[symbol]
+        bid = book.best('Bid')
+        ask = book.best('Ask')
+        # 外部流动性在当前价格上下一个 tick 挂单
+        bid = max(bid, last - tick) if bid is not None else last - tick
+        ask = min(ask, last + tick) if ask is not None else last + tick
+        return round(bid, 10), round(ask, 10)
+
+    def market_list(self) -> List[Dict]:
+        return [
+            {
+                'symbol': symbol,
+                'baseSymbol': market['base'],
+                'quoteSymbol': market['quote'],
+                'marketType': 'SPOT',
+                'orderBookState': 'Open',
+                'filters': {
+                    'price': {'minPrice': f"{market['tickSize']}", 'maxPrice': None, 'tickSize': f"{market['tickSize']}"},
+                    'quantity': {'minQuantity': f"{market['minQuantity']}", 'maxQuantity': None,
+                                 'stepSize': f"{market['stepSize']}"},
+                },
+            }
+            for symbol, market in self.markets.items()
+        ]
+
+    # ---------- 推送 ----------
+
+    def _emit_market(self, symbol: str):
+        now = int(time.time() * 1000000)
+        bid, ask = self._top_of_book(symbol)
+        self.events.put((f"ticker.{symbol}", {'e': 'ticker', 'E': now, 's': symbol, 'c': f"{self.prices[symbol]}"}, None))
+        self.events.put((f"bookTicker.{symbol}", {'e': 'bookTicker', 'E': now, 's': symbol, 'b': f"{bid}", 'a': f"{ask}"}, None))
+
+    def _emit_order(self, order: Dict, event: str, fill: Optional[tuple] = None):
+        now = int(time.time() * 1000000)
+        data = {
+            'e': event, 'E': now, 's': order['symbol'], 'i': order['id'], 'c': order['clientId'], 'S': order['side'],
+            'o': order['orderType'], 'f': order['timeInForce'], 'q': f"{order['quantity']}",
+            'p': f"{order['price']}" if order['price'] is not None else None, 'X': order['status'],
+            'z': f"{order['executed']}", 'Z': f"{order['executedQuote']}", 'T': now,
+        }
+        if fill is not None:
+            price, quantity, fee, fee_currency, trade_id, is_maker = fill
+            data.update({'L': f"{price}", 'l': f"{quantity}", 'n': f"{fee}", 'N': fee_currency, 't': trade_id, 'm': is_maker})
+        self.events.put((f"account.orderUpdate.{order['symbol']}", data, order['account']))
+
+    @staticmethod
+    def order_view(order: Dict) -> Dict:
+        """订单的接口返回格式"""
+        return {
+            'id': order['id'],
+            'clientId': order['clientId'],
+            'symbol': order['symbol'],
+            'side': order['side'],
+            'orderType': order['orderType'],
+            'price': f"{order['price']}" if order['price'] is not None else None,
+            'quantity': f"{order['quantity']}",
+            'executedQuantity': f"{order['executed']}",
+            'executedQuoteQuantity': f"{order['executedQuote']}",
+            'status': order['status'],
+            'timeInForce': order['timeInForce'],
+            'postOnly': order['postOnly'],
+            'reduceOnly': False,
+            'selfTradePrevention': order['selfTradePrevention'],
+            'createdAt': order['createdAt'],
+        }
+
+
+class MockServer(ThreadingHTTPServer):
+    """模拟 REST 服务：注入延迟与限流错误，验证签名后转发到 MockExchange"""
+    daemon_threads = True
+
+    def __init__(self, address, exchange: MockExchange, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = 0.0, verify: bool = True, clock_skew: float = 0.0):
+        """
+        :param latency: 每个请求的固定延迟（秒）
+        :param jitter: 额外的随机延迟上限（秒）
+        :param error_rate: 随机返回 429 的概率
+        :param rate_limit: 每个 API Key 每秒请求数上限，0 表示不限制
+        :param verify: 是否验证签名
+        :param clock_skew: 服务器时钟相对本机的偏差（秒），用于模拟客户端时钟漂移
+        """
+        super().__init__(address, MockRequestHandler)
+        self.exchange = exchange
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.verify = verify
+        self.clock_skew = clock_skew
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self.requests = 0
+
+    def time(self) -> float:
+        """服务器时间（秒）"""
+        return time.time() + self.clock_skew
+
+    def bucket(self, key: str) -> TokenBucket:
+        with self._buckets_lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate_limit, self.rate_limit)
+            return bucket
+
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def date_time_string(self, timestamp=None):
+        """Date 头使用服务器时间"""
+        return super().date_time_string(self.server.time() if timestamp is None else timestamp)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        server: MockServer = self.server
+        server.requests += 1
+        url = urlsplit(self.path)
+        query = parse_qsl(url.query, keep_blank_values=True)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+
+        delay = server.latency + random.uniform(0, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            body = json.loads(raw_body) if raw_body else None
+        except ValueError:
+            self._send_json(400, {'code': 'INVALID_CLIENT_REQUEST', 'message': 'Invalid JSON body'})
+            return
+
+        api_key = self.headers.get('X-API-KEY') or self.client_address[0]
+        if server.error_rate and random.random() < server.error_rate:
+            self._send_json(429, {'code': 'TOO_MANY_REQUESTS', 'message': 'Injected rate limit'}, {'Retry-After': '1'})
+            return
+        if server.rate_limit > 0:
+            wait = server.bucket(api_key).reserve()
+            if wait > 0:
+                self._send_json(429, {'code': 'TOO_MANY_REQUESTS', 'message': 'Rate limit exceeded'},
+                                {'Retry-After': f"{wait:.3f}", 'X-RateLimit-Remaining': '0'})
+                return
+
+        try:
+            instruction = INSTRUCTIONS.get((method, url.path))
+            if instruction is not None:
+                api_key = self._authenticate(instruction, body, query)
+            status, payload = 200, self._route(method, url.path, dict(query), body, api_key)
+        except ApiError as e:
+            status, payload = e.status, {'code': e.code, 'message': e.message}
+        except Exception as e:
+            logger.exception(f"处理请求失败: {method} {self.path}")
+            status, payload = 500, {'code': 'INTERNAL_ERROR', 'message': str(e)}
+        self._send_json(status, payload)
+
+    def _authenticate(self, instruction: str, body, query: List[Tuple[str, str]]) -> str:
+        api_key = self.headers.get('X-API-KEY')
+        signature = self.headers.get('X-SIGNATURE')
+        timestamp = self.headers.get('X-TIMESTAMP')
+        window = self.headers.get('X-WINDOW') or '5000'
+        if not api_key or not signature or not timestamp:
+            raise ApiError(401, 'UNAUTHORIZED', 'Missing authentication headers')
+        if abs(self.server.time() * 1000 - int(timestamp)) > int(window):
+            raise ApiError(400, 'INVALID_CLIENT_REQUEST', 'Request has expired')
+        if self.server.verify:
+            message = signing_string(instruction, body, query, timestamp, window)
+            if not verify_signature(api_key, signature, message):
+                raise ApiError(401, 'UNAUTHORIZED', 'Invalid signature')
+        return api_key
+
+    def _route(self, method: str, path: str, params: Dict, body, api_key: str):
+        exchange = self.server.exchange
+        if method == 'GET':
+            if path == '/api/v1/time':
+                return int(self.server.time() * 1000)
+            if path == '/api/v1/markets':
+                return exchange.market_list()
+            if path == '/api/v1/futures/markets':
+                return []
+            if path == '/api/v1/ticker':
+                return exchange.ticker(params.get('symbol'))
+            if path == '/api/v1/tickers':
+                return [exchange.ticker(symbol) for symbol in exchange.markets]
+            if path == '/api/v1/capital':
+                return exchange.capital(api_key)
+            if path == '/api/v1/orders':
+                return exchange.open_orders(api_key, params.get('symbol'))
+            if path == '/api/v1/order':
+                return exchange.get_order(api_key, params.get('symbol'), params.get('orderId'), params.get('clientId'))
+            if path == '/wapi/v1/history/fills':
+                return exchange.fill_history(
+                    api_key, params.get('symbol'),
+                    int(params['from']) if params.get('from') else None, int(params['to']) if params.get('to') else None,
+                    min(int(params.get('limit', 100)), 1000), int(params.get('offset', 0)), params.get('orderId')
+                )
+        elif method == 'POST':
+            if path == '/api/v1/order':
+                return exchange.place_order(api_key, body or {})
+            if path == '/api/v1/orders':
+                results = []
+                for item in body or []:
+                    try:
+                        results.append(exchange.place_order(api_key, item))
+                    except ApiError as e:
+                        results.append({'code': e.code, 'message': e.message})
+                return results
+        elif method == 'DELETE':
+            body = body or {}
+            if path == '/api/v1/order':
+                return exchange.cancel_order(api_key, body.get('symbol'), body.get('orderId'), body.get('clientId'))
+            if path == '/api/v1/orders':
+                return exchange.cancel_all(api_key, body.get('symbol'))
+        raise ApiError(404, 'NOT_FOUND', f'Unknown endpoint: {method} {path}')
+
+
+class WebSocketConnection:
+    """单个 WebSocket 连接（RFC 6455 最小实现：文本帧、ping/pong、close）"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.streams = set()
+        self.account = None
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+    def send_frame(self, payload: bytes, opcode: int = 0x1):
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([length])
+        elif length < 65536:
+            header += bytes([126]) + struct.pack('>H', length)
+        else:
+            header += bytes([127]) + struct.pack('>Q', length)
+        with self._send_lock:
+            self.sock.sendall(header + payload)
+
+    def send_json(self, payload: Dict):
+        self.send_frame(json.dumps(payload).encode('utf-8'))
+
+    def _read_exact(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('连接已关闭')
+            data += chunk
+        return data
+
+    def read_frame(self) -> Tuple[int, bytes]:
+        first, second = self._read_exact(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('>H', self._read_exact(2))[0]
+        elif length == 127:
+            length = struct.unpack('>Q', self._read_exact(8))[0]
+        mask = self._read_exact(4) if second & 0x80 else None
+        payload = self._read_exact(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.send_frame(struct.pack('>H', 1000), opcode=0x8)
+        except OSError:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class MockWebSocketServer(socketserver.ThreadingTCPServer):
+    """模拟 WebSocket 推送服务：行情与订单更新，可定时断开所有连接以测试重连"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, exchange: MockExchange, verify: bool = True):
+        super().__init__(address, MockWebSocketHandler)
+        self.exchange = exchange
+        self.verify = verify
+        self.connections: List[WebSocketConnection] = []
+        self.connections_lock = threading.Lock()
+        threading.Thread(target=self._publish_loop, name="MockWsPublisher", daemon=True).start()
+
+    def _publish_loop(self):
+        while True:
+            stream, data, account = self.exchange.events.get()
+            with self.connections_lock:
+                targets = [conn for conn in self.connections
+                           if stream in conn.streams and (account is None or conn.account == account)]
+            for conn in targets:
+                try:
+                    conn.send_json({'stream': stream, 'data': data})
+                except OSError:
+                    conn.close()
+
+    def drop_all(self):
+        """断开所有连接"""
+        with self.connections_lock:
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
+        if connections:
+            logger.info(f"已断开 {len(connections)} 个 WebSocket 连接")
+
+
+class MockWebSocketHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        server: MockWebSocketServer = self.server
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = self.request.recv(4096)
+            if not chunk:
+                return
+            request += chunk
+        headers = {}
+        for line in request.split(b'\r\n')[1:]:
+            if b':' in line:
+                name, value = line.split(b':', 1)
+                headers[name.strip().lower().decode()] = value.strip().decode()
+        key = headers.get('sec-websocket-key')
+        if not key:
+            self.request.sendall(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.request.sendall(
+            ('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+             f'Sec-WebSocket-Accept: {accept}\r\n\r\n').encode()
+        )
+
+        conn = WebSocketConnection(self.request)
+        with server.connections_lock:
+            server.connections.append(conn)
+        try:
+            while not conn.closed:
+                opcode, payload = conn.read_frame()
+                if opcode == 0x8:
+                    break
+                if opcode == 0x9:
+                    conn.send_frame(payload, opcode=0xA)
+                elif opcode == 0x1:
+                    self._on_message(conn, payload)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            with server.connections_lock:
+                if conn in server.connections:
+                    server.connections.remove(conn)
+            conn.close()
+
+    def _on_message(self, conn: WebSocketConnection, payload: bytes):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            conn.send_json({'error': {'code': 4000, 'message': 'Invalid JSON'}})
+            return
+        method = message.get('method')
+        streams = message.get('params') or []
+        if method == 'UNSUBSCRIBE':
+            conn.streams.difference_update(streams)
+            return
+        if method != 'SUBSCRIBE':
+            conn.send_json({'error': {'code': 4001, 'message': f'Unknown method: {method}'}})
+            return
+        if any(stream.startswith('account.') for stream in streams):
+            signature = message.get('signature') or []
+            if len(signature) != 4:
+                conn.send_json({'error': {'code': 4006, 'message': 'Signature required'}})
+                return
+            api_key, sig, timestamp, window = signature
+            if self.server.verify and not verify_signature(
+                    api_key, sig, signing_string('subscribe', None, [], timestamp, window)):
+                conn.send_json({'error': {'code': 4006, 'message': 'Invalid signature'}})
+                return
+            conn.account = api_key
+        conn.streams.update(streams)
+
+
+class PriceFeed:
+    """
+    脚本化价格：按文件中的价格序列回放，或以随机游走生成价格
+    """
+
+    def __init__(self, exchange: MockExchange, symbol: str, interval: float = 1.0, volatility: float = 0.001,
+                 path: Optional[str] = None, seed: Optional[int] = None):
+        """
+        :param interval: 价格更新间隔（秒）
+        :param volatility: 随机游走每步的相对波动
+        :param path: 价格文件（每行一个价格，或带 price/close 列表头的 CSV），循环回放
+        """
+        self.exchange = exchange
+        self.symbol = symbol
+        self.interval = interval
+        self.volatility = volatility
+        self.prices = self._load(path) if path else None
+        self.random = random.Random(seed)
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _load(path: str) -> List[float]:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        column = 0
+        header = lines[0].split(',')
+        try:
+            float(header[0])
+        except ValueError:
+            names = [name.strip().lower() for name in header]
+            column = names.index('price') if 'price' in names else names.index('close')
+            lines = lines[1:]
+        return [float(line.split(',')[column]) for line in lines]
+
+    def start(self):
+        threading.Thread(target=self._run, name=f"PriceFeed-{self.symbol}", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        step = 0
+        while not self._stop.wait(self.interval):
+            if self.prices:
+                price = self.prices[step % len(self.prices)]
+            else:
+                price = self.exchange.prices[self.symbol] * (1 + self.random.gauss(0, self.volatility))
+            self.exchange.set_price(self.symbol, price)
+            step += 1
+
+
+def _parse_balances(value: str) -> Dict[str, float]:
+    balances = {}
+    for item in value.split(','):
+        currency, amount = item.split('=')
+        balances[currency.strip()] = float(amount)
+    return balances
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟 Backpack 交易所（REST + WebSocket）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help='REST 端口，对应 BASE_URL=http://127.0.0.1:8080')
+    parser.add_argument('--ws-port', type=int, default=8081, help='WebSocket 端口，对应 WS_URL=ws://127.0.0.1:8081')
+    parser.add_argument('--symbol', default='SOL_USDC', help='交易对，逗号分隔多个')
+    parser.add_argument('--price', default='150', help='初始价格，逗号分隔时与交易对一一对应')
+    parser.add_argument('--tick-size', type=float, default=0.01)
+    parser.add_argument('--step-size', type=float, default=0.001)
+    parser.add_argument('--min-quantity', type=float, default=0.001)
+    parser.add_argument('--balances', default='SOL=100,USDC=20000', help='新账户初始余额')
+    parser.add_argument('--maker-fee', type=float, default=0.0002)
+    parser.add_argument('--taker-fee', type=float, default=0.0005)
+    parser.add_argument('--price-file', help='价格序列文件，循环回放')
+    parser.add_argument('--price-interval', type=float, default=1.0, help='价格更新间隔（秒）')
+    parser.add_argument('--volatility', type=float, default=0.001, help='随机游走每步的相对波动')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机附加延迟上限（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机返回 429 的概率')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='每个 API Key 每秒请求数上限，0 表示不限制')
+    parser.add_argument('--ws-drop-interval', type=float, default=0.0, help='定期断开所有 WebSocket 连接的间隔（秒）')
+    parser.add_argument('--clock-skew', type=float, default=0.0, help='服务器时钟相对本机的偏差（毫秒）')
+    parser.add_argument('--no-verify', action='store_true', help='不验证签名')
+    args = parser.parse_args()
+
+    symbols = args.symbol.split(',')
+    prices = [float(price) for price in args.price.split(',')]
+    if len(prices) == 1:
+        prices *= len(symbols)
+    markets = {}
+    for symbol, price in zip(symbols, prices):
+        base, quote = symbol.split('_')
+        markets[symbol] = {'base': base, 'quote': quote, 'tickSize': args.tick_size, 'stepSize': args.step_size,
+                           'minQuantity': args.min_quantity, 'price': price}
+    exchange = MockExchange(markets, _parse_balances(args.balances), args.maker_fee, args.taker_fee)
+    rest = MockServer((args.host, args.port), exchange, args.latency / 1000, args.jitter / 1000,
+                      args.error_rate, args.rate_limit, verify=not args.no_verify, clock_skew=args.clock_skew / 1000)
+    ws = MockWebSocketServer((args.host, args.ws_port), exchange, verify=not args.no_verify)
+    threading.Thread(target=ws.serve_forever, name="MockWebSocketServer", daemon=True).start()
+    for symbol in symbols:
+        PriceFeed(exchange, symbol, args.price_interval, args.volatility, args.price_file, args.seed).start()
+
+    if args.ws_drop_interval > 0:
+        def drop_loop():
+            while True:
+                time.sleep(args.ws_drop_interval)
+                ws.drop_all()
+        threading.Thread(target=drop_loop, name="MockWsDropper", daemon=True).start()
+
+    logger.info(f"模拟交易所已启动: REST http://{args.host}:{args.port}  WebSocket ws://{args.host}:{args.ws_port}")
+    try:
+        rest.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"模拟交易所已停止，共处理 {rest.requests} 个请求: {exchange.counters}")
+
+
+if __name__ == "__main__":
+    main()
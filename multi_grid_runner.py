@@ -0,0 +1,233 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+from balance_ledger import BalanceLedger
+from event_journal import EventJournal
+from grid_trader import GridTrader, create_exchange, create_market_cache, create_metrics_from_env, create_profiler_from_env
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = 'grids.json'
+
+
+def load_grid_configs(path: str) -> List[Dict]:
+    """
+    加载多网格配置文件
+    文件格式: {"defaults": {...}, "grids": [{"SYMBOL": "SOL_USDC", ...}, ...]}，
+    键与环境变量同名，每个网格的配置覆盖 defaults，两者都未配置的项读取环境变量
+    :param path: 配置文件路径（JSON）
+    :return: 每个网格合并后的配置
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    defaults = data.get('defaults', {})
+    configs = [{**defaults, **grid} for grid in data.get('grids', [])]
+    if not configs:
+        raise Exception(f"配置文件中没有网格: {path}")
+
+    symbols = [config.get('SYMBOL') for config in configs]
+    if None in symbols:
+        raise Exception("每个网格都需要配置 SYMBOL")
+    # 布置网格时会按交易对撤销全部挂单，同一交易对只能运行一个网格
+    duplicates = {symbol for symbol in symbols if symbols.count(symbol) > 1}
+    if duplicates:
+        raise Exception(f"重复的交易对: {sorted(duplicates)}")
+    return configs
+
+
+class MultiGridRunner:
+    """
+    在一个进程中运行多个网格
+    所有网格共享一个交易所客户端（连接池、限流器与请求调度器）、余额账本与交易对信息缓存；
+    各网格的调度器决定何时轮询价格与对账，同一周期内需要的行情与未完成订单分别合并为一次请求
+    """
+
+    def __init__(self, configs: List[Dict], workers: int = 4):
+        """
+        :param configs: 每个网格的配置（见 load_grid_configs）
+        :param workers: 并行对账的网格数量
+        """
+        self.exchange = create_exchange()
+        self.exchange.metrics, self.metrics_exporters = create_metrics_from_env()
+        self.exchange.profiler = create_profiler_from_env()
+        self.ledger = BalanceLedger(self.exchange, resync_interval=float(os.getenv('BALANCE_SYNC_INTERVAL', '300')))
+        self.markets = create_market_cache(self.exchange)
+        journal_dir = os.getenv('JOURNAL_DIR') or None
+        self.journal = None
+        if journal_dir:
+            self.journal = EventJournal(journal_dir, flush_interval=float(os.getenv('JOURNAL_FLUSH_INTERVAL', '1')))
+        self.wake_event = threading.Event()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="GridWorker")
+
+        self.grids: List[GridTrader] = [
+            GridTrader(config, exchange=self.exchange, ledger=self.ledger, markets=self.markets,
+                       journal=self.journal, wake_event=self.wake_event)
+            for config in configs
+        ]
+        cursor_paths = [grid.trade_sync.cursor_path for grid in self.grids
+                        if grid.trade_sync is not None and grid.trade_sync.cursor_path]
+        if len(cursor_paths) != len(set(cursor_paths)):
+            raise Exception("多个网格使用同一个 TRADE_CURSOR_PATH，请在路径中使用 {symbol}")
+
+        self.active: List[GridTrader] = []
+        self._closed = False
+
+    def _map(self, func, grids: List[GridTrader]) -> List:
+        """在线程池中对各网格并行执行 func，单个网格的异常不影响其他网格"""
+        def call(grid):
+            try:
+                return func(grid)
+            except Exception as e:
+                logger.error(f"{grid.symbol} 执行失败: {e}")
+                return None
+        return list(self.executor.map(call, grids))
+
+    @staticmethod
+    def _polling(grid: GridTrader) -> bool:
+        """网格是否需要通过 REST 获取价格（行情流不在线）"""
+        return grid.market_stream is None or not grid.market_stream.connected
+
+    def fetch_prices(self, grids: List[GridTrader]) -> Dict[str, float]:
+        """一次请求获取多个网格的当前价格，并交给各网格的调度器判断是否需要检查"""
+        if not grids:
+            return {}
+        try:
+            tickers = self.exchange.fetch_tickers([grid.symbol for grid in grids])
+        except Exception as e:
+            logger.error(f"批量获取行情失败: {e}")
+            # 失败后按最短间隔重试，避免连续失败时频繁请求
+            for grid in grids:
+                grid.scheduler.next_poll = time.monotonic() + grid.scheduler.min_interval
+            return {}
+        prices = {}
+        for grid in grids:
+            ticker = tickers.get(grid.symbol)
+            if ticker is not None:
+                prices[grid.symbol] = ticker['last']
+                grid.scheduler.observe(ticker['last'])
+        return prices
+
+    def fetch_open_orders(self, grids: List[GridTrader]) -> Dict[str, List[Dict]]:
+        """
+        一次请求获取所有未完成订单，按交易对分组
+        订单流在线且不需要定期同步的网格使用推送维护的本地订单状态，不需要查询
+        :return: 交易对 -> 未完成订单列表，查询失败或不需要查询时为空
+        """
+        open_orders = {}
+        if any(grid.needs_order_sync() for grid in grids):
+            try:
+                grouped = defaultdict(list)
+                for order in self.exchange.fetch_open_orders(None):
+                    grouped[order['symbol']].append(order)
+                open_orders = {grid.symbol: grouped.get(grid.symbol, []) for grid in grids}
+            except Exception as e:
+                logger.error(f"批量获取未完成订单失败: {e}")
+        return open_orders
+
+    def run_cycle(self):
+        """
+        执行一个调度周期：各网格的调度器决定是否需要检查；
+        需要轮询价格或检查的网格合并为一次行情请求，需要检查的网格合并为一次未完成订单请求后并行对账，
+        触及止损或止盈的网格停止运行
+        """
+        now = time.monotonic()
+        polled = [grid for grid in self.active if self._polling(grid)
+                  and (grid.scheduler.poll_due(now) or grid.scheduler.due(now) is not None)]
+        prices = self.fetch_prices(polled)
+        due = [grid for grid in self.active if grid.scheduler.due(now) is not None]
+        if not due:
+            return
+        open_orders = self.fetch_open_orders(due)
+        results = self._map(lambda grid: grid.check_and_adjust_orders(prices.get(grid.symbol), open_orders.get(grid.symbol)), due)
+        for grid, running in zip(due, results):
+            if running is False:
+                logger.warning(f"{grid.symbol} 网格已停止")
+                self.active.remove(grid)
+
+    def start(self):
+        """启动所有网格：并行布置初始网格"""
+        self.ledger.maybe_sync()
+        self._map(GridTrader.start, self.grids)
+        self.active = list(self.grids)
+
+    def shutdown(self):
+        """并行撤单并关闭所有网格，最后关闭共享的事件日志"""
+        if self._closed:
+            return
+        self._map(GridTrader.shutdown, self.grids)
+        self.close()
+
+    def close(self):
+        """关闭所有网格（不撤单）、共享的事件日志、指标导出与性能分析；重复调用时不做任何事"""
+        if self._closed:
+            return
+        self._closed = True
+        self._map(GridTrader.close, self.grids)
+        if self.journal is not None:
+            self.journal.close()
+        for exporter in self.metrics_exporters:
+            exporter.close()
+        self.exchange.profiler.close()
+        self.executor.shutdown(wait=False)
+
+    def signal_handler(self, signum, frame):
+        """处理退出信号"""
+        logger.info("\n收到退出信号，正在关闭所有网格...")
+        try:
+            self.shutdown()
+            logger.info("程序已安全退出")
+        except Exception as e:
+            logger.error(f"退出时发生错误: {e}")
+        finally:
+            sys.exit(0)
+
+    def run(self):
+        """运行所有网格"""
+        logger.info(f"启动 {len(self.grids)} 个网格: {[grid.symbol for grid in self.grids]}")
+        logger.info("按 Ctrl+C 可以安全退出程序")
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+        self.exchange.profiler.install()
+
+        try:
+            self.start()
+            while self.active:
+                try:
+                    # 等待最近一个网格的轮询或检查时间，任一网格需要检查时（穿过网格线、订单推送等）提前唤醒
+                    deadline = min(grid.scheduler.next_deadline(self._polling(grid)) for grid in self.active)
+                    self.wake_event.wait(max(0.0, deadline - time.monotonic()))
+                    self.wake_event.clear()
+                    self.run_cycle()
+                except Exception as e:
+                    logger.error(f"运行错误: {e}")
+                    time.sleep(1)
+            logger.info("所有网格均已停止")
+        finally:
+            # 所有网格止损止盈停止或异常退出时同样写入共享事件日志中缓冲的事件
+            self.close()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description='在一个进程中运行多个网格')
+    parser.add_argument('config', nargs='?', default=os.getenv('GRIDS_CONFIG', DEFAULT_CONFIG_PATH),
+                        help='多网格配置文件（JSON）')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('GRID_WORKERS', '4')),
+                        help='并行对账的网格数量')
+    args = parser.parse_args()
+    MultiGridRunner(load_grid_configs(args.config), args.workers).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import json
+import logging
+import threading
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('closed', 'cancelled')
+
+
+class OrderInfo:
+    """订单信息（使用 __slots__ 的紧凑记录）"""
+    __slots__ = ('order_id', 'symbol', 'side', 'price', 'amount', 'status', 'created_at',
+                 'closed_at', 'filled_price', 'filled_amount', 'profit')
+
+    def __init__(self, order_id: str, symbol: str, side: str, price: float, amount: float, status: str,
+                 created_at: datetime, closed_at: datetime = None, filled_price: float = None,
+                 filled_amount: float = None, profit: float = None):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = side  # 'bid' 或 'ask'
+        self.price = price
+        self.amount = amount
+        self.status = status  # 'open', 'closed', 'cancelled'
+        self.created_at = created_at
+        self.closed_at = closed_at
+        self.filled_price = filled_price
+        self.filled_amount = filled_amount
+        self.profit = profit
+
+    def to_dict(self) -> Dict:
+        """转换为可序列化的字典"""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        for name in ('created_at', 'closed_at'):
+            if data[name] is not None:
+                data[name] = data[name].isoformat()
+        return data
+
+    def __repr__(self) -> str:
+        return (f"OrderInfo(order_id={self.order_id!r}, side={self.side!r}, price={self.price}, "
+                f"amount={self.amount}, status={self.status!r}, profit={self.profit})")
+
+
+class OrderManager:
+    """
+    订单管理器
+    按状态与价格档位建立索引，总利润与各状态数量增量维护，汇总查询为 O(1)；
+    内存中只保留未完成订单与最近 max_history 个已结束订单，更早的订单写入归档文件
+    """
+
+    def __init__(self, max_history: int = 1000, archive_path: Optional[str] = None):
+        """
+        :param max_history: 内存中保留的已结束订单数量
+        :param archive_path: 归档文件路径（JSON Lines），为 None 时被淘汰的订单直接丢弃
+        """
+        self.orders: Dict[str, OrderInfo] = {}  # order_id -> OrderInfo（未完成 + 最近结束的订单）
+        self.max_history = max_history
+        self.archive_path = archive_path
+        self._lock = threading.RLock()  # 订单推送在 WebSocket 线程中更新状态
+
+        self._by_status: Dict[str, Dict[str, OrderInfo]] = {'open': {}, 'closed': {}, 'cancelled': {}}
+        self._by_level: Dict[Tuple[str, float], Dict[str, OrderInfo]] = {}  # (side, price) -> 未完成订单
+        self._history: Dict[str, OrderInfo] = {}  # 按结束顺序排列的已结束订单
+        self._counts = {'open': 0, 'closed': 0, 'cancelled': 0}  # 包含已归档订单的累计数量
+        self._total_profit = 0.0
+        self.archived = 0
+
+    @staticmethod
+    def _level_key(side: str, price: float) -> Tuple[str, float]:
+        return side, round(float(price), 8)
+
+    def _index(self, order: OrderInfo):
+        self._by_status.setdefault(order.status, {})[order.order_id] = order
+        self._counts[order.status] = self._counts.get(order.status, 0) + 1
+        if order.status == 'open':
+            self._by_level.setdefault(self._level_key(order.side, order.price), {})[order.order_id] = order
+
+    def _unindex(self, order: OrderInfo):
+        self._by_status.get(order.status, {}).pop(order.order_id, None)
+        self._counts[order.status] -= 1
+        if order.status == 'open':
+            key = self._level_key(order.side, order.price)
+            level = self._by_level.get(key)
+            if level is not None:
+                level.pop(order.order_id, None)
+                if not level:
+                    del self._by_level[key]
+
+    def add_order(self, order: OrderInfo):
+        """添加新订单"""
+        with self._lock:
+            existing = self.orders.get(order.order_id)
+            if existing is not None:
+                self._unindex(existing)
+            self.orders[order.order_id] = order
+            self._index(order)
+        logger.info(f"添加新订单: {order.order_id} - {order.side} {order.amount} @ {order.price}")
+
+    def update_order(self, order_id: str, status: str, filled_price: float = None, filled_amount: float = None):
+        """更新订单状态"""
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return
+            if status != order.status:
+                self._unindex(order)
+                # 已结束的订单在统计中保持已结束，但重新排到历史末尾
+                if order.status in TERMINAL_STATUSES:
+                    self._history.pop(order_id, None)
+                order.status = status
+                self._index(order)
+            if status in TERMINAL_STATUSES:
+                order.closed_at = datetime.now()
+                self._history.pop(order_id, None)
+                self._history[order_id] = order
+            if filled_price and filled_amount:
+                order.filled_price = filled_price
+                order.filled_amount = filled_amount
+                if order.side == 'ask':  # 如果是卖单，计算利润
+                    profit = (filled_price - order.price) * filled_amount
+                    self._total_profit += profit - (order.profit or 0.0)
+                    order.profit = profit
+            self._evict()
+        logger.info(f"更新订单状态: {order_id} -> {status}")
+
+    def load(self, orders: Iterable[OrderInfo]):
+        """
+        批量载入已有订单（如从事件日志恢复），不逐条记录日志，超出保留数量的订单不再归档
+        :param orders: 按结束顺序排列的订单
+        """
+        with self._lock:
+            for order in orders:
+                existing = self.orders.get(order.order_id)
+                if existing is not None:
+                    self._unindex(existing)
+                    self._history.pop(order.order_id, None)
+                    self._total_profit -= existing.profit or 0.0
+                self.orders[order.order_id] = order
+                self._index(order)
+                self._total_profit += order.profit or 0.0
+                if order.status in TERMINAL_STATUSES:
+                    self._history[order.order_id] = order
+            self._evict(archive=False)
+
+    def _evict(self, archive: bool = True):
+        """淘汰超出保留数量的最早结束的订单"""
+        evicted = []
+        while len(self._history) > self.max_history:
+            order_id = next(iter(self._history))
+            order = self._history.pop(order_id)
+            self.orders.pop(order_id, None)
+            self._by_status.get(order.status, {}).pop(order_id, None)
+            evicted.append(order)
+        if evicted:
+            self.archived += len(evicted)
+            if archive:
+                self._archive(evicted)
+
+    def _archive(self, orders: List[OrderInfo]):
+        if not self.archive_path:
+            return
+        try:
+            with open(self.archive_path, 'a', encoding='utf-8') as f:
+                for order in orders:
+                    f.write(json.dumps(order.to_dict(), ensure_ascii=False) + '\n')
+        except OSError as e:
+            logger.error(f"写入订单归档失败: {e}")
+
+    def get_order(self, order_id: str) -> OrderInfo:
+        """获取订单信息"""
+        return self.orders.get(order_id)
+
+    def get_open_orders(self) -> List[OrderInfo]:
+        """获取所有未完成订单"""
+        with self._lock:
+            return list(self._by_status['open'].values())
+
+    def get_closed_orders(self) -> List[OrderInfo]:
+        """获取内存中保留的已完成订单"""
+        with self._lock:
+            return list(self._by_status['closed'].values())
+
+    def get_orders_at(self, side: str, price: float) -> List[OrderInfo]:
+        """获取指定方向与价格档位上的未完成订单"""
+        with self._lock:
+            return list(self._by_level.get(self._level_key(side, price), {}).values())
+
+    def get_recent_closed(self, limit: int = 5) -> List[OrderInfo]:
+        """获取最近完成的订单（按完成顺序）"""
+        with self._lock:
+            closed = (order for order in reversed(self._history.values()) if order.status == 'closed')
+            return list(islice(closed, limit))[::-1]
+
+    def count(self, status: str) -> int:
+        """获取指定状态的订单数量（包含已归档订单）"""
+        return self._counts.get(status, 0)
+
+    def get_total_profit(self) -> float:
+        """获取总利润"""
+        return self._total_profit
+
+    def print_order_summary(self):
+        """打印订单汇总信息"""
+        recent = self.get_recent_closed(5)
+
+        logger.info("\n=== 订单汇总信息 ===")
+        logger.info(f"未完成订单数量: {self.count('open')}")
+        logger.info(f"已完成订单数量: {self.count('closed')}")
+        logger.info(f"总利润: {self.get_total_profit():.2f}")
+
+        if recent:
+            logger.info("\n最近完成的订单:")
+            for order in recent:  # 显示最近5个完成的订单
+                logger.info(f"订单 {order.order_id}: {order.side} {order.amount} @ {order.price} -> {order.filled_price} | 利润: {(order.profit or 0):.2f}")
+        logger.info("=" * 50)
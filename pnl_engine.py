@@ -0,0 +1,184 @@
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LevelStats:
+    """单个网格档位的成交统计"""
+    __slots__ = ('buys', 'sells', 'volume', 'realized', 'fees')
+
+    def __init__(self):
+        self.buys = 0
+        self.sells = 0
+        self.volume = 0.0  # 成交额（计价货币）
+        self.realized = 0.0
+        self.fees = 0.0
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PnLEngine:
+    """
+    盈亏引擎
+    按成交逐笔更新：买入形成持仓批次，卖出按 FIFO 与最早的批次配对计算已实现盈亏（反向持仓同理），
+    每笔成交的摊销复杂度为 O(1)；手续费折算为计价货币计入成本；
+    未实现盈亏 = 持仓市值 - 持仓成本，按最新价格 O(1) 计算
+    """
+
+    def __init__(self, base_currency: str, quote_currency: str, max_seen: int = 10000):
+        """
+        :param base_currency: 基础货币
+        :param quote_currency: 计价货币
+        :param max_seen: 用于去重的最近成交ID数量，超出后淘汰最早的ID
+        """
+        self.base_currency = base_currency
+        self.quote_currency = quote_currency
+        self._lock = threading.Lock()
+        self._lots = deque()  # [剩余数量(空头为负), 单位成本]
+        self.position = 0.0  # 净持仓（基础货币）
+        self.cost_basis = 0.0  # 持仓成本（计价货币，空头为负）
+        self.realized = 0.0
+        self.fees = 0.0
+        self.volume = 0.0
+        self.trades = 0
+        self.levels: Dict[int, LevelStats] = {}
+        self._seen = set()  # 最近已处理的成交ID
+        self._seen_order = deque(maxlen=max_seen)  # 成交ID的处理顺序，用于淘汰最早的ID
+
+    def seed(self, amount: float, price: float):
+        """
+        登记启动时已持有的基础货币，以给定价格作为成本
+        :param amount: 持仓数量
+        :param price: 成本价格
+        """
+        if amount <= 0:
+            return
+        with self._lock:
+            self._open(amount, price)
+
+    def _open(self, amount: float, unit_cost: float):
+        """开仓（amount 带方向）"""
+        self._lots.append([amount, unit_cost])
+        self.position += amount
+        self.cost_basis += amount * unit_cost
+
+    def _close(self, amount: float, price: float) -> Tuple[float, float]:
+        """
+        与现有反向持仓按 FIFO 配对
+        :param amount: 成交数量（带方向）
+        :param price: 单位成交价（已计入手续费）
+        :return: (未能配对的剩余数量（带方向）, 本次已实现盈亏)
+        """
+        realized = 0.0
+        while self._lots and amount and (self._lots[0][0] > 0) != (amount > 0):
+            lot = self._lots[0]
+            matched = min(abs(lot[0]), abs(amount))
+            direction = 1.0 if lot[0] > 0 else -1.0
+            realized += matched * direction * (price - lot[1])
+            lot[0] -= matched * direction
+            amount += matched * direction
+            self.position -= matched * direction
+            self.cost_basis -= matched * direction * lot[1]
+            if abs(lot[0]) <= 1e-12:
+                self._lots.popleft()
+        self.realized += realized
+        return amount, realized
+
+    def on_fill(self, side: str, price: float, amount: float, fee: float = 0.0, fee_currency: str = None,
+                trade_id: Optional[str] = None, level: Optional[int] = None) -> bool:
+        """
+        处理一笔成交
+        :param side: 'bid'/'buy' 或 'ask'/'sell'
+        :param price: 成交价格
+        :param amount: 成交数量
+        :param fee: 手续费
+        :param fee_currency: 手续费币种，基础货币的手续费按成交价折算
+        :param trade_id: 成交ID，用于去重
+        :param level: 网格档位序号
+        :return: 是否为新成交
+        """
+        if amount <= 0:
+            return False
+        with self._lock:
+            if trade_id is not None:
+                if trade_id in self._seen:
+                    return False
+                if len(self._seen_order) == self._seen_order.maxlen:
+                    self._seen.discard(self._seen_order[0])
+                self._seen_order.append(trade_id)
+                self._seen.add(trade_id)
+
+            fee_value = fee * price if fee_currency == self.base_currency else fee
+            buy = side in ('bid', 'buy')
+            # 手续费计入单位价格：买入成本上升，卖出所得下降
+            unit = price + fee_value / amount if buy else price - fee_value / amount
+            signed = amount if buy else -amount
+            remaining, realized = self._close(signed, unit)
+            if remaining:
+                self._open(remaining, unit)
+
+            self.fees += fee_value
+            self.volume += price * amount
+            self.trades += 1
+            if level is not None:
+                stats = self.levels.get(level)
+                if stats is None:
+                    stats = self.levels[level] = LevelStats()
+                if buy:
+                    stats.buys += 1
+                else:
+                    stats.sells += 1
+                stats.volume += price * amount
+                stats.realized += realized
+                stats.fees += fee_value
+        return True
+
+    def apply_trade(self, trade: Dict, level: Optional[int] = None) -> bool:
+        """处理 fetch_my_trades 返回的成交记录"""
+        fee = trade.get('fee') or {}
+        return self.on_fill(trade['side'], trade['price'], trade['amount'], fee.get('cost') or 0.0,
+                            fee.get('currency'), trade.get('id'), level)
+
+    def unrealized(self, price: float) -> float:
+        """按最新价格计算的未实现盈亏"""
+        return self.position * price - self.cost_basis
+
+    def average_cost(self) -> Optional[float]:
+        """持仓均价，无持仓时返回 None"""
+        return self.cost_basis / self.position if self.position else None
+
+    def snapshot(self, price: Optional[float] = None) -> Dict:
+        """
+        获取盈亏汇总
+        :param price: 最新价格，为 None 时不计算未实现盈亏
+        """
+        with self._lock:
+            unrealized = self.unrealized(price) if price is not None else None
+            return {
+                'realized': self.realized,
+                'unrealized': unrealized,
+                'total': self.realized + (unrealized or 0.0),
+                'fees': self.fees,
+                'volume': self.volume,
+                'trades': self.trades,
+                'position': self.position,
+                'averageCost': self.average_cost(),
+            }
+
+    def level_stats(self) -> Dict[int, Dict]:
+        """各网格档位的成交统计"""
+        with self._lock:
+            return {level: stats.to_dict() for level, stats in sorted(self.levels.items())}
+
+    def print_summary(self, price: float):
+        """打印盈亏汇总"""
+        snapshot = self.snapshot(price)
+        logger.info(
+            f"盈亏: 已实现 {snapshot['realized']:.4f} | 未实现 {snapshot['unrealized']:.4f} | "
+            f"手续费 {snapshot['fees']:.4f} {self.quote_currency} | 持仓 {snapshot['position']:.6f} {self.base_currency} | "
+            f"成交 {snapshot['trades']} 笔"
+        )
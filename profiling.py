@@ -0,0 +1,326 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Python 3.12 起 cProfile 基于 sys.monitoring，一个分析器即覆盖所有线程，且同一时间只能启用一个
+GLOBAL_PROFILER = sys.version_info >= (3, 12)
+
+NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    """计时一个阶段，结果计入全局汇总；不在其他阶段内时同时计入当前线程的迭代记录"""
+
+    __slots__ = ('profiler', 'name', 'started', 'nested')
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        local = self.profiler._local
+        depth = getattr(local, 'stage_depth', 0)
+        self.nested = depth > 0
+        local.stage_depth = depth + 1
+        self.started = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        self.profiler._local.stage_depth -= 1
+        self.profiler.record_stage(self.name, elapsed, self.nested)
+
+
+class _ThreadProfile:
+    """在当前线程启用 cProfile（Python 3.12 之前 cProfile 只分析启用它的线程）"""
+
+    __slots__ = ('profiler', 'state')
+
+    def __init__(self, profiler: 'Profiler'):
+        self.profiler = profiler
+
+    def __enter__(self):
+        self.state = self.profiler._enter_thread()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._exit_thread(self.state)
+
+
+class Profiler:
+    """
+    按需性能分析
+    平时处于待命状态，热路径上只有一次属性判断；通过信号（SIGUSR1）或控制文件（文件存在期间分析）在运行中开启与关闭，无需重启：
+    - 开启期间用 cProfile 分析主循环与请求线程，关闭时合并各线程的结果写入 .prof（可用 snakeviz 等工具查看）与按累计耗时排序的 .txt
+    - 每次完整检查按阶段（fetch、decide、place、cancel、summarise）记录耗时，逐行写入 stages-*.jsonl；
+      请求内部的 wait（限流等待）、sign、network、parse 阶段计入汇总
+    """
+
+    def __init__(self, directory: str = 'profiles', control_file: Optional[str] = None,
+                 poll_interval: float = 1.0, top: int = 40):
+        """
+        :param directory: 分析结果输出目录，首次开启时创建
+        :param control_file: 控制文件路径，文件存在期间开启分析，为 None 时只能通过信号切换
+        :param poll_interval: 检查信号请求与控制文件的间隔（秒）
+        :param top: 文本报告中输出的函数数量
+        """
+        self.directory = directory
+        self.control_file = control_file
+        self.poll_interval = poll_interval
+        self.top = top
+        self.active = False
+
+        self._lock = threading.RLock()  # 开启与关闭
+        self._sections = threading.Condition(threading.Lock())  # 正在分析的线程数与各线程的分析器
+        self._stats_lock = threading.Lock()  # 阶段汇总与阶段记录文件
+        self._inflight = 0
+        self._local = threading.local()
+        self._generation = 0
+        self._profiles: List[cProfile.Profile] = []
+        self._global_profile: Optional[cProfile.Profile] = None
+        self._stage_totals: Dict[str, List[float]] = {}
+        self._iterations = 0
+        self._stage_file = None
+        self._started_at = 0.0
+        self._closed = threading.Event()
+        self._toggle_requested = threading.Event()  # 信号处理函数只设置该标志，由监视线程切换
+        self._watcher: Optional[threading.Thread] = None
+
+    # ---------- 开启与关闭 ----------
+
+    def install(self):
+        """
+        注册 SIGUSR1 切换分析（需在主线程调用，Windows 不支持），并启动监视线程
+        信号处理函数在主线程任意位置执行，可能正持有 _stats_lock 或 _sections，因此只设置标志，由监视线程切换
+        """
+        signum = getattr(signal, 'SIGUSR1', None)
+        if signum is not None and threading.current_thread() is threading.main_thread():
+            signal.signal(signum, lambda s, f: self.request_toggle())
+            logger.info(f"性能分析: 发送 SIGUSR1 (kill -USR1 {os.getpid()}) 开启或关闭")
+        if self.control_file:
+            logger.info(f"性能分析: 创建 {self.control_file} 开启，删除后关闭并写入结果")
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch_loop, name="ProfilerWatcher", daemon=True)
+            self._watcher.start()
+
+    def request_toggle(self):
+        """请求开启或关闭分析（可在信号处理函数中调用），由监视线程在 poll_interval 内执行"""
+        self._toggle_requested.set()
+
+    def _watch_loop(self):
+        present = False  # 只在控制文件创建或删除时切换，不覆盖信号触发的切换
+        while not self._closed.is_set():
+            requested = self._toggle_requested.wait(self.poll_interval)
+            if self._closed.is_set():
+                break
+            if requested:
+                self._toggle_requested.clear()
+                self.toggle()
+            if self.control_file:
+                try:
+                    wanted = os.path.exists(self.control_file)
+                    if wanted != present:
+                        present = wanted
+                        self.start() if wanted else self.stop()
+                except Exception as e:
+                    logger.error(f"性能分析切换失败: {e}")
+
+    def toggle(self):
+        """开启或关闭分析"""
+        try:
+            self.stop() if self.active else self.start()
+        except Exception as e:
+            logger.error(f"性能分析切换失败: {e}")
+
+    def start(self):
+        """开启分析"""
+        with self._lock:
+            if self.active:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            with self._stats_lock:
+                self._stage_file = open(os.path.join(self.directory, f"stages-{stamp}-{os.getpid()}.jsonl"),
+                                        'a', encoding='utf-8')
+                self._stage_totals = {}
+                self._iterations = 0
+            with self._sections:
+                self._generation += 1
+                self._profiles = []
+            self._started_at = time.time()
+            if GLOBAL_PROFILER:
+                self._global_profile = cProfile.Profile()
+                self._global_profile.enable()
+            self.active = True
+        logger.info(f"性能分析已开启，结果输出到 {self.directory}")
+
+    def stop(self, timeout: float = 5.0) -> Optional[str]:
+        """
+        关闭分析并写入结果
+        等待其他线程正在进行的分析段结束（最多 timeout 秒），当前线程未结束的分析段直接停止
+        :return: .prof 文件路径，未开启时返回 None
+        """
+        with self._lock:
+            if not self.active:
+                return None
+            self.active = False
+            state = getattr(self._local, 'state', None)
+            own = 1 if state is not None and state['depth'] > 0 else 0
+            if own and state['profile'] is not None:
+                state['profile'].disable()
+            with self._sections:
+                self._sections.wait_for(lambda: self._inflight <= own, timeout)
+                pending = self._inflight - own
+                profiles = list(self._profiles)
+            if self._global_profile is not None:
+                self._global_profile.disable()
+                profiles = [self._global_profile]
+                self._global_profile = None
+            with self._stats_lock:
+                self._stage_file.close()
+                self._stage_file = None
+            path = self._dump(profiles, pending)
+        logger.info(f"性能分析已关闭，结果已写入 {path}")
+        return path
+
+    def close(self):
+        """停止监视控制文件，分析仍在进行时写入结果"""
+        self._closed.set()
+        self.stop(timeout=1.0)
+
+    # ---------- cProfile ----------
+
+    def thread_active(self) -> bool:
+        """当前线程是否已在分析中（避免嵌套启用）"""
+        state = getattr(self._local, 'state', None)
+        return state is not None and state['depth'] > 0
+
+    def thread_profile(self):
+        """在当前线程分析一段代码（如一次请求），未开启分析时不做任何事"""
+        return _ThreadProfile(self) if self.active else NULL_STAGE
+
+    def _enter_thread(self) -> Optional[Dict]:
+        state = getattr(self._local, 'state', None)
+        if state is None:
+            state = self._local.state = {'depth': 0, 'generation': 0, 'profile': None}
+        state['depth'] += 1
+        if state['depth'] > 1:
+            return state
+        with self._sections:
+            self._inflight += 1
+            if not GLOBAL_PROFILER and self.active and state['generation'] != self._generation:
+                # 每次开启分析时各线程使用新的分析器
+                state['generation'] = self._generation
+                state['profile'] = cProfile.Profile()
+                self._profiles.append(state['profile'])
+        if not GLOBAL_PROFILER and self.active:
+            state['profile'].enable()
+        return state
+
+    def _exit_thread(self, state: Dict):
+        state['depth'] -= 1
+        if state['depth'] > 0:
+            return
+        if state['profile'] is not None:
+            state['profile'].disable()
+        with self._sections:
+            self._inflight -= 1
+            self._sections.notify_all()
+
+    def _dump(self, profiles: List[cProfile.Profile], pending: int) -> str:
+        """合并各线程的分析结果，写入 .prof 与文本报告"""
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(self.directory, f"profile-{stamp}-{os.getpid()}")
+        report = io.StringIO()
+        duration = time.time() - self._started_at
+        report.write(f"分析时长 {duration:.1f} 秒，完整检查 {self._iterations} 次，分析线程 {len(profiles)} 个\n")
+        if pending:
+            report.write(f"{pending} 个线程在关闭时仍在运行，其结果未计入\n")
+        report.write("\n阶段耗时（秒）:\n")
+        for name, (count, total) in sorted(self._stage_totals.items(), key=lambda item: -item[1][1]):
+            report.write(f"  {name:<10} 次数 {int(count):>8}  合计 {total:>10.3f}  平均 {total / count * 1000:>9.3f} ms\n")
+
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile, stream=report)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # 没有执行过任何分析段的线程没有数据
+                continue
+        if stats is not None:
+            stats.dump_stats(f"{base}.prof")
+            report.write("\n")
+            stats.sort_stats('cumulative').print_stats(self.top)
+        with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        return f"{base}.prof" if stats is not None else f"{base}.txt"
+
+    # ---------- 阶段计时 ----------
+
+    def stage(self, name: str):
+        """计时一个阶段，未开启分析时不做任何事"""
+        return _Stage(self, name) if self.active else NULL_STAGE
+
+    def record_stage(self, name: str, elapsed: float, nested: bool = False):
+        """
+        记录阶段耗时：计入全局汇总，以及当前线程正在进行的迭代
+        :param nested: 是否在其他阶段内（如 fetch 阶段中请求的 network 阶段），嵌套阶段不计入迭代记录，避免重复计算
+        """
+        with self._stats_lock:
+            totals = self._stage_totals.get(name)
+            if totals is None:
+                totals = self._stage_totals[name] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += elapsed
+        iteration = None if nested else getattr(self._local, 'iteration', None)
+        if iteration is not None:
+            stages = iteration['stages']
+            stages[name] = stages.get(name, 0.0) + elapsed
+
+    def begin_iteration(self, label: str) -> Optional[Dict]:
+        """
+        开始一次主循环迭代（完整检查），在当前线程启用 cProfile 并收集阶段耗时
+        :param label: 迭代标签（交易对）
+        :return: 迭代记录，未开启分析时返回 None
+        """
+        if not self.active:
+            return None
+        iteration = {'label': label, 'started': time.perf_counter(), 'stages': {},
+                     'profile': self._enter_thread()}
+        self._local.iteration = iteration
+        return iteration
+
+    def end_iteration(self, iteration: Optional[Dict], reason: Optional[str] = None):
+        """
+        结束一次迭代，写入一行阶段耗时记录
+        :param iteration: begin_iteration 返回的迭代记录
+        :param reason: 本次检查的唤醒原因
+        """
+        if iteration is None:
+            return
+        self._local.iteration = None
+        self._exit_thread(iteration['profile'])
+        total = time.perf_counter() - iteration['started']
+        stages = {name: round(elapsed, 6) for name, elapsed in iteration['stages'].items()}
+        record = {
+            'time': round(time.time(), 3), 'label': iteration['label'], 'reason': reason,
+            'total': round(total, 6), 'stages': stages,
+            'other': round(max(0.0, total - sum(stages.values())), 6)
+        }
+        with self._stats_lock:
+            self._iterations += 1
+            if self._stage_file is not None:
+                self._stage_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._stage_file.flush()
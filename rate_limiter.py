@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from typing import Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    令牌桶
+    reserve 立即扣除令牌（允许透支）并返回需要等待的时间，调用方自行等待，
+    因此同步与异步客户端都可以使用
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        :param rate: 每秒补充的令牌数
+        :param capacity: 桶容量（允许的突发请求数）
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0, floor: float = 0.0) -> float:
+        """
+        预订令牌
+        :param tokens: 消耗的令牌数
+        :param floor: 令牌数需保持在此值以上才可立即发送，用于为高优先级请求保留额度
+        :return: 发送请求前需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            wait = 0.0 if self.tokens >= floor else (floor - self.tokens) / self.rate
+            return max(wait, self.blocked_until - now)
+
+    def block(self, seconds: float):
+        """在接下来的 seconds 秒内暂停发放令牌（用于服务端要求的退避）"""
+        with self._lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+
+    @property
+    def available(self) -> float:
+        """当前可用令牌数"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+
+class RateLimiter:
+    """
+    客户端限流器
+    所有请求共享一个全局令牌桶，另可为单个接口配置独立的令牌桶与权重；
+    全局令牌桶中保留一部分额度只供撤单等关键请求使用；
+    根据响应头（Retry-After / X-RateLimit-*）调整发送节奏，并统计预算使用情况
+    """
+
+    def __init__(self, rate: float = 10.0, capacity: float = 20.0,
+                 endpoint_limits: Optional[Mapping[str, Tuple[float, float]]] = None,
+                 weights: Optional[Mapping[str, float]] = None,
+                 reserved: float = 0.0):
+        """
+        :param rate: 全局每秒请求数
+        :param capacity: 全局突发请求数
+        :param endpoint_limits: 接口 -> (每秒请求数, 突发请求数)，接口格式为 "GET /api/v1/ticker"
+        :param weights: 接口 -> 每次请求消耗的令牌数，默认 1
+        :param reserved: 为关键请求保留的全局令牌数
+        """
+        self.global_bucket = TokenBucket(rate, capacity)
+        self.reserved = reserved
+        self.endpoint_buckets: Dict[str, TokenBucket] = {
+            endpoint: TokenBucket(limit[0], limit[1]) for endpoint, limit in (endpoint_limits or {}).items()
+        }
+        self.weights = dict(weights or {})
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, endpoint: str, key: str, value: float = 1):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                'requests': 0, 'weight': 0.0, 'wait': 0.0, 'throttled': 0, 'retries': 0
+            })
+            stats[key] += value
+
+    def reserve(self, endpoint: str, critical: bool = False) -> float:
+        """
+        为一次请求预订额度
+        :param endpoint: 接口
+        :param critical: 是否为关键请求，关键请求可以使用保留额度
+        :return: 发送前需要等待的秒数
+        """
+        weight = self.weights.get(endpoint, 1.0)
+        wait = self.global_bucket.reserve(weight, 0.0 if critical else self.reserved)
+        bucket = self.endpoint_buckets.get(endpoint)
+        if bucket is not None:
+            wait = max(wait, bucket.reserve(weight))
+        self._record(endpoint, 'requests')
+        self._record(endpoint, 'weight', weight)
+        if wait > 0:
+            self._record(endpoint, 'wait', wait)
+        return wait
+
+    def acquire(self, endpoint: str, critical: bool = False) -> float:
+        """预订额度并阻塞等待，返回实际等待的秒数"""
+        wait = self.reserve(endpoint, critical)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def on_response(self, endpoint: str, status_code: int, headers: Mapping[str, str]) -> Optional[float]:
+        """
+        根据响应调整限流状态
+        :param endpoint: 接口
+        :param status_code: HTTP状态码
+        :param headers: 响应头
+        :return: 服务端要求的退避秒数，没有要求时返回 None
+        """
+        retry_after = self._parse_retry_after(headers)
+        if status_code == 429:
+            self._record(endpoint, 'throttled')
+            backoff = retry_after if retry_after is not None else 1.0
+            self.global_bucket.block(backoff)
+            logger.warning(f"触发交易所限流: {endpoint}，暂停 {backoff:.2f} 秒")
+            return backoff
+
+        remaining = headers.get('X-RateLimit-Remaining') if headers else None
+        if remaining is not None:
+            try:
+                if float(remaining) <= 0:
+                    self.global_bucket.block(retry_after if retry_after is not None else 1.0)
+            except ValueError:
+                pass
+        return retry_after
+
+    def record_retry(self, endpoint: str):
+        """记录一次重试"""
+        self._record(endpoint, 'retries')
+
+    def _parse_retry_after(self, headers: Mapping[str, str]) -> Optional[float]:
+        """解析 Retry-After（秒）或 X-RateLimit-Reset（秒级/毫秒级时间戳）"""
+        if not headers:
+            return None
+        value = headers.get('Retry-After')
+        if value is not None:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return None
+        reset = headers.get('X-RateLimit-Reset')
+        if reset is not None:
+            try:
+                reset = float(reset)
+            except ValueError:
+                return None
+            if reset > 1e11:  # 毫秒时间戳
+                reset /= 1000
+            return max(0.0, reset - time.time()) if reset > 1e9 else max(0.0, reset)
+        return None
+
+    def stats(self) -> Dict:
+        """
+        获取限流统计
+        :return: {'remaining': 全局剩余令牌, 'endpoints': {接口: {requests, weight, wait, throttled, retries}}}
+        """
+        with self._lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+        return {
+            'remaining': self.global_bucket.available,
+            'capacity': self.global_bucket.capacity,
+            'rate': self.global_bucket.rate,
+            'endpoints': endpoints
+        }
@@ -0,0 +1,140 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 请求优先级，数值越小越先执行
+PRIORITY_CRITICAL = 0  # 撤单、止损止盈等风控操作
+PRIORITY_NORMAL = 1  # 下单
+PRIORITY_LOW = 2  # 行情、余额、订单查询
+
+# 指令类型 -> 优先级
+INSTRUCTION_PRIORITIES = {
+    'orderCancel': PRIORITY_CRITICAL,
+    'orderCancelAll': PRIORITY_CRITICAL,
+    'orderExecute': PRIORITY_NORMAL,
+}
+
+
+def priority_for(instruction: Optional[str]) -> int:
+    """根据指令类型推断请求优先级"""
+    return INSTRUCTION_PRIORITIES.get(instruction, PRIORITY_LOW)
+
+
+class RequestScheduler:
+    """
+    优先级请求调度器
+    由固定数量的工作线程按优先级执行请求：撤单与风控请求总是先于查询请求发出；
+    另有一个只执行关键请求的工作线程，普通工作线程全部阻塞在限流等待或重试退避中时撤单也能立即发出；
+    队列中尚未执行的相同低优先级查询会被合并，后来的调用方直接复用排队中请求的结果；
+    排队超过截止时间的低优先级查询直接丢弃，结果已过时的请求不再占用请求额度
+    """
+
+    def __init__(self, workers: int = 4, stale_timeout: Optional[float] = None):
+        """
+        :param workers: 工作线程数量（同时在途的请求数上限，不含关键请求专用线程）
+        :param stale_timeout: 低优先级请求的最长排队时间（秒），为 None 时不丢弃
+        """
+        self.stale_timeout = stale_timeout
+        self._queue = []
+        self._pending: Dict[str, Future] = {}  # 合并键 -> 排队中的请求
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._local = threading.local()
+        self.superseded = 0  # 被合并的查询请求数
+        self.expired = 0  # 排队超时被丢弃的请求数
+
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"RequestScheduler-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        self._workers.append(
+            threading.Thread(target=self._worker, args=(True,), name="RequestScheduler-critical", daemon=True))
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def in_worker(self) -> bool:
+        """当前线程是否为调度器工作线程"""
+        return getattr(self._local, 'active', False)
+
+    def submit(self, priority: int, fn: Callable, key: Optional[str] = None,
+               deadline: Optional[float] = None) -> Future:
+        """
+        提交请求
+        :param priority: 优先级
+        :param fn: 执行请求的无参函数
+        :param key: 合并键，仅对低优先级请求生效；队列中已有相同键的请求时直接返回其 Future
+        :param deadline: 开始执行的截止时间（time.monotonic），超过时请求以异常结束；
+                         为 None 时低优先级请求按 stale_timeout 计算
+        :return: 请求结果的 Future
+        """
+        with self._condition:
+            if key is not None and priority >= PRIORITY_LOW:
+                pending = self._pending.get(key)
+                if pending is not None:
+                    self.superseded += 1
+                    return pending
+
+            if deadline is None and priority >= PRIORITY_LOW and self.stale_timeout is not None:
+                deadline = time.monotonic() + self.stale_timeout
+            future = Future()
+            if key is not None and priority >= PRIORITY_LOW:
+                self._pending[key] = future
+            heapq.heappush(self._queue, (priority, next(self._counter), fn, future, key, deadline))
+            # 关键请求专用线程只等待关键请求，需要唤醒所有线程
+            self._condition.notify_all()
+            return future
+
+    def call(self, priority: int, fn: Callable, key: Optional[str] = None, deadline: Optional[float] = None):
+        """
+        提交请求并等待结果；在工作线程内调用时直接执行，避免占满工作线程导致死锁
+        """
+        if self.in_worker:
+            return fn()
+        return self.submit(priority, fn, key, deadline).result()
+
+    def queued(self) -> int:
+        """排队中的请求数"""
+        with self._condition:
+            return len(self._queue)
+
+    def _ready(self, critical_only: bool) -> bool:
+        """队列中是否有该工作线程可以执行的请求（堆顶即优先级最高的请求）"""
+        if not self._queue:
+            return False
+        return not critical_only or self._queue[0][0] == PRIORITY_CRITICAL
+
+    def _worker(self, critical_only: bool = False):
+        """
+        工作线程主循环
+        :param critical_only: 只执行关键请求
+        """
+        self._local.active = True
+        while True:
+            with self._condition:
+                while not self._ready(critical_only):
+                    self._condition.wait()
+                priority, _, fn, future, key, deadline = heapq.heappop(self._queue)
+                # 开始执行后不再合并，之后的相同查询需要重新发出以获得最新数据
+                if key is not None and self._pending.get(key) is future:
+                    del self._pending[key]
+                expired = deadline is not None and time.monotonic() > deadline
+                if expired:
+                    self.expired += 1
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            if expired:
+                logger.warning(f"请求排队超过截止时间，已丢弃 (优先级 {priority})")
+                future.set_exception(Exception("请求排队超过截止时间，已丢弃"))
+                continue
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
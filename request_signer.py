@@ -0,0 +1,122 @@
+import base64
+import logging
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import nacl.signing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 5000  # 签名有效时间窗口（毫秒）
+
+
+def encode_value(value) -> str:
+    """签名与查询字符串中的取值编码（布尔值小写）"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def encode_query(params: Optional[Dict]) -> str:
+    """
+    按键排序的查询字符串，签名与 URL 共用同一份编码
+    列表类型的参数每个元素单独添加
+    :param params: 查询参数
+    :return: 查询字符串，没有参数时为空字符串
+    """
+    if not params:
+        return ''
+    parts = []
+    for key, value in sorted(params.items(), key=lambda item: item[0]):
+        if isinstance(value, list):
+            parts.extend(f"{key}={item}" for item in value)
+        else:
+            parts.append(f"{key}={value}")
+    return "&".join(parts)
+
+
+def encode_body(data: Dict) -> str:
+    """请求体的签名编码（按键排序，布尔值小写）"""
+    return "&".join(f"{key}={encode_value(value)}" for key, value in sorted(data.items(), key=lambda item: item[0]))
+
+
+def canonical_payload(instruction: Optional[str], data: Optional[Union[Dict, List[Dict]]] = None, query: str = '') -> str:
+    """
+    签名字符串中时间戳之前的部分: instruction、请求体、查询参数
+    批量请求的请求体为列表，每个元素都以 instruction 开头依次拼接
+    :param instruction: 指令类型
+    :param data: 请求体数据
+    :param query: encode_query 编码后的查询字符串
+    :return: 签名前缀，为空时返回空字符串
+    """
+    parts = []
+    prefix = f"instruction={instruction}" if instruction else None
+    if isinstance(data, list):
+        for item in data:
+            if prefix:
+                parts.append(prefix)
+            parts.append(encode_body(item))
+    else:
+        if prefix:
+            parts.append(prefix)
+        if data:
+            parts.append(encode_body(data))
+    if query:
+        parts.append(query)
+    return "&".join(parts)
+
+
+class RequestSigner:
+    """
+    ED25519 请求签名器
+    私钥只解码一次并缓存 SigningKey；请求的规范编码（instruction、请求体、查询参数）每个请求只计算一次，
+    查询字符串同时用于 URL，重试时只需追加新的时间戳重新签名。
+    设置了 clock（ClockSync）时按服务器时间生成时间戳，并使用其根据延迟调整的时间窗口
+    """
+
+    def __init__(self, api_key: Optional[str], secret: Optional[str], window: int = DEFAULT_WINDOW, clock=None):
+        """
+        :param api_key: API Key（Base64 公钥）
+        :param secret: API Secret（Base64 私钥），为空时只生成不带签名的请求头（公共接口）
+        :param window: 签名有效时间窗口（毫秒），设置 clock 时不使用
+        :param clock: 服务器时钟偏差估计（ClockSync），为 None 时使用本地时间
+        """
+        self.api_key = api_key
+        self.window = str(window)
+        self.clock = clock
+        self._key = nacl.signing.SigningKey(base64.b64decode(secret)) if secret else None
+
+    @property
+    def can_sign(self) -> bool:
+        return self._key is not None
+
+    def sign(self, payload: str, timestamp: Optional[str] = None) -> Tuple[str, Dict[str, str]]:
+        """
+        对签名前缀追加时间戳与时间窗口后签名
+        :param payload: canonical_payload 返回的签名前缀
+        :param timestamp: 毫秒时间戳字符串，默认为当前（服务器）时间
+        :return: (Base64 签名, 请求头)
+        """
+        if self._key is None:
+            return '', {'Content-Type': 'application/json'}
+        clock = self.clock
+        if timestamp is None:
+            timestamp = str(clock.now_ms() if clock is not None else int(time.time() * 1000))
+        window = str(clock.window) if clock is not None else self.window
+        message = f"{payload}&timestamp={timestamp}&window={window}" if payload else \
+            f"timestamp={timestamp}&window={window}"
+        signature = base64.b64encode(self._key.sign(message.encode('utf-8')).signature).decode('ascii')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"签名字符串: {message}")
+        return signature, {
+            'X-API-KEY': self.api_key,
+            'X-SIGNATURE': signature,
+            'X-TIMESTAMP': timestamp,
+            'X-WINDOW': window,
+            'Content-Type': 'application/json'
+        }
+
+    def sign_request(self, instruction: Optional[str], data: Optional[Union[Dict, List[Dict]]] = None,
+                     query: str = '') -> Tuple[str, Dict[str, str]]:
+        """编码并签名一个请求，参数见 canonical_payload"""
+        return self.sign(canonical_payload(instruction, data, query))
@@ -21,7 +21,7 @@ if not exist .env (
 
 REM 检查依赖是否安装
 echo Checking dependencies...
-pip show ccxt >nul 2>&1
+pip show requests PyNaCl >nul 2>&1
 if errorlevel 1 (
     echo Installing dependencies...
     pip install -r requirements.txt
@@ -0,0 +1,83 @@
+import base64
+import os
+import sys
+import threading
+import time
+
+import nacl.signing
+import pytest
+
+# 模块位于仓库根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backpack_exchange import BackpackExchange  # noqa: E402
+from mock_exchange_server import MockExchange, MockServer, MockWebSocketServer  # noqa: E402
+
+SYMBOL = 'SOL_USDC'
+
+
+@pytest.fixture
+def credentials():
+    """随机生成的 ED25519 密钥对: (API Key, Secret)"""
+    signing_key = nacl.signing.SigningKey.generate()
+    secret = base64.b64encode(bytes(signing_key)).decode('ascii')
+    api_key = base64.b64encode(bytes(signing_key.verify_key)).decode('ascii')
+    return api_key, secret
+
+
+@pytest.fixture
+def mock_exchange():
+    """在临时端口上启动模拟交易所（REST + WebSocket），返回 (MockExchange, REST 地址, WebSocket 地址, WebSocket 服务)"""
+    markets = {SYMBOL: {'base': 'SOL', 'quote': 'USDC', 'tickSize': 0.01, 'stepSize': 0.001,
+                        'minQuantity': 0.001, 'price': 150.0}}
+    exchange = MockExchange(markets, {'SOL': 100.0, 'USDC': 20000.0})
+    rest = MockServer(('127.0.0.1', 0), exchange)
+    ws = MockWebSocketServer(('127.0.0.1', 0), exchange)
+    threads = [threading.Thread(target=server.serve_forever, daemon=True) for server in (rest, ws)]
+    for thread in threads:
+        thread.start()
+    yield exchange, f"http://127.0.0.1:{rest.server_address[1]}", f"ws://127.0.0.1:{ws.server_address[1]}", ws
+    for server in (rest, ws):
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def rest_server(mock_exchange):
+    """在临时端口上按选项启动额外的 REST 模拟服务（与 mock_exchange 共用撮合引擎），返回 start(**options) -> (服务, 地址)"""
+    servers = []
+
+    def start(**options):
+        server = MockServer(('127.0.0.1', 0), mock_exchange[0], **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def order_params(side: str, price: str, amount: str = '0.1', client_id: int = None) -> dict:
+    """create_order / create_orders 的限价只挂单参数"""
+    return {'symbol': SYMBOL, 'side': side, 'type': 'limit', 'amount': amount, 'price': price,
+            'post_only': True, 'time_in_force': 'GTC', 'client_id': client_id}
+
+
+def wait_until(predicate, timeout: float = 5.0) -> bool:
+    """轮询等待条件成立"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def client(mock_exchange, credentials):
+    """连接模拟交易所的同步客户端，每批最多 3 个订单"""
+    _, base_url, _, _ = mock_exchange
+    api_key, secret = credentials
+    return BackpackExchange({'apiKey': api_key, 'secret': secret, 'baseUrl': base_url, 'maxBatchOrders': 3})
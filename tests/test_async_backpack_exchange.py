@@ -0,0 +1,25 @@
+import asyncio
+
+from async_backpack_exchange import AsyncBackpackExchange
+
+from conftest import SYMBOL, order_params
+
+
+def test_async_client(mock_exchange, credentials):
+    exchange, base_url, _, _ = mock_exchange
+    api_key, secret = credentials
+
+    async def run():
+        async with AsyncBackpackExchange({'apiKey': api_key, 'secret': secret, 'baseUrl': base_url,
+                                          'maxBatchOrders': 2}) as client:
+            results = await client.create_orders([order_params('Bid', f"{149 - i}") for i in range(5)])
+            ticker, open_orders = await asyncio.gather(client.fetch_ticker(SYMBOL), client.fetch_open_orders(SYMBOL))
+            cancelled = await client.cancel_all_orders(SYMBOL)
+            return results, ticker, open_orders, cancelled
+
+    results, ticker, open_orders, cancelled = asyncio.run(run())
+    assert all(result['id'] for result in results)
+    assert ticker['last'] == 150
+    assert len(open_orders) == 5
+    assert len(cancelled) == 5
+    assert exchange.open_orders(api_key, SYMBOL) == []
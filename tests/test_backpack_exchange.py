@@ -0,0 +1,150 @@
+import socket
+import time
+
+import pytest
+import requests
+
+from backpack_exchange import BackpackExchange
+
+from conftest import SYMBOL, order_params
+
+
+def test_signed_batch_create(client, mock_exchange):
+    exchange, _, _, _ = mock_exchange
+    orders = [order_params('Bid', f"{149 - i}", client_id=100 + i) for i in range(5)]
+    orders.append(order_params('Bid', '151'))  # postOnly 买单高于当前价格，会被拒绝
+
+    results = client.create_orders(orders)
+
+    # 按 maxBatchOrders=3 分两批提交，结果与输入顺序一致
+    assert [result['clientId'] for result in results[:5]] == [100, 101, 102, 103, 104]
+    assert all(result['id'] for result in results[:5])
+    assert results[5]['id'] is None and 'immediately match' in results[5]['error']
+    assert len(exchange.open_orders(client.apiKey, SYMBOL)) == 5
+    assert client.fetch_balance()['USDC']['used'] == pytest.approx(0.1 * sum(149 - i for i in range(5)))
+
+
+def test_cancel_all(client, mock_exchange):
+    placed = client.create_orders([order_params('Bid', '148'), order_params('Ask', '152')])
+
+    cancelled = client.cancel_all_orders(SYMBOL)
+
+    assert sorted(order['id'] for order in cancelled) == sorted(order['id'] for order in placed)
+    assert all(order['status'] == 'Cancelled' for order in cancelled)
+    assert client.fetch_open_orders(SYMBOL) == []
+    assert client.fetch_balance()['USDC']['used'] == 0
+
+
+def retry_client(base_url, credentials, delays=None, **config):
+    """关闭时钟校准的客户端，delays 不为 None 时记录每次退避的重试序号且不实际等待"""
+    api_key, secret = credentials
+    client = BackpackExchange({'apiKey': api_key, 'secret': secret, 'baseUrl': base_url,
+                               'clockSyncInterval': 0, **config})
+    if delays is not None:
+        client._backoff_delay = lambda attempt: delays.append(attempt) or 0.0
+    return client
+
+
+def endpoint_stats(client, endpoint):
+    return client.rate_limiter.stats()['endpoints'][endpoint]
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def failing(calls, fail_times):
+    """前 fail_times 次调用抛出异常（模拟服务端返回 500），之后调用原方法"""
+    def wrap(method):
+        def call(*args, **kwargs):
+            calls.append(args)
+            if len(calls) <= fail_times:
+                raise RuntimeError('injected failure')
+            return method(*args, **kwargs)
+        return call
+    return wrap
+
+
+def test_backoff_is_exponential_with_jitter(client):
+    for attempt in range(6):
+        delay = client._backoff_delay(attempt)
+        expected = min(client.max_backoff, client.base_backoff * 2 ** attempt)
+        assert expected / 2 <= delay <= expected
+
+
+def test_rate_limited_post_is_retried_after_retry_after(rest_server, credentials, mock_exchange):
+    exchange = mock_exchange[0]
+    server, base_url = rest_server(error_rate=1.0)
+    client = retry_client(base_url, credentials)
+    limiter = client.rate_limiter
+    on_response = limiter.on_response
+
+    def inject_once(endpoint, status_code, headers):
+        server.error_rate = 0.0  # 只注入一次 429（Retry-After: 1）
+        return on_response(endpoint, status_code, headers)
+
+    limiter.on_response = inject_once
+    started = time.monotonic()
+    order = client.create_order(**order_params('Bid', '149'))
+
+    # 429 表示请求未被处理，下单请求也会重试，且限流器在 Retry-After 期间暂停发放令牌
+    assert time.monotonic() - started >= 0.9
+    assert limiter.global_bucket.blocked_until > 0
+    stats = endpoint_stats(client, 'POST /api/v1/order')
+    assert stats['throttled'] == 1 and stats['retries'] == 1 and stats['requests'] == 2
+    assert [o['id'] for o in exchange.open_orders(client.apiKey, SYMBOL)] == [order['id']]
+
+
+def test_server_error_on_post_is_not_retried(client, mock_exchange, monkeypatch):
+    exchange = mock_exchange[0]
+    calls = []
+    monkeypatch.setattr(exchange, 'place_order', failing(calls, 1)(exchange.place_order))
+
+    with pytest.raises(Exception):
+        client.create_order(**order_params('Bid', '149'))
+    assert len(calls) == 1
+    assert endpoint_stats(client, 'POST /api/v1/order')['retries'] == 0
+
+
+def test_connection_error_on_post_is_not_retried(credentials):
+    delays = []
+    client = retry_client(closed_port_url(), credentials, delays)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.create_order(**order_params('Bid', '149'))
+    assert delays == []
+    assert endpoint_stats(client, 'POST /api/v1/order')['requests'] == 1
+
+
+def test_connection_error_on_get_is_retried_with_backoff(credentials):
+    delays = []
+    client = retry_client(closed_port_url(), credentials, delays, maxRetries=2)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.fetch_ticker(SYMBOL)
+    assert delays == [0, 1]
+    stats = endpoint_stats(client, 'GET /api/v1/ticker')
+    assert stats['requests'] == 3 and stats['retries'] == 2
+
+
+def test_server_errors_on_get_and_delete_are_retried(rest_server, credentials, mock_exchange, monkeypatch):
+    exchange = mock_exchange[0]
+    _, base_url = rest_server()
+    delays = []
+    client = retry_client(base_url, credentials, delays)
+
+    ticker_calls = []
+    monkeypatch.setattr(exchange, 'ticker', failing(ticker_calls, 2)(exchange.ticker))
+    assert client.fetch_ticker(SYMBOL)['last'] == 150
+    assert len(ticker_calls) == 3
+    assert delays == [0, 1]
+
+    client.create_orders([order_params('Bid', '148'), order_params('Ask', '152')])
+    delays.clear()
+    cancel_calls = []
+    monkeypatch.setattr(exchange, 'cancel_all', failing(cancel_calls, 1)(exchange.cancel_all))
+    assert len(client.cancel_all_orders(SYMBOL)) == 2
+    assert len(cancel_calls) == 2
+    assert delays == [0]
+    assert endpoint_stats(client, 'DELETE /api/v1/orders')['retries'] == 1
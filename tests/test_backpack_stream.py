@@ -0,0 +1,97 @@
+import queue
+
+import pytest
+
+from backpack_stream import MarketDataStream, OrderUpdateStream
+
+from conftest import SYMBOL, order_params, wait_until
+
+
+class CountingClient:
+    """记录 REST 行情请求次数的客户端"""
+
+    def __init__(self, client):
+        self.client = client
+        self.ticker_requests = 0
+
+    def fetch_ticker(self, symbol):
+        self.ticker_requests += 1
+        return self.client.fetch_ticker(symbol)
+
+
+@pytest.fixture
+def market_stream(client, mock_exchange):
+    _, _, ws_url, ws_server = mock_exchange
+    rest = CountingClient(client)
+    stream = MarketDataStream(SYMBOL, exchange=rest, ws_url=ws_url)
+    yield stream, rest, ws_server
+    stream.stop(timeout=1)
+
+
+def test_market_stream_reads_snapshot_without_requests(market_stream, mock_exchange):
+    exchange = mock_exchange[0]
+    stream, rest, ws_server = market_stream
+    stream.start()
+    assert wait_until(lambda: any(f"ticker.{SYMBOL}" in conn.streams for conn in ws_server.connections))
+
+    exchange.set_price(SYMBOL, 151)
+    assert wait_until(lambda: stream.connected and stream.get_snapshot()['bid'] is not None)
+    assert stream.get_price() == 151
+    assert stream.get_snapshot()['bid'] == pytest.approx(150.99)
+    assert rest.ticker_requests == 0
+
+
+def test_market_stream_falls_back_to_rest(market_stream, mock_exchange):
+    exchange = mock_exchange[0]
+    stream, rest, ws_server = market_stream
+
+    # 未连接时通过 REST 获取并刷新快照
+    assert stream.get_price() == 150
+    assert rest.ticker_requests == 1
+    assert stream.get_snapshot()['last'] == 150
+
+    stream.start()
+    assert wait_until(lambda: any(f"ticker.{SYMBOL}" in conn.streams for conn in ws_server.connections))
+    exchange.set_price(SYMBOL, 151)
+    assert wait_until(lambda: stream.connected)
+    assert stream.get_price() == 151 and rest.ticker_requests == 1
+
+    # 连接仍在但推送中断，快照过期后回退到 REST
+    stream.max_age = 0.05
+    exchange.prices[SYMBOL] = 152  # 只改价格不推送
+    assert wait_until(lambda: stream.get_price() == 152)
+    assert rest.ticker_requests >= 2
+
+    # 连接断开后回退到 REST
+    stream.max_age = 60.0
+    ws_server.drop_all()
+    assert wait_until(lambda: not stream.connected)
+    exchange.prices[SYMBOL] = 153
+    assert stream.get_price() == 153
+
+
+def test_order_update_stream_round_trip(client, mock_exchange):
+    exchange, _, ws_url, ws_server = mock_exchange
+    events = queue.Queue()
+    stream = OrderUpdateStream(SYMBOL, client, ws_url=ws_url)
+    stream.add_listener(events.put)
+    stream.start()
+    try:
+        # 等待服务端处理订阅消息（签名校验通过后才会推送私有订单事件）
+        assert wait_until(lambda: any(f"account.orderUpdate.{SYMBOL}" in conn.streams for conn in ws_server.connections))
+        assert not stream.connected  # 收到订单流的首条消息前不视为在线
+
+        order = client.create_order(**order_params('Bid', '149.5', '0.2'))
+        exchange.set_price(SYMBOL, 149)
+
+        received = []
+        while not received or received[-1]['event'] != 'orderFill':
+            received.append(events.get(timeout=5))
+        fill = received[-1]
+        assert fill['id'] == order['id']
+        assert fill['status'] == 'Filled'
+        assert fill['fillAmount'] == pytest.approx(0.2)
+        assert fill['fillPrice'] == pytest.approx(149.5)
+        assert stream.connected and stream.connections == 1
+    finally:
+        stream.stop(timeout=1)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from backtest import backtest
+
+
+def bars(opens, closes):
+    opens, closes = np.array(opens, dtype=float), np.array(closes, dtype=float)
+    return {'open': opens, 'high': np.maximum(opens, closes), 'low': np.minimum(opens, closes), 'close': closes}
+
+
+def test_fill_then_bounce_does_not_round_trip_at_same_price():
+    # 149 买单成交后价格在 148.9 与 149.5 之间来回波动，没有触及上一档 150
+    prices = bars([150.4, 148.9, 149.5, 148.9, 149.5, 148.9], [148.9, 149.5, 148.9, 149.5, 148.9, 149.5])
+    result = backtest(prices, 140, 160, 20, investment=2000, fee_rate=0.001)
+    assert result['fills'] == 1
+    assert result['final_base'] > 0
+
+
+def test_filled_bid_is_sold_one_level_up():
+    prices = bars([150.4, 148.9], [148.9, 150.2])
+    result = backtest(prices, 140, 160, 20, investment=2000, fee_rate=0.0)
+    assert result['fills'] == 2  # 149 买入、150 卖出
+    assert result['volume'] == pytest.approx(0.671 * 149 + 0.666 * 150)
+    assert result['return'] > 0
@@ -0,0 +1,98 @@
+import threading
+import time
+
+from balance_ledger import BalanceLedger
+from grid_reconciler import GridLevel, GridReconciler
+
+
+class StubExchange:
+    def fetch_balance(self):
+        return {'USDC': {'free': 1000.0, 'used': 0.0, 'total': 1000.0},
+                'SOL': {'free': 10.0, 'used': 0.0, 'total': 10.0}}
+
+
+def test_concurrent_allocation_never_overcommits():
+    ledger = BalanceLedger(StubExchange())
+    ledger.sync()
+    reconciler = GridReconciler()
+    barrier = threading.Barrier(4)
+    allocated = []
+
+    def allocate(symbol):
+        levels = [GridLevel('bid', 100.0 - i, 1.0) for i in range(5)]
+        barrier.wait()
+        allocated.extend(reconciler.allocate(
+            levels, lambda level: ledger.try_reserve(f"{symbol}:bid:{level.price}", 'USDC', level.price * level.amount)))
+
+    threads = [threading.Thread(target=allocate, args=(f"GRID{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(level.price * level.amount for level in allocated) <= 1000.0
+    assert ledger.available('USDC') >= 0
+    assert ledger.available('USDC') + ledger.locked('USDC') == 1000.0
+
+
+def test_pending_reservation_moves_to_order_or_is_released():
+    ledger = BalanceLedger(StubExchange())
+    ledger.sync()
+    reconciler = GridReconciler(fee_rate=0.5)
+    ask = GridLevel('ask', 150.0, 4.0)
+    assert ledger.try_reserve('SOL_USDC:ask:150.0', 'SOL', 4.0, reconciler.headroom(ask))
+    assert not ledger.try_reserve('SOL_USDC:ask:151.0', 'SOL', 4.0, reconciler.headroom(ask))  # 需要保留 4 SOL 手续费缓冲
+
+    ledger.rename('SOL_USDC:ask:150.0', 'order-1')
+    assert ledger.release('SOL_USDC:ask:150.0') == 0.0
+    assert ledger.release('order-1') == 4.0
+    assert ledger.available('SOL') == 10.0
+
+
+class SnapshotExchange:
+    """fetch_balance 返回查询开始时的余额，during 模拟查询期间其他网格的操作"""
+
+    def __init__(self, free=1000.0, used=0.0):
+        self.free = free
+        self.used = used
+        self.during = None
+
+    def fetch_balance(self):
+        snapshot = {'USDC': {'free': self.free, 'used': self.used, 'total': self.free + self.used}}
+        if self.during is not None:
+            self.during()
+        return snapshot
+
+
+def test_sync_keeps_reservations_not_yet_in_the_snapshot():
+    exchange = SnapshotExchange()
+    ledger = BalanceLedger(exchange)
+    ledger.sync()
+
+    # 已提交的订单在交易所余额中冻结
+    assert ledger.try_reserve('GRID0:bid:100.0', 'USDC', 300.0)
+    ledger.rename('GRID0:bid:100.0', 'order-0')
+    exchange.free, exchange.used = 700.0, 300.0
+    time.sleep(0.01)
+    # 尚未提交的预留不在交易所余额中
+    assert ledger.try_reserve('GRID1:bid:100.0', 'USDC', 200.0)
+
+    def place_during_sync():
+        # 查询期间另一个网格预留并提交，交易所返回的余额不包含该订单
+        assert ledger.try_reserve('GRID2:bid:100.0', 'USDC', 400.0)
+        ledger.rename('GRID2:bid:100.0', 'order-2')
+
+    exchange.during = place_during_sync
+    ledger.sync()
+    assert ledger.available('USDC') == 100.0
+    assert ledger.locked('USDC') == 900.0
+    assert not ledger.try_reserve('GRID3:bid:100.0', 'USDC', 200.0)
+
+    # 下次同步时交易所余额已包含这些订单，不再重复扣除
+    ledger.rename('GRID1:bid:100.0', 'order-1')
+    exchange.during = None
+    exchange.free, exchange.used = 100.0, 900.0
+    time.sleep(0.01)
+    ledger.sync()
+    assert ledger.available('USDC') == 100.0
+    assert ledger.locked('USDC') == 900.0
@@ -0,0 +1,15 @@
+import pytest
+
+from ccxt_adapter import ccxt_available, create_ccxt_exchange
+
+from conftest import SYMBOL
+
+pytestmark = pytest.mark.skipif(not ccxt_available(), reason='未安装 ccxt')
+
+
+def test_load_markets(mock_exchange, credentials):
+    _, base_url, _, _ = mock_exchange
+    api_key, secret = credentials
+    exchange = create_ccxt_exchange({'apiKey': api_key, 'secret': secret, 'baseUrl': base_url})
+    markets = exchange.load_markets()
+    assert SYMBOL in markets or any(market.get('id') == SYMBOL for market in markets.values())
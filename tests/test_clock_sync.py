@@ -0,0 +1,38 @@
+import pytest
+
+from backpack_exchange import BackpackExchange
+from clock_sync import ClockSync
+
+
+def test_skewed_server_triggers_resync_and_retry(rest_server, credentials):
+    server, base_url = rest_server()
+    api_key, secret = credentials
+    client = BackpackExchange({'apiKey': api_key, 'secret': secret, 'baseUrl': base_url, 'clockSyncInterval': 600})
+    client.fetch_balance()
+    assert client.clock.samples == 1
+    assert abs(client.clock.offset) < 1000
+
+    # 服务器时钟快 30 秒，超出 5 秒的签名窗口：请求被拒绝后重新校准并用新的时间戳重试
+    server.clock_skew = 30.0
+    balance = client.fetch_balance()
+
+    assert balance['USDC']['total'] == 20000
+    assert client.clock.rejections == 1
+    assert client.clock.samples == 2
+    assert client.clock.offset == pytest.approx(30000, abs=1000)
+    assert not client.clock.needs_sync()
+
+
+def test_window_widens_with_latency():
+    clock = ClockSync(min_window=5000, max_window=60000)
+    clock.add_sample(0.0, 0.2, 100.0)  # 往返 200 ms
+    assert clock.window == 5000
+
+    # 往返 3 秒：srtt 3000 + 4 * rttvar 1500 加上偏差误差 1500，乘以 2 为 21 秒
+    clock = ClockSync(min_window=5000, max_window=60000)
+    clock.add_sample(0.0, 3.0, 1500.0)
+    assert clock.window == 21000
+
+    clock = ClockSync(min_window=5000, max_window=60000)
+    clock.add_sample(0.0, 20.0, 10000.0)
+    assert clock.window == 60000
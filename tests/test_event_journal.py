@@ -0,0 +1,14 @@
+from event_journal import EVENT_FILL, EVENT_PLACE, EventJournal, JournalReader
+
+
+def test_oversized_fields_skip_the_event(tmp_path):
+    journal = EventJournal(str(tmp_path), flush_interval=0)
+    journal.record_place('1' * 30, 'SOL_USDC', 'bid', 149.0, 1.0)  # 订单ID超过 24 字节
+    journal.record_place('12345', 'SOL_USDC', 'bid', 149.0, 1.0, client_id=2 ** 40)  # clientId 超出 uint32
+    journal.record_place('12346', 'SOL_USDC', 'bid', 148.0, 1.0)
+    journal.record_fill('12346', 'SOL_USDC', 'bid', 148.0, 1.0, final=True)
+    journal.close()
+
+    events = list(JournalReader(str(tmp_path)).scan(symbol='SOL_USDC'))
+    assert [(event.order_id, event.event) for event in events] == [('12346', EVENT_PLACE), ('12346', EVENT_FILL)]
+    assert list(JournalReader(str(tmp_path)).scan(symbol='X' * 20)) == []
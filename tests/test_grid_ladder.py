@@ -0,0 +1,31 @@
+import pytest
+
+from grid_ladder import GridLadder
+
+
+def test_prices_and_amounts_follow_tick_and_step():
+    ladder = GridLadder(100.0, 110.0, 3, 'arithmetic', 300.0, 0.001, tick_size=0.05, step_size=0.01)
+    # 100 + 10/3 * i 按 0.05 取整到最近的价格
+    assert ladder.price_list() == [100.0, 103.35, 106.65, 110.0]
+    # 每格 100 USDC，数量按 0.01 向下取整
+    assert ladder.amounts.tolist() == [1.0, 0.96, 0.93, 0.9]
+    assert ladder.level_of(103.37) == 1
+    assert ladder.level_of(103.5) is None
+    assert ladder.amount_at(105.0) == 0.95
+
+
+def test_merged_levels_keep_per_level_investment():
+    # 0.5 的价格精度下 11 个档位只剩 6 个
+    ladder = GridLadder(100.0, 102.5, 10, 'arithmetic', 1000.0, 0.001, tick_size=0.5, step_size=0.001)
+    assert ladder.price_list() == [100.0, 100.5, 101.0, 101.5, 102.0, 102.5]
+    # 每格投资仍按配置的网格数量计算，合并档位不会放大单个档位的下单金额
+    assert ladder.grid_investment == 100.0
+    assert ladder.amounts[0] == pytest.approx(1.0)
+    assert float(ladder.notionals.sum()) < 1000.0
+
+
+def test_min_order_size_is_rounded_up_to_step():
+    ladder = GridLadder(100.0, 200.0, 2, 'geometric', 2.0, 0.0125, tick_size=0.01, step_size=0.01)
+    # 每格 1 USDC 的数量低于最小下单数量 0.0125，按 step_size 向上取整为 0.02
+    assert ladder.amounts.tolist() == [0.02, 0.02, 0.02]
+    assert ladder.price_list() == [100.0, 141.42, 200.0]
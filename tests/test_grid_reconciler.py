@@ -0,0 +1,87 @@
+from grid_reconciler import GridLevel, GridReconciler
+
+GRID_PRICES = [float(price) for price in range(140, 161)]  # 第 i 档价格为 140 + i
+
+
+def amount_for(price: float) -> float:
+    return 1.0
+
+
+def live(plan, previous=()):
+    """对账执行后的挂单"""
+    cancelled = {order['id'] for order in plan.to_cancel}
+    orders = [order for order in previous if order['id'] not in cancelled]
+    orders += [{'id': f"{level.side}-{level.price}", 'side': level.side, 'price': level.price, 'amount': level.amount}
+               for level in plan.to_place]
+    return orders
+
+
+def prices(orders, side):
+    return sorted(order['price'] for order in orders if order['side'] == side)
+
+
+def run_plan(reconciler, current_price, orders):
+    return reconciler.plan(GRID_PRICES, current_price, amount_for, orders)
+
+
+def test_initial_grid_leaves_nearest_level_empty():
+    reconciler = GridReconciler()
+    orders = live(run_plan(reconciler, 150.4, []))
+    assert reconciler.empty_level == 10
+    assert max(prices(orders, 'bid')) == 149
+    assert min(prices(orders, 'ask')) == 151
+
+
+def test_fill_then_bounce_does_not_round_trip_at_same_price():
+    reconciler = GridReconciler()
+    orders = live(run_plan(reconciler, 150.4, []))
+
+    # 149 买单成交，价格跌到 148.9 后反弹到 149.5
+    orders = [order for order in orders if not (order['side'] == 'bid' and order['price'] == 149)]
+    reconciler.on_fill('bid', 9)
+    orders = live(run_plan(reconciler, 148.9, orders), orders)
+    assert 149 not in prices(orders, 'ask')
+    assert min(prices(orders, 'ask')) == 150  # 149 买入的仓位在上一档卖出
+    assert max(prices(orders, 'bid')) == 148
+
+    plan = run_plan(reconciler, 149.5, orders)
+    assert plan.empty
+    assert GridLevel('ask', 149.0, 1.0) not in plan.to_place
+
+    # 150 卖单成交后在 149 重新挂买单，而不是在 150 挂买单
+    orders = [order for order in orders if not (order['side'] == 'ask' and order['price'] == 150)]
+    reconciler.on_fill('ask', 10)
+    orders = live(run_plan(reconciler, 150.2, orders), orders)
+    assert max(prices(orders, 'bid')) == 149
+    assert min(prices(orders, 'ask')) == 151
+
+
+def test_multiple_fills_move_empty_level_to_furthest_fill():
+    reconciler = GridReconciler()
+    orders = live(run_plan(reconciler, 150.0, []))
+    orders = [order for order in orders if not (order['side'] == 'bid' and order['price'] >= 147)]
+    for level in (9, 8, 7):
+        reconciler.on_fill('bid', level)
+    orders = live(run_plan(reconciler, 146.5, orders), orders)
+    assert reconciler.empty_level == 7
+    assert max(prices(orders, 'bid')) == 146
+    assert min(prices(orders, 'ask')) == 148
+
+
+def test_empty_level_follows_price_when_no_orders_were_hit():
+    reconciler = GridReconciler(price_range=0.02)
+    orders = live(run_plan(reconciler, 150.0, []))
+    # 价格跳出挂单范围，原有挂单均未成交也没有被记录
+    orders = live(run_plan(reconciler, 141.2, [order for order in orders if order['side'] == 'ask']))
+    assert reconciler.empty_level == 1
+    assert prices(orders, 'bid') == [140]
+    assert min(prices(orders, 'ask')) == 142
+
+
+def test_warm_start_keeps_adopted_orders():
+    reconciler = GridReconciler()
+    adopted = [{'id': 'b', 'side': 'bid', 'price': 148.0, 'amount': 1.0},
+               {'id': 'a', 'side': 'ask', 'price': 150.0, 'amount': 1.0}]
+    plan = run_plan(reconciler, 149.9, adopted)
+    assert reconciler.empty_level == 9
+    assert not plan.to_cancel
@@ -0,0 +1,185 @@
+import signal
+
+import pytest
+
+from backpack_exchange import BackpackExchange
+from event_journal import JournalReader
+from grid_reconciler import encode_client_id, grid_tag
+from grid_trader import GridTrader
+
+from conftest import SYMBOL, order_params
+
+
+@pytest.fixture
+def make_trader(mock_exchange, credentials, tmp_path):
+    """创建连接模拟交易所的网格（同一账户），overrides 覆盖默认配置"""
+    _, base_url, _, _ = mock_exchange
+    api_key, secret = credentials
+
+    def make(**overrides):
+        exchange = BackpackExchange({'apiKey': api_key, 'secret': secret, 'baseUrl': base_url})
+        config = {
+            'SYMBOL': SYMBOL, 'LOWER_PRICE': 140, 'UPPER_PRICE': 160, 'GRID_NUMBER': 20, 'INVESTMENT': 2000,
+            'GRID_TYPE': 'arithmetic', 'MIN_ORDER_SIZE': 0.001, 'TICK_SIZE': 0.01, 'STEP_SIZE': 0.001,
+            'POST_ONLY': True, 'TIME_IN_FORCE': 'GTC', 'MAX_ORDERS': 50, 'STOP_LOSS_PRICE': 100,
+            'TAKE_PROFIT_PRICE': 200, 'CHECK_INTERVAL': 10, 'USE_WEBSOCKET': False,
+            'PROFILE_DIR': str(tmp_path / 'profiles'), **overrides
+        }
+        return GridTrader(config, exchange=exchange)
+
+    return make
+
+
+@pytest.fixture
+def trader(make_trader):
+    trader = make_trader()
+    trader.place_grid_orders()
+    return trader
+
+
+def open_order_at(trader: GridTrader, side: str, price: float):
+    return next(order for order in trader.order_manager.get_open_orders()
+                if order.side == side and order.price == pytest.approx(price))
+
+
+@pytest.mark.parametrize('order_query_fails', [False, True])
+def test_sync_does_not_book_external_cancel_as_fill(trader, mock_exchange, monkeypatch, order_query_fails):
+    exchange, _, _, _ = mock_exchange
+    bid = open_order_at(trader, 'bid', 149)
+    ask = open_order_at(trader, 'ask', 151)
+    exchange.cancel_order(trader.exchange.apiKey, SYMBOL, ask.order_id)  # 在交易所界面手动撤单
+    exchange.set_price(SYMBOL, 148.5)  # 149 买单成交
+    if order_query_fails:
+        # 订单查询不可用时根据成交历史确认
+        def fail(*args, **kwargs):
+            raise Exception("404 Not Found")
+        monkeypatch.setattr(trader.exchange, 'fetch_order', fail)
+
+    usdc, sol = trader.ledger.available('USDC'), trader.ledger.available('SOL')
+    trader.sync_filled_orders(trader.exchange.fetch_open_orders(SYMBOL))
+
+    assert trader.order_manager.get_order(ask.order_id).status == 'cancelled'
+    assert trader.order_manager.get_order(bid.order_id).status == 'closed'
+    # 被撤销的卖单只释放冻结的 SOL，不计入卖出所得
+    assert trader.ledger.available('USDC') == pytest.approx(usdc)
+    assert trader.ledger.available('SOL') == pytest.approx(sol + bid.amount + ask.amount)
+    assert trader.ledger.locked('SOL') == pytest.approx(sum(
+        order.amount for order in trader.order_manager.get_open_orders() if order.side == 'ask'))
+
+
+def test_sync_settles_only_unrecorded_amount(trader, mock_exchange):
+    exchange, _, _, _ = mock_exchange
+    bid = open_order_at(trader, 'bid', 149)
+    exchange.set_price(SYMBOL, 148.5)
+    # 订单流已推送过一部分成交
+    pushed = round(bid.amount / 2, 3)
+    trader.on_order_update({
+        'event': 'orderFill', 'id': bid.order_id, 'side': 'Bid', 'status': 'PartiallyFilled',
+        'average': 149.0, 'filled': pushed, 'fillAmount': pushed, 'fillPrice': 149.0,
+        'fee': 0.0, 'feeCurrency': None, 'tradeId': None
+    })
+
+    sol = trader.ledger.available('SOL')
+    trader.sync_filled_orders(trader.exchange.fetch_open_orders(SYMBOL))
+
+    assert trader.order_manager.get_order(bid.order_id).status == 'closed'
+    assert trader.ledger.available('SOL') == pytest.approx(sol + bid.amount - pushed)
+    # 之后到达的推送不会重复结算
+    trader.on_order_update({
+        'event': 'orderFill', 'id': bid.order_id, 'side': 'Bid', 'status': 'Filled',
+        'average': 149.0, 'filled': bid.amount, 'fillAmount': bid.amount - pushed, 'fillPrice': 149.0,
+        'fee': 0.0, 'feeCurrency': None, 'tradeId': None
+    })
+    assert trader.ledger.available('SOL') == pytest.approx(sol + bid.amount - pushed)
+
+
+def test_filled_bid_is_resold_one_level_up(trader, mock_exchange):
+    exchange, _, _, _ = mock_exchange
+    exchange.set_price(SYMBOL, 148.5)  # 149 买单成交
+    trader.check_and_adjust_orders(148.5)
+    exchange.set_price(SYMBOL, 149.5)  # 反弹
+    trader.check_and_adjust_orders(149.5)
+
+    asks = sorted(order['price'] for order in trader.exchange.fetch_open_orders(SYMBOL) if order['side'] == 'Ask')
+    bids = sorted(order['price'] for order in trader.exchange.fetch_open_orders(SYMBOL) if order['side'] == 'Bid')
+    assert asks[0] == 150 and 149 not in bids
+    assert bids[-1] == 148
+
+
+def test_warm_start_adopts_own_orders_and_places_missing_levels(trader, make_trader, mock_exchange, monkeypatch):
+    exchange, _, _, _ = mock_exchange
+    client = trader.exchange
+    own = {order['id'] for order in client.fetch_open_orders(SYMBOL)}
+    missing = open_order_at(trader, 'bid', 148)
+    exchange.cancel_order(client.apiKey, SYMBOL, missing.order_id)  # 停机期间该档位被撤销
+    # 其他网格的订单与手动下单不属于本网格
+    foreign = client.create_order(**order_params('Bid', '141.5', client_id=encode_client_id(grid_tag('SOL_USDT'), 1)))
+    manual = client.create_order(**order_params('Ask', '158.5'))
+
+    restarted = make_trader(WARM_START=True)
+    tracked, placed = [], []
+    track, create_orders = restarted.ledger.track, restarted.exchange.create_orders
+    monkeypatch.setattr(restarted.ledger, 'track', lambda order_id, *args: tracked.append(order_id) or track(order_id, *args))
+    monkeypatch.setattr(restarted.exchange, 'create_orders', lambda orders: placed.extend(orders) or create_orders(orders))
+    restarted.start()
+
+    adopted = own - {missing.order_id}
+    assert set(tracked) == adopted
+    assert adopted <= {order.order_id for order in restarted.order_manager.get_open_orders()}
+    # 只补齐缺失的档位
+    assert [(order['side'], float(order['price'])) for order in placed] == [('Bid', 148.0)]
+    # 非本网格的订单既不接管也不撤销
+    open_ids = {order['id'] for order in client.fetch_open_orders(SYMBOL)}
+    assert {foreign['id'], manual['id']} <= open_ids
+    assert restarted.order_manager.get_order(foreign['id']) is None
+    assert restarted.order_manager.get_order(manual['id']) is None
+
+
+def journal_status(directory):
+    return {order.order_id: order.status for order in JournalReader(directory).rebuild_orders(SYMBOL)}
+
+
+def test_stop_loss_flushes_journal_on_exit(make_trader, mock_exchange, tmp_path, monkeypatch):
+    exchange, _, _, _ = mock_exchange
+    journal_dir = str(tmp_path / 'journal')
+    monkeypatch.setattr(signal, 'signal', lambda signum, handler: None)
+    exchange.set_price(SYMBOL, 140)
+    # 事件日志只在关闭时写盘，止损退出时必须关闭日志，撤单事件才不会丢失
+    trader = make_trader(STOP_LOSS_PRICE=145, JOURNAL_DIR=journal_dir, JOURNAL_FLUSH_INTERVAL=3600)
+
+    trader.run()
+
+    statuses = journal_status(journal_dir)
+    assert statuses and set(statuses.values()) == {'cancelled'}
+    assert trader.journal._file is None
+    assert trader._closed
+
+
+def test_cold_start_journals_cancel_of_previous_orders(make_trader, tmp_path):
+    journal_dir = str(tmp_path / 'journal')
+    previous = make_trader(JOURNAL_DIR=journal_dir)
+    previous.place_grid_orders()
+    previous.close()  # 未撤单退出
+    left_open = {order_id for order_id, status in journal_status(journal_dir).items() if status == 'open'}
+    assert left_open
+
+    restarted = make_trader(JOURNAL_DIR=journal_dir)
+    restarted.start()
+    restarted.close()
+
+    statuses = journal_status(journal_dir)
+    assert all(statuses[order_id] == 'cancelled' for order_id in left_open)
+    assert {order.order_id for order in restarted.order_manager.get_open_orders()} == \
+        {order_id for order_id, status in statuses.items() if status == 'open'}
+
+
+def test_pnl_seed_counts_only_grid_inventory(make_trader):
+    trader = make_trader()
+    trader.start()
+    asks = [order for order in trader.order_manager.get_open_orders() if order.side == 'ask']
+    assert asks
+    # 账户中的 100 SOL 不全属于本网格，只计入网格卖单占用的数量
+    assert trader.pnl.position == pytest.approx(sum(order.amount for order in asks))
+    trader.close()
+
+    assert make_trader(PNL_SEED_AMOUNT=0).pnl_seed_amount == 0.0
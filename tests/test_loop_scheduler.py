@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from loop_scheduler import LoopScheduler, REASON_GRID, REASON_HEARTBEAT, REASON_RISK
+
+GRID = [100.0, 110.0, 120.0, 130.0]
+
+
+def make_scheduler(**kwargs):
+    options = {'min_interval': 1.0, 'max_interval': 30.0, 'stop_loss_price': 90.0, 'take_profit_price': 140.0}
+    return LoopScheduler(GRID, **{**options, **kwargs})
+
+
+def test_crossing_the_band_requests_a_grid_check():
+    scheduler = make_scheduler()
+    assert scheduler.begin_check(115.0, timestamp=0.0) == REASON_HEARTBEAT
+    assert scheduler.observe(119.0, timestamp=1.0) is None
+    assert scheduler.due(1.0) is None
+
+    assert scheduler.observe(120.0, timestamp=2.0) == REASON_GRID
+    assert scheduler.wake_event.is_set()
+    assert scheduler.due(2.0) == REASON_GRID
+    # 检查后以新价格所在的区间 (120, 130) 判断
+    assert scheduler.begin_check(121.0, timestamp=3.0) == REASON_GRID
+    assert scheduler.observe(125.0, timestamp=4.0) is None
+    assert scheduler.observe(120.0, timestamp=5.0) == REASON_GRID
+
+
+def test_stop_and_take_profit_prices_request_a_risk_check():
+    scheduler = make_scheduler()
+    # 还没有网格区间时风控价格同样触发
+    assert scheduler.observe(89.5, timestamp=0.0) == REASON_RISK
+    scheduler.begin_check(105.0, timestamp=1.0)
+    assert scheduler.observe(140.0, timestamp=2.0) == REASON_RISK
+    assert scheduler.due(2.0) == REASON_RISK
+
+
+def test_poll_interval_is_clamped():
+    # 半衰期极短时方差等于最近一个样本，便于计算期望的间隔
+    scheduler = make_scheduler(halflife=1e-9)
+    scheduler.begin_check(115.0, timestamp=0.0)
+    scheduler.observe(115.0, timestamp=1.0)  # 价格不动：最长间隔
+    assert scheduler.next_poll == pytest.approx(1.0 + 30.0)
+
+    scheduler.observe(119.0, timestamp=2.0)  # 剧烈波动：最短间隔
+    assert scheduler.next_poll == pytest.approx(2.0 + 1.0)
+
+    log_return = -0.002
+    price = 119.0 * math.exp(log_return)
+    scheduler.observe(price, timestamp=3.0)
+    expected = 0.25 * ((120.0 - price) / price) ** 2 / log_return ** 2
+    assert 1.0 < expected < 30.0
+    assert scheduler.next_poll == pytest.approx(3.0 + expected)
+    assert scheduler.poll_due(scheduler.next_poll)
+    assert not scheduler.poll_due(scheduler.next_poll - 0.01)
+
+
+def test_heartbeat_after_max_interval():
+    scheduler = make_scheduler()
+    scheduler.begin_check(115.0, timestamp=100.0)
+    assert scheduler.due(129.9) is None
+    assert scheduler.due(130.0) == REASON_HEARTBEAT
+    assert scheduler.next_deadline(polling=False) == 130.0
+    assert scheduler.next_deadline(polling=True) == scheduler.next_poll == 101.0  # 没有波动率估计时按最短间隔轮询
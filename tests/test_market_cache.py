@@ -0,0 +1,77 @@
+import pytest
+
+import market_cache
+from market_cache import MISS_REFRESH_INTERVAL, MarketCache
+
+
+def market(symbol):
+    return {'symbol': symbol, 'precision': {'price': 0.01, 'amount': 0.001}, 'limits': {'amount': {'min': 0.01}}}
+
+
+class StubExchange:
+    def __init__(self):
+        self.requests = 0
+        self.fail = False
+
+    def fetch_markets(self):
+        self.requests += 1
+        if self.fail:
+            raise Exception("交易所不可用")
+        return [market('SOL_USDC')]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(market_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_fresh_cache_makes_no_requests(tmp_path, clock):
+    path = str(tmp_path / 'markets.json')
+    MarketCache(StubExchange(), path).get('SOL_USDC')
+
+    exchange = StubExchange()
+    cache = MarketCache(exchange, path)
+    assert cache.tick_size('SOL_USDC') == 0.01
+    assert cache.format_amount('SOL_USDC', 1.5) == '1.500'
+    assert exchange.requests == 0
+
+
+def test_unknown_symbol_refreshes_at_most_once_per_interval(clock):
+    exchange = StubExchange()
+    cache = MarketCache(exchange, None)
+    assert cache.get('SOL_USDC') is not None
+    assert exchange.requests == 1
+
+    clock[0] += MISS_REFRESH_INTERVAL
+    for _ in range(5):
+        assert cache.get('BTC_USDC') is None
+    assert exchange.requests == 2
+
+    clock[0] += MISS_REFRESH_INTERVAL - 1
+    assert cache.get('BTC_USDC') is None
+    assert exchange.requests == 2
+    clock[0] += 1
+    assert cache.get('BTC_USDC') is None
+    assert exchange.requests == 3
+
+
+def test_failed_refresh_keeps_stale_data(clock):
+    exchange = StubExchange()
+    cache = MarketCache(exchange, None, ttl=3600)
+    cache.get('SOL_USDC')
+
+    exchange.fail = True
+    clock[0] += 3600
+    for _ in range(5):
+        assert cache.step_size('SOL_USDC') == 0.001
+        assert cache.get('BTC_USDC') is None
+    # 刷新失败后同样等待间隔再重试
+    assert exchange.requests == 2
+
+    clock[0] += MISS_REFRESH_INTERVAL
+    exchange.fail = False
+    assert cache.min_amount('SOL_USDC') == 0.01
+    assert exchange.requests == 3
+    assert not cache.expired
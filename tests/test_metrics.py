@@ -0,0 +1,35 @@
+from metrics import LATENCY_BUCKETS, MetricsRegistry
+
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    registry.inc('backpack_requests_total', status=200, endpoint='GET /api/v1/ticker')
+    registry.inc('backpack_requests_total', 2, status=429, endpoint='GET /api/v1/ticker')
+    registry.set('grid_last_price', 150.25, symbol='SOL_USDC')
+    for value in (0.003, 0.01, 0.2, 45.0):
+        registry.observe('backpack_request_duration_seconds', value, endpoint='POST /api/v1/order', instruction='orderExecute')
+    registry.inc('grid_checks_total', reason='say "hi"\\\n')
+
+    lines = registry.render().splitlines()
+
+    assert '# TYPE backpack_requests_total counter' in lines
+    # 标签按名称排序
+    assert 'backpack_requests_total{endpoint="GET /api/v1/ticker",status="200"} 1' in lines
+    assert 'backpack_requests_total{endpoint="GET /api/v1/ticker",status="429"} 2' in lines
+    assert 'grid_last_price{symbol="SOL_USDC"} 150.25' in lines
+    assert 'grid_checks_total{reason="say \\"hi\\"\\\\\\n"} 1' in lines
+
+    # 直方图输出累计分桶（上界包含在桶内）、+Inf、_sum 与 _count
+    name = 'backpack_request_duration_seconds'
+    labels = 'endpoint="POST /api/v1/order",instruction="orderExecute"'
+    buckets = [line for line in lines if line.startswith(f'{name}_bucket')]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert f'{name}_bucket{{{labels},le="0.005"}} 1' in buckets
+    assert f'{name}_bucket{{{labels},le="0.01"}} 2' in buckets
+    assert f'{name}_bucket{{{labels},le="0.25"}} 3' in buckets
+    assert f'{name}_bucket{{{labels},le="30"}} 3' in buckets
+    assert buckets[-1] == f'{name}_bucket{{{labels},le="+Inf"}} 4'
+    assert f'{name}_sum{{{labels}}} 45.213000' in lines
+    assert f'{name}_count{{{labels}}} 4' in lines
+    # 没有样本的指标不输出
+    assert not any(line.startswith('grid_open_orders') for line in lines)
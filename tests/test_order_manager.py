@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from order_manager import OrderInfo, OrderManager
+
+
+def make_order(order_id: str, side: str = 'bid', price: float = 149.0, status: str = 'open') -> OrderInfo:
+    return OrderInfo(order_id, 'SOL_USDC', side, price, 1.0, status, datetime.now())
+
+
+def test_counts_stay_cumulative_after_eviction(tmp_path):
+    manager = OrderManager(max_history=2, archive_path=str(tmp_path / 'archive.jsonl'))
+    for i in range(5):
+        manager.add_order(make_order(f"o{i}"))
+        manager.update_order(f"o{i}", 'closed', 149.0, 1.0)
+
+    assert manager.count('closed') == 5
+    assert manager.count('open') == 0
+    assert manager.archived == 3
+    assert [order.order_id for order in manager.get_closed_orders()] == ['o3', 'o4']
+    assert set(manager.orders) == {'o3', 'o4'}
+
+
+def test_evicted_orders_are_archived(tmp_path):
+    path = tmp_path / 'archive.jsonl'
+    manager = OrderManager(max_history=1, archive_path=str(path))
+    manager.add_order(make_order('a', side='ask', price=151.0))
+    manager.add_order(make_order('b'))
+    manager.update_order('a', 'closed', 151.5, 1.0)
+    manager.update_order('b', 'cancelled')
+
+    records = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [record['order_id'] for record in records] == ['a']
+    assert records[0]['status'] == 'closed'
+    assert records[0]['profit'] == pytest.approx(0.5)
+    assert records[0]['closed_at'] is not None
+    # 淘汰的订单仍计入总利润
+    assert manager.get_total_profit() == pytest.approx(0.5)
+
+
+def test_level_index_drops_orders_that_leave_open():
+    manager = OrderManager()
+    manager.add_order(make_order('a'))
+    manager.add_order(make_order('b'))
+    manager.add_order(make_order('c', side='ask', price=151.0))
+    assert {order.order_id for order in manager.get_orders_at('bid', 149.0)} == {'a', 'b'}
+
+    manager.update_order('a', 'closed', 149.0, 1.0)
+    manager.update_order('c', 'cancelled')
+    assert [order.order_id for order in manager.get_orders_at('bid', 149.0)] == ['b']
+    assert manager.get_orders_at('ask', 151.0) == []
+    assert manager.get_orders_at('bid', 148.0) == []
+
+
+def test_closed_to_cancelled_moves_counts():
+    manager = OrderManager()
+    manager.add_order(make_order('a'))
+    manager.update_order('a', 'closed', 149.0, 1.0)
+    assert (manager.count('open'), manager.count('closed'), manager.count('cancelled')) == (0, 1, 0)
+
+    manager.update_order('a', 'cancelled')
+    assert (manager.count('open'), manager.count('closed'), manager.count('cancelled')) == (0, 0, 1)
+    assert manager.get_closed_orders() == []
+    assert manager.get_recent_closed() == []
+
+
+def test_load_does_not_archive(tmp_path):
+    path = tmp_path / 'archive.jsonl'
+    manager = OrderManager(max_history=1, archive_path=str(path))
+    manager.load([make_order('a', status='closed'), make_order('b', status='cancelled'), make_order('c')])
+
+    assert not path.exists()
+    assert set(manager.orders) == {'b', 'c'}
+    assert (manager.count('open'), manager.count('closed'), manager.count('cancelled')) == (1, 1, 1)
+    assert [order.order_id for order in manager.get_orders_at('bid', 149.0)] == ['c']
@@ -0,0 +1,50 @@
+import pytest
+
+from pnl_engine import PnLEngine
+
+
+def test_seen_trade_ids_are_bounded():
+    pnl = PnLEngine('SOL', 'USDC', max_seen=3)
+    for trade_id in range(10):
+        assert pnl.on_fill('bid', 100.0, 1.0, trade_id=str(trade_id))
+    assert len(pnl._seen) == 3
+    assert not pnl.on_fill('bid', 100.0, 1.0, trade_id='9')  # 最近的成交仍然去重
+    assert pnl.trades == 10
+
+
+def test_fifo_realizes_across_partial_lot_closes():
+    pnl = PnLEngine('SOL', 'USDC')
+    pnl.on_fill('bid', 100.0, 1.0)
+    pnl.on_fill('bid', 110.0, 2.0)
+    pnl.on_fill('ask', 120.0, 1.5)  # 平掉第一批 1.0 和第二批 0.5
+    assert pnl.realized == pytest.approx(1.0 * 20.0 + 0.5 * 10.0)
+    assert pnl.position == pytest.approx(1.5)
+    assert pnl.average_cost() == pytest.approx(110.0)
+
+    pnl.on_fill('ask', 105.0, 2.0)  # 平掉剩余 1.5 并反向开空 0.5
+    assert pnl.realized == pytest.approx(25.0 - 1.5 * 5.0)
+    assert pnl.position == pytest.approx(-0.5)
+    assert pnl.average_cost() == pytest.approx(105.0)
+
+
+def test_fees_are_folded_into_cost():
+    pnl = PnLEngine('SOL', 'USDC')
+    pnl.on_fill('bid', 100.0, 2.0, fee=0.02, fee_currency='SOL')  # 基础货币手续费按成交价折算为 2 USDC
+    assert pnl.fees == pytest.approx(2.0)
+    assert pnl.average_cost() == pytest.approx(101.0)
+
+    pnl.on_fill('ask', 110.0, 2.0, fee=2.2, fee_currency='USDC')
+    assert pnl.fees == pytest.approx(4.2)
+    assert pnl.realized == pytest.approx(2.0 * (110.0 - 1.1) - 2.0 * 101.0)
+    assert pnl.position == pytest.approx(0.0)
+
+
+def test_unrealized_against_mark_price():
+    pnl = PnLEngine('SOL', 'USDC')
+    pnl.seed(1.0, 100.0)
+    pnl.on_fill('bid', 90.0, 1.0)
+    assert pnl.unrealized(95.0) == pytest.approx(-5.0 + 5.0)
+    assert pnl.unrealized(120.0) == pytest.approx(20.0 + 30.0)
+    snapshot = pnl.snapshot(120.0)
+    assert snapshot['total'] == pytest.approx(50.0)
+    assert snapshot['realized'] == 0.0
@@ -0,0 +1,50 @@
+import os
+import signal
+import time
+
+import pytest
+
+from profiling import Profiler
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason="平台不支持 SIGUSR1")
+def test_signal_only_requests_toggle(tmp_path):
+    profiler = Profiler(directory=str(tmp_path), poll_interval=0.05)
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        profiler.install()
+        # 主线程持有阶段汇总锁时收到信号，处理函数不能在主线程上切换，否则会死锁
+        with profiler._stats_lock:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            time.sleep(0.01)
+            assert not profiler.active
+        assert wait_until(lambda: profiler.active)
+
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert wait_until(lambda: not profiler.active)
+        assert any(name.startswith('profile-') for name in os.listdir(tmp_path))
+    finally:
+        profiler.close()
+        signal.signal(signal.SIGUSR1, previous)
+
+
+def test_control_file_toggles_profiling(tmp_path):
+    control = tmp_path / 'profile.on'
+    profiler = Profiler(directory=str(tmp_path / 'out'), control_file=str(control), poll_interval=0.05)
+    try:
+        profiler.install()
+        control.touch()
+        assert wait_until(lambda: profiler.active)
+        control.unlink()
+        assert wait_until(lambda: not profiler.active)
+    finally:
+        profiler.close()
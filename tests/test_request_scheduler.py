@@ -0,0 +1,40 @@
+import threading
+import time
+
+import pytest
+
+from request_scheduler import PRIORITY_CRITICAL, PRIORITY_LOW, PRIORITY_NORMAL, RequestScheduler
+
+
+def test_critical_request_runs_while_workers_are_busy():
+    scheduler = RequestScheduler(workers=2)
+    release = threading.Event()
+    # 所有普通工作线程都在等待（如限流等待或重试退避）
+    busy = [scheduler.submit(PRIORITY_LOW, lambda: release.wait(5)) for _ in range(4)]
+    try:
+        cancel = scheduler.submit(PRIORITY_CRITICAL, lambda: 'cancelled')
+        assert cancel.result(timeout=1) == 'cancelled'
+        assert not any(future.done() for future in busy)
+    finally:
+        release.set()
+    assert all(future.result(timeout=5) for future in busy)
+
+
+def test_stale_low_priority_requests_are_dropped():
+    scheduler = RequestScheduler(workers=1, stale_timeout=0.05)
+    release = threading.Event()
+    blocker = scheduler.submit(PRIORITY_NORMAL, lambda: release.wait(5))
+    time.sleep(0.05)  # 等待工作线程取出阻塞请求
+    query = scheduler.submit(PRIORITY_LOW, lambda: 'ticker')
+    order = scheduler.submit(PRIORITY_NORMAL, lambda: 'order')
+    explicit = scheduler.submit(PRIORITY_NORMAL, lambda: 'late order', deadline=time.monotonic() + 0.05)
+    time.sleep(0.1)
+    release.set()
+
+    assert blocker.result(timeout=5)
+    with pytest.raises(Exception, match='截止时间'):
+        query.result(timeout=5)
+    with pytest.raises(Exception, match='截止时间'):
+        explicit.result(timeout=5)
+    assert order.result(timeout=5) == 'order'  # 下单请求默认不过期
+    assert scheduler.expired == 2
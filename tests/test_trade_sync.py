@@ -0,0 +1,20 @@
+from trade_sync import TradeSync, iter_fills
+
+from conftest import SYMBOL, order_params
+
+
+def test_fill_history_paging(client, mock_exchange):
+    exchange, _, _, _ = mock_exchange
+    client.create_orders([order_params('Bid', f"{149 - i}") for i in range(7)])
+    exchange.set_price(SYMBOL, 140)  # 价格穿过全部买单
+
+    pages = list(iter_fills(client, SYMBOL, page_size=3))
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert len({trade['id'] for page in pages for trade in page}) == 7
+
+    sync = TradeSync(client, SYMBOL, page_size=3)
+    assert len(sync.sync()) == 7
+    assert sync.sync() == []  # 高水位之后没有新成交
+    client.create_orders([order_params('Ask', '141')])
+    exchange.set_price(SYMBOL, 142)
+    assert [trade['side'] for trade in sync.sync()] == ['sell']
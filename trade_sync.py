@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 1000  # 成交历史接口单页最大数量
+
+
+def iter_fills(exchange, symbol: str, since: Optional[int] = None, until: Optional[int] = None,
+               page_size: int = PAGE_SIZE, prefetch: bool = True) -> Iterator[List[Dict]]:
+    """
+    分页遍历成交历史，逐页返回解析后的成交记录
+    查询窗口的结束时间在开始时固定，翻页期间产生的新成交不会使 offset 错位；
+    处理当前页的同时在后台线程中请求下一页
+    :param exchange: 交易所客户端（需支持 fetch_my_trades）
+    :param symbol: 交易对
+    :param since: 开始时间（毫秒，包含）
+    :param until: 结束时间（毫秒），默认当前时间
+    :param page_size: 每页数量
+    :param prefetch: 是否预取下一页
+    """
+    until = until if until is not None else int(time.time() * 1000)
+
+    def fetch(offset: int) -> List[Dict]:
+        return exchange.fetch_my_trades(symbol, since, page_size, {'to': until, 'offset': offset})
+
+    if not prefetch:
+        offset = 0
+        while True:
+            page = fetch(offset)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="TradeSync") as executor:
+        offset = 0
+        pending = executor.submit(fetch, offset)
+        while pending is not None:
+            page = pending.result()
+            offset += page_size
+            # 本页已满说明可能还有下一页，先发出请求再处理本页
+            pending = executor.submit(fetch, offset) if len(page) >= page_size else None
+            if page:
+                yield page
+
+
+class TradeSync:
+    """
+    增量成交同步
+    持久化已同步成交的最新时间戳（高水位）及该毫秒内的成交ID，每次只拉取高水位之后的新成交；
+    首次同步可从 backfill_since 开始回补历史
+    """
+
+    def __init__(self, exchange, symbol: str, cursor_path: Optional[str] = None,
+                 backfill_since: Optional[int] = None, page_size: int = PAGE_SIZE):
+        """
+        :param exchange: 交易所客户端
+        :param symbol: 交易对
+        :param cursor_path: 高水位文件路径（JSON），为 None 时只在内存中保存
+        :param backfill_since: 没有高水位时的起始时间（毫秒），为 None 时从交易所默认范围开始
+        :param page_size: 每页数量
+        """
+        self.exchange = exchange
+        self.symbol = symbol
+        self.cursor_path = cursor_path
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self.cursor = {'timestamp': backfill_since, 'tradeIds': []}
+        self._load_cursor()
+
+    def _load_cursor(self):
+        if not self.cursor_path or not os.path.exists(self.cursor_path):
+            return
+        try:
+            with open(self.cursor_path, 'r', encoding='utf-8') as f:
+                cursor = json.load(f)
+            if cursor.get('symbol') == self.symbol:
+                self.cursor = {'timestamp': cursor.get('timestamp'), 'tradeIds': cursor.get('tradeIds', [])}
+                logger.info(f"成交同步高水位: {self.cursor['timestamp']}")
+        except (OSError, ValueError) as e:
+            logger.error(f"读取成交同步高水位失败: {e}")
+
+    def _save_cursor(self):
+        if not self.cursor_path:
+            return
+        data = {'symbol': self.symbol, **self.cursor}
+        tmp_path = self.cursor_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.cursor_path)
+
+    def sync(self, handler: Optional[Callable[[List[Dict]], None]] = None) -> List[Dict]:
+        """
+        拉取高水位之后的新成交并推进高水位
+        :param handler: 可选，新成交（按时间升序）写入下游后再推进高水位
+        :return: 新成交列表（按时间升序）
+        """
+        with self._lock:
+            since = self.cursor['timestamp']
+            seen = set(self.cursor['tradeIds'])
+            trades = []
+            for page in iter_fills(self.exchange, self.symbol, since, page_size=self.page_size):
+                # 起始毫秒内的成交上次可能已同步过
+                trades.extend(trade for trade in page if trade['id'] not in seen)
+            if not trades:
+                return []
+
+            trades.sort(key=lambda trade: (trade['timestamp'] or 0, trade['id']))
+            if handler is not None:
+                handler(trades)
+
+            latest = trades[-1]['timestamp']
+            boundary = [trade['id'] for trade in trades if trade['timestamp'] == latest]
+            if latest == since:
+                boundary.extend(self.cursor['tradeIds'])
+            self.cursor = {'timestamp': latest, 'tradeIds': boundary}
+            self._save_cursor()
+
+        logger.info(f"同步新成交 {len(trades)} 笔，高水位: {latest}")
+        return trades
@@ -1,7 +1,7 @@
 import json
 import logging
 from backpack_exchange import BackpackExchange
-import time
+from market_cache import MarketCache
 
 # 配置日志
 logging.basicConfig(
@@ -28,6 +28,10 @@ def main():
         'apiKey': config['apiKey'],
         'secret': config['secret']
     })
+
+    # 交易对精度从本地缓存读取，缓存有效时不请求交易所
+    markets = MarketCache(exchange, config.get('marketCachePath', 'markets_cache.json'),
+                          config.get('marketCacheTtl', 86400))
     
     try:
         # 遍历交易对
@@ -47,6 +51,12 @@ def main():
             # 创建订单
             order_params = config['order_params'].copy()
             order_params['symbol'] = symbol
+            market = markets.get(symbol)
+            if market is not None:
+                logger.info(f"{symbol} 价格精度: {market['precision']['price']}, 数量精度: {market['precision']['amount']}")
+                order_params['amount'] = markets.format_amount(symbol, order_params['amount'])
+                if order_params.get('price') is not None:
+                    order_params['price'] = markets.format_price(symbol, order_params['price'])
             
             # 创建订单
             logger.info(f"创建订单: {order_params}")